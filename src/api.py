@@ -0,0 +1,200 @@
+"""
+Streaming Python API for running URL tests from other programs.
+
+stream_tests() runs the engine behind the CLI (URLTester with adaptive
+per-host concurrency, retries, circuit breaker and an optional rate limit)
+and the same sitemap, content baseline and <head> checks, but takes its tests
+from any iterable and yields every result as soon as it is final, in
+completion order. The iterable is read lazily and results are not kept (the
+duplicate content clusters of a CLI run are not collected), so a generator
+over millions of rows (or a queue fed by another service) runs in constant
+memory. astream_tests() is the
+asyncio version: it also accepts an async iterable and is consumed with
+``async for``, while requests still run on the tester's thread pool.
+
+    import sys
+    sys.path.insert(0, 'src')
+    from api import stream_tests
+
+    items = [{'original_url': '/psychics/old-name', 'expected_url': '/psychics/new-name'}]
+    for result in stream_tests(items, environment='qa', csv_file='Psychics.csv'):
+        print(result['original_url'], result['success'])
+
+Items are dicts with 'original_url' and, for redirect tests, 'expected_url'
+(CSVParser rows work as they are). 'test_type' picks the test explicitly;
+otherwise items whose expected URL is missing or the REMOVE marker are
+remove tests and the others redirect tests. Each result carries the item's
+index in the input as 'position'; result['success'] is the outcome the CLI
+summary counts.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from contextlib import closing
+from typing import AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, Union
+from config import Config
+from checks import apply_content_baseline, apply_head_checks, apply_redirect_sitemap_checks, apply_remove_sitemap_checks
+
+
+def _test_items(items: Iterable[Dict]) -> Iterator[Dict]:
+    """Validate items and fill in their test type."""
+    for item in items:
+        if not item.get('original_url'):
+            raise ValueError(f"Test item without an original_url: {item!r}")
+        expected_url = str(item.get('expected_url') or '').strip()
+        removal = not expected_url or expected_url.upper() == Config.REMOVE_MARKER
+        test_type = item.get('test_type') or ('remove' if removal else 'redirect')
+        if test_type not in ('redirect', 'remove'):
+            raise ValueError(f"Unknown test_type '{test_type}' (expected 'redirect' or 'remove')")
+        if test_type == 'redirect' and removal:
+            raise ValueError(f"Redirect test without an expected_url: {item!r}")
+        yield dict(item, test_type=test_type)
+
+
+def _load_sitemap(environment: str, csv_file: str = None):
+    """Fetch the environment's sitemap; None if it cannot be fetched."""
+    from sitemap_handler import SitemapHandler
+
+    sitemap_handler = SitemapHandler(environment, sitemap_url=Config.get_sitemap_url(environment, csv_file),
+                                     enable_fallback=False)
+    sitemap_handler.fetch_sitemap()
+    if not sitemap_handler.fetch_success:
+        print(f"⚠️  Sitemap for {environment} could not be fetched; sitemap checks are skipped")
+        return None
+    return sitemap_handler
+
+
+def stream_tests(items: Iterable[Dict], environment: str = None, csv_file: str = None, sitemap=True,
+                 concurrency: int = None, rate_limit: float = None, cancel: threading.Event = None,
+                 tester=None) -> Iterator[Dict]:
+    """
+    Test URLs concurrently, yielding each result as it completes.
+
+    Args:
+        items: Iterable of test items (see module docstring)
+        environment: Environment to test (default: Config.CURRENT_ENV)
+        csv_file: Input file the items come from; selects the sitemap and, if
+                  the file is in the input directory, enables the crawl export's
+                  content baseline and <head> comparisons
+        sitemap: True to fetch the sitemap once and add sitemap compliance
+                 checks, a SitemapHandler to check against, or False to skip them
+        concurrency: Worker threads (default: Config.MAX_CONCURRENCY)
+        rate_limit: Maximum requests per second over all hosts
+        cancel: Event that stops further tests when set; tests already running
+                still finish and are yielded. Closing the generator also stops.
+        tester: URLTester to reuse (keeps its pools, limits and statistics);
+                its rate limiter is only replaced while the run lasts
+
+    Yields:
+        Result dictionaries as produced by the CLI, plus 'position'
+
+    Raises:
+        ValueError: If an item has no original_url, or an unusable test_type
+    """
+    from csv_parser import CSVParser
+    from concurrency import RateLimiter
+    from url_tester import URLTester
+
+    environment = environment or (tester.environment if tester else Config.CURRENT_ENV)
+    tester = tester or URLTester(environment)
+
+    sitemap_handler = _load_sitemap(environment, csv_file) if sitemap is True else (sitemap or None)
+    parser = None
+    if csv_file and os.path.exists(Config.get_input_file_path(csv_file)):
+        parser = CSVParser(Config.get_input_file_path(csv_file))
+
+    # Settings of a caller's tester are restored when the run ends
+    rate_limiter, record_duplicates = tester.rate_limiter, tester.record_duplicates
+    if rate_limit:
+        tester.rate_limiter = RateLimiter(rate_limit)
+    tester.record_duplicates = False
+
+    stop = cancel.is_set if cancel else None
+    try:
+        with closing(tester.stream_results(_test_items(items), max_workers=concurrency, stop=stop)) as results:
+            for position, item, result in results:
+                result.pop('content_sketch', None)
+                result['position'] = position
+
+                if sitemap_handler:
+                    if item['test_type'] == 'redirect':
+                        apply_redirect_sitemap_checks(result, item, tester, sitemap_handler)
+                        apply_head_checks(result, parser, sitemap_handler)
+                    else:
+                        apply_remove_sitemap_checks(result, item, tester, sitemap_handler)
+                if parser:
+                    apply_content_baseline(result, parser)
+                yield result
+    finally:
+        tester.rate_limiter, tester.record_duplicates = rate_limiter, record_duplicates
+
+
+async def astream_tests(items: Union[Iterable[Dict], AsyncIterable[Dict]], **options) -> AsyncIterator[Dict]:
+    """
+    Async version of stream_tests, taking the same keyword options.
+
+    stream_tests runs on a worker thread; items of an async iterable are
+    pulled from the event loop as the thread needs them, and at most
+    Config.STREAM_BUFFER_SIZE results wait for the consumer before testing
+    pauses. Leaving the ``async for`` early stops the run like closing
+    stream_tests does.
+    """
+    loop = asyncio.get_running_loop()
+    results = asyncio.Queue(maxsize=Config.STREAM_BUFFER_SIZE)
+    closed = threading.Event()
+
+    def pull(source):
+        """Items of an async iterable, fetched through the event loop (until the consumer has gone)."""
+        iterator = source.__aiter__()
+        while not closed.is_set():
+            future = asyncio.run_coroutine_threadsafe(iterator.__anext__(), loop)
+            while True:
+                try:
+                    item = future.result(timeout=Config.STREAM_POLL_INTERVAL)
+                    break
+                except StopAsyncIteration:
+                    return
+                except FuturesTimeoutError:
+                    # An idle source must not keep the closing consumer waiting
+                    if closed.is_set():
+                        future.cancel()
+                        return
+            yield item
+
+    def deliver(message) -> bool:
+        """Hand a message to the consumer; False once the consumer has gone."""
+        future = asyncio.run_coroutine_threadsafe(results.put(message), loop)
+        while True:
+            try:
+                future.result(timeout=Config.STREAM_POLL_INTERVAL)
+                return True
+            except FuturesTimeoutError:
+                if closed.is_set():
+                    future.cancel()
+                    return False
+
+    def run():
+        source = pull(items) if hasattr(items, '__aiter__') else items
+        try:
+            with closing(stream_tests(source, **options)) as stream:
+                for result in stream:
+                    if not deliver(('result', result)):
+                        return
+        except Exception as e:
+            deliver(('error', e))
+            return
+        deliver(('done', None))
+
+    worker = loop.run_in_executor(None, run)
+    try:
+        while True:
+            kind, value = await results.get()
+            if kind == 'error':
+                raise value
+            if kind == 'done':
+                break
+            yield value
+    finally:
+        closed.set()
+        await worker
@@ -0,0 +1,147 @@
+"""
+Checkpoint journal for resumable runs.
+
+While a file is tested, every completed URL test is appended to a JSON Lines
+journal as soon as its result is final (sitemap, baseline and <head> checks
+applied). The first line records the run it belongs to and the sitemap
+snapshot the results were judged against. ``--resume`` reads the journal
+back, reloads that snapshot, tests only the rows that have no record yet and
+merges both sets in row order, so the reports match an uninterrupted run.
+
+Records are flushed as they are written, so they survive Ctrl+C or a killed
+process; they are fsynced every Config.CHECKPOINT_FSYNC_INTERVAL records to
+also survive a machine crash. A torn last line is ignored and cut off before
+appending. The journal is removed once the run's reports are written.
+
+Content sketches are stored with the header's sketch_format; sketches of a
+journal written with another format (such as the per-process hash() shingles
+of earlier versions) are dropped on load, so duplicate detection on resume
+only compares sketches computed the same way.
+"""
+import json
+import os
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from config import Config
+
+# Version of the content sketches in records (content_inspector.shingle_hash)
+SKETCH_FORMAT = 2
+
+
+class CheckpointJournal:
+    """Append-only journal of the completed URL tests of one run."""
+
+    def __init__(self, path: str):
+        """Initialize journal at path (not opened yet)."""
+        self.path = path
+        self._file = None
+        self._unsynced = 0
+
+    @staticmethod
+    def describe_run(csv_file: str, env: str, shard: Optional[Tuple[int, int]]) -> Dict:
+        """Identify a run; a journal is only resumed by a run with the same description."""
+        stat = os.stat(Config.get_input_file_path(csv_file))
+        return {
+            'csv_file': csv_file,
+            'environment': env,
+            'shard': list(shard) if shard else None,
+            'input_size': stat.st_size,
+            'input_mtime': int(stat.st_mtime),
+        }
+
+    def start(self, run: Dict, sitemap_snapshot: Optional[str], sitemap_diff: Optional[Dict]):
+        """Start a new journal, replacing any earlier one."""
+        self._file = open(self.path, 'w', encoding='utf-8')
+        header = dict(run, type='start', sitemap_snapshot=sitemap_snapshot, sitemap_diff=sitemap_diff,
+                      sketch_format=SKETCH_FORMAT, created=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        self._write(header)
+        self.sync()
+
+    def reopen(self, size: int):
+        """Continue a loaded journal after its last complete record."""
+        self._file = open(self.path, 'r+', encoding='utf-8')
+        self._file.truncate(size)
+        self._file.seek(size)
+
+    def read_header(self) -> Optional[Dict]:
+        """First record of the journal (None if there is no readable journal)."""
+        try:
+            with open(self.path, 'rb') as f:
+                header = json.loads(f.readline())
+        except (OSError, ValueError):
+            return None
+        return header if isinstance(header, dict) and header.get('type') == 'start' else None
+
+    def load(self, run: Dict) -> Optional[Dict]:
+        """
+        Read back the journal of an interrupted run.
+
+        Returns:
+            Dictionary with the 'header', completed 'redirect' and 'remove'
+            results and their content 'sketches' (keyed by row position), and
+            the byte 'size' of the complete records; None if there is no
+            journal for this run.
+        """
+        if not os.path.exists(self.path):
+            return None
+
+        state = {'header': None, 'redirect': {}, 'remove': {}, 'sketches': {}, 'size': 0}
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # torn write at the end of an interrupted run
+                if not line.endswith(b'\n'):
+                    break
+
+                if record['type'] == 'start':
+                    state['header'] = record
+                else:
+                    position = record['position']
+                    state[record['type']][position] = record['result']
+                    if record.get('sketch') is not None:
+                        state['sketches'][(record['type'], position)] = frozenset(record['sketch'])
+                state['size'] += len(line)
+
+        header = state['header']
+        if header is None or any(header.get(key) != value for key, value in run.items()):
+            return None
+        if header.get('sketch_format') != SKETCH_FORMAT:
+            state['sketches'] = {}
+        return state
+
+    def record(self, test_type: str, position: int, result: Dict, sketch: Optional[frozenset] = None):
+        """Append a completed test result."""
+        record = {'type': test_type, 'position': position, 'result': result}
+        if sketch is not None:
+            record['sketch'] = sorted(sketch)
+        self._write(record)
+
+        self._unsynced += 1
+        if self._unsynced >= Config.CHECKPOINT_FSYNC_INTERVAL:
+            self.sync()
+
+    def _write(self, record: Dict):
+        """Write one record and hand it to the OS."""
+        self._file.write(json.dumps(record, default=str) + '\n')
+        self._file.flush()
+
+    def sync(self):
+        """Force written records to disk."""
+        if self._file:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+
+    def close(self):
+        """Sync and close the journal, keeping it for --resume."""
+        if self._file:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    def complete(self):
+        """Remove the journal of a run that finished."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
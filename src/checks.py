@@ -0,0 +1,77 @@
+"""
+Result checks shared by the CLI, watch mode and the streaming API.
+
+URLTester only knows HTTP outcomes; these functions add what makes a result a
+sitemap QA result: sitemap compliance of redirect and remove URLs, the body
+hash compared with the crawl export, and <head> checks of redirect targets.
+Each one updates and returns the result dict, including its 'success'.
+"""
+from urllib.parse import urljoin
+
+
+def apply_redirect_sitemap_checks(result, url_data, tester, sitemap_handler):
+    """Add sitemap compliance checks to a redirect test result."""
+    result['url_accessible'] = result['success']  # Rename for clarity
+    # Use the prepared URL for sitemap checking (the URL we actually tested)
+    result['expected_in_sitemap'] = sitemap_handler.check_url_in_sitemap(result['full_url'])['in_sitemap']
+    # For original URL, prepare it the same way to check if it's properly removed
+    # Use preserve_trailing_slash=True to distinguish between URLs with/without trailing slashes
+    original_prepared = tester._prepare_url(url_data['original_url'])
+    result['original_removed'] = not sitemap_handler.check_url_in_sitemap(original_prepared, preserve_trailing_slash=True)['in_sitemap']
+    result['sitemap_compliant'] = result['expected_in_sitemap'] and result['original_removed']
+    result['success'] = result['url_accessible'] and result['sitemap_compliant']  # Combined success
+    if result.get('redirect_check') and not result['redirect_check']['verified']:
+        result['success'] = False  # Original URL must 301 straight to the expected URL
+    if not result['expected_in_sitemap']:
+        result['sitemap_suggestions'] = sitemap_handler.suggest_sitemap_matches(result['full_url'])
+    return result
+
+
+def apply_remove_sitemap_checks(result, url_data, tester, sitemap_handler):
+    """Add sitemap compliance checks to a remove test result."""
+    # Removal URLs should NOT be in sitemap
+    prepared_url = tester._prepare_url(url_data['original_url'])
+    result['removed_from_sitemap'] = not sitemap_handler.check_url_in_sitemap(prepared_url)['in_sitemap']
+    result['url_inaccessible'] = not result['success']  # Should be inaccessible (success=False is good)
+    result['expected_in_sitemap'] = False  # Removal URLs should not be in sitemap
+    result['sitemap_compliant'] = result['removed_from_sitemap']
+    result['fully_removed'] = result['removed_from_sitemap'] and result['url_inaccessible']
+    return result
+
+
+def apply_content_baseline(result, parser):
+    """Compare the live body hash with the crawl export's Hash for the tested URL."""
+    metadata = parser.get_page_metadata(result['url'])
+    if metadata and metadata.get('hash') and result.get('content_hash'):
+        result['baseline_hash'] = str(metadata['hash']).lower()
+        result['hash_match'] = result['content_hash'] == result['baseline_hash']
+    return result
+
+
+def apply_head_checks(result, parser, sitemap_handler):
+    """Check the target page's canonical and meta robots and compare its head with the crawl export (if parser)."""
+    head = result.get('page_head')
+    if not head:
+        return result
+
+    issues = []
+    if 'noindex' in head['meta_robots'].lower():
+        issues.append(f"meta robots '{head['meta_robots']}'")
+    if head['canonical']:
+        canonical = sitemap_handler.normalize_url_for_comparison(urljoin(result['full_url'], head['canonical']))
+        if canonical != sitemap_handler.normalize_url_for_comparison(result['full_url']):
+            issues.append(f"canonical points to {head['canonical']}")
+
+    changes = []
+    metadata = parser.get_page_metadata(result['url']) if parser else None
+    if metadata:
+        for field, label in (('title', 'Title'), ('canonical', 'Canonical'), ('meta_robots', 'Meta Robots')):
+            baseline = str(metadata.get(field, '')).strip()
+            if baseline and baseline != head[field]:
+                changes.append(label)
+
+    result['head_issues'] = issues
+    result['head_changes'] = changes
+    if issues:
+        result['success'] = False
+    return result
@@ -0,0 +1,252 @@
+"""
+Adaptive per-host concurrency control for URL testing.
+
+Each host gets its own AIMD (additive increase, multiplicative decrease) limit:
+- The limit grows by roughly one slot per window of successful requests while
+  the observed p95 latency stays close to the host's baseline.
+- The limit is cut multiplicatively on timeouts, connection errors, 429/503
+  responses or a p95 that rises well above the baseline.
+
+QA boxes slow down under load while production sits behind a CDN, so the
+limits converge to very different values per environment without hand-tuning.
+
+A slot covers the whole exchange: for streamed responses it is handed to the
+response and released only when the body has been read or discarded (the
+response is closed), so the limit bounds concurrent body downloads and the
+latency samples include the download, not just the time to the headers.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict
+from config import Config
+
+
+class HostConcurrencyState:
+    """Concurrency limit and latency statistics for a single host."""
+
+    def __init__(self, initial_limit: float, window: int):
+        """Initialize host state with a starting limit and latency window size."""
+        self.limit = initial_limit
+        self.in_flight = 0
+        self.latencies = deque(maxlen=window)
+        self.samples_since_evaluation = 0
+        self.baseline_p95 = None
+        self.last_p95 = None
+        self.last_decrease = 0.0
+        self.total_requests = 0
+        self.congestion_events = 0
+        self.peak_limit = initial_limit
+
+
+class RequestSlot:
+    """Outcome holder for a single in-flight request."""
+
+    def __init__(self, host: str):
+        """Initialize slot for host."""
+        self.host = host
+        self.status_code = None
+        self.error = None
+        self.wait_time = 0.0
+        self.held = False
+        self._release = None
+
+    def hold_until_closed(self, response):
+        """Keep the slot after the ``with`` block until response is closed (its body read or discarded)."""
+        close = response.close
+
+        def close_and_release():
+            try:
+                close()
+            finally:
+                self.release()
+
+        response.close = close_and_release
+        self.held = True
+
+    def release(self):
+        """Release the slot (only the first call counts)."""
+        release, self._release = self._release, None
+        if release:
+            release()
+
+
+class AdaptiveConcurrencyController:
+    """Per-host AIMD concurrency limiter driven by latency and error signals."""
+
+    def __init__(self, initial: int = None, minimum: int = None, maximum: int = None,
+                 adaptive: bool = None):
+        """
+        Initialize controller.
+
+        Args:
+            initial: Starting in-flight limit per host
+            minimum: Lower bound for the per-host limit
+            maximum: Upper bound for the per-host limit
+            adaptive: If False, every host is pinned at the maximum limit
+        """
+        self.maximum = maximum or Config.MAX_CONCURRENCY
+        self.minimum = min(minimum or Config.MIN_CONCURRENCY, self.maximum)
+        self.initial = max(self.minimum, min(initial or Config.INITIAL_CONCURRENCY, self.maximum))
+        self.adaptive = Config.ADAPTIVE_CONCURRENCY if adaptive is None else adaptive
+        self._hosts = {}
+        self._condition = threading.Condition()
+
+    def _get_state(self, host: str) -> HostConcurrencyState:
+        """Get or create state for host (caller must hold the condition lock)."""
+        state = self._hosts.get(host)
+        if state is None:
+            initial = self.initial if self.adaptive else self.maximum
+            state = HostConcurrencyState(initial, Config.LATENCY_WINDOW)
+            self._hosts[host] = state
+        return state
+
+    def acquire(self, host: str):
+        """Block until host has a free slot, then reserve it."""
+        with self._condition:
+            state = self._get_state(host)
+            while state.in_flight >= int(state.limit):
+                self._condition.wait()
+            state.in_flight += 1
+
+    def release(self, host: str, latency: float, status_code: int = None, error: str = None):
+        """Release a slot and feed the request outcome into the host's limit."""
+        with self._condition:
+            state = self._get_state(host)
+            state.in_flight = max(0, state.in_flight - 1)
+            state.total_requests += 1
+
+            if self.adaptive:
+                self._update_limit(state, latency, status_code, error)
+
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, host: str):
+        """
+        Context manager wrapping one request to host.
+
+        The caller records ``status_code`` or ``error`` on the yielded slot;
+        latency and time spent queued for the slot are measured here.
+        Exceptions escaping the block count as errors. A slot the caller
+        hands to a streamed response (``hold_until_closed``) is released,
+        and its latency measured, when the response is closed instead.
+        """
+        request_slot = RequestSlot(host)
+        queued_at = time.time()
+        self.acquire(host)
+        start_time = time.time()
+        request_slot.wait_time = start_time - queued_at
+        request_slot._release = lambda: self.release(host, time.time() - start_time,
+                                                     request_slot.status_code, request_slot.error)
+        try:
+            yield request_slot
+        except Exception as e:
+            request_slot.error = request_slot.error or type(e).__name__
+            request_slot.release()
+            raise
+        if not request_slot.held:
+            request_slot.release()
+
+    def _update_limit(self, state: HostConcurrencyState, latency: float,
+                      status_code: int = None, error: str = None):
+        """Apply AIMD rules for one completed request."""
+        if error or status_code in Config.BACKOFF_STATUS_CODES:
+            self._decrease(state)
+            return
+
+        state.latencies.append(latency)
+        state.samples_since_evaluation += 1
+
+        if state.samples_since_evaluation >= state.latencies.maxlen:
+            state.samples_since_evaluation = 0
+            p95 = self._percentile(state.latencies, 95)
+            state.last_p95 = p95
+
+            if state.baseline_p95 is None:
+                state.baseline_p95 = p95
+            elif p95 > state.baseline_p95 * Config.LATENCY_TOLERANCE:
+                self._decrease(state)
+                # Let the baseline drift so a permanently slower host stops triggering backoff
+                state.baseline_p95 = state.baseline_p95 * 0.9 + p95 * 0.1
+                return
+            else:
+                state.baseline_p95 = min(p95, state.baseline_p95 * 0.9 + p95 * 0.1)
+
+        # Additive increase: about one extra slot per `limit` successful requests
+        state.limit = min(float(self.maximum), state.limit + 1.0 / state.limit)
+        state.peak_limit = max(state.peak_limit, state.limit)
+
+    def _decrease(self, state: HostConcurrencyState):
+        """Multiplicatively reduce the host limit, at most once per cooldown period."""
+        now = time.time()
+        if now - state.last_decrease < Config.CONCURRENCY_DECREASE_COOLDOWN:
+            return
+
+        state.last_decrease = now
+        state.congestion_events += 1
+        state.limit = max(float(self.minimum), state.limit * Config.CONCURRENCY_DECREASE_FACTOR)
+        state.latencies.clear()
+        state.samples_since_evaluation = 0
+
+    @staticmethod
+    def _percentile(values, percentile: int) -> float:
+        """Nearest-rank percentile of a sequence of numbers."""
+        ordered = sorted(values)
+        if not ordered:
+            return 0.0
+        rank = max(0, min(len(ordered) - 1, int(round(percentile / 100 * len(ordered))) - 1))
+        return ordered[rank]
+
+    def get_limit(self, host: str) -> int:
+        """Get the current in-flight limit for host."""
+        with self._condition:
+            return int(self._get_state(host).limit)
+
+    def get_stats(self) -> Dict:
+        """Get per-host concurrency statistics."""
+        with self._condition:
+            return {
+                host: {
+                    'limit': int(state.limit),
+                    'peak_limit': int(state.peak_limit),
+                    'requests': state.total_requests,
+                    'congestion_events': state.congestion_events,
+                    'p95_latency': round(state.last_p95, 3) if state.last_p95 is not None else None,
+                    'baseline_p95': round(state.baseline_p95, 3) if state.baseline_p95 is not None else None
+                }
+                for host, state in self._hosts.items()
+            }
+
+
+class RateLimiter:
+    """Token bucket limiting the overall request rate (all hosts, all threads)."""
+
+    def __init__(self, rate: float, burst: int = None):
+        """
+        Initialize limiter.
+
+        Args:
+            rate: Requests per second
+            burst: Requests that may start at once after an idle period (default: one second's worth)
+        """
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Wait for a request slot; returns the seconds waited."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Reserve the token now and sleep outside the lock, so waiters queue in order
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+        if wait:
+            time.sleep(wait)
+        return wait
@@ -21,12 +21,167 @@ class Config:
     # Request settings
     REQUEST_TIMEOUT = 5  # seconds
     MAX_RETRIES = 3
-    RETRY_DELAY = 1  # seconds between retries
+    RETRY_DELAY = 1  # base delay for full-jitter exponential backoff (seconds)
+    RETRY_MAX_DELAY = 10  # cap on a single backoff or Retry-After wait (seconds)
+    RETRY_STATUS_CODES = [429, 502, 503, 504]
+
+    # Per-host circuit breaker (see retry_policy.py)
+    CIRCUIT_ERROR_THRESHOLD = 0.5  # error rate that opens the circuit
+    CIRCUIT_MIN_REQUESTS = 5       # outcomes needed before the error rate counts
+    CIRCUIT_WINDOW = 20            # recent outcomes considered per host
+    CIRCUIT_COOLDOWN = 30          # seconds to fast-fail before probing again
+
+    # Concurrency settings (per-host adaptive limits, see concurrency.py)
+    ADAPTIVE_CONCURRENCY = True
+    MAX_CONCURRENCY = 16       # upper bound per host; also the worker thread count
+    MIN_CONCURRENCY = 1
+    INITIAL_CONCURRENCY = 4
+    CONCURRENCY_DECREASE_FACTOR = 0.5
+    CONCURRENCY_DECREASE_COOLDOWN = 1.0  # seconds between multiplicative decreases
+    RATE_LIMIT = None          # overall requests per second (None: unlimited)
+    STREAM_POLL_INTERVAL = 0.25  # seconds between stop checks while tests are in flight
+    STREAM_BUFFER_SIZE = 100   # results astream_tests holds for a slow consumer
+    LATENCY_WINDOW = 20        # completed requests per p95 evaluation
+    LATENCY_TOLERANCE = 1.5    # p95 above baseline * tolerance counts as congestion
+    BACKOFF_STATUS_CODES = [429, 503]
+
+    # Connection management for HTTP/1.1 (see connections.py)
+    USE_DNS_CACHE = True
+    DNS_CACHE_TTL = 300        # seconds addresses are kept when the record TTL is unknown
+    DNS_CACHE_MIN_TTL = 5      # lower bound for record TTLs
+    PREWARM_CONNECTIONS = 4    # keep-alive connections opened to the tested host before testing
+    EXTERNAL_HOSTS = ['help.californiapsychics.com']  # non-environment hosts the CSVs link to
+
+    # HTTP/2 transport (optional, requires httpx[http2]; see transport.py)
+    USE_HTTP2 = False
+    HTTP2_MAX_CONNECTIONS = 8  # pooled connections shared by all hosts
+
+    # Sitemap URL storage (see url_store.py)
+    SITEMAP_BLOOM_MIN_URLS = 100000  # add a Bloom prefilter for sitemaps at least this large
+
+    # Child sitemaps of a sitemap index cached between runs (see sitemap_cache.py)
+    USE_SITEMAP_CACHE = True
+    SITEMAP_CACHE_DIR = os.path.join('output', 'sitemap_cache')
+
+    # Sitemap snapshots and diffs (see sitemap_diff.py)
+    SNAPSHOT_DIR = os.path.join('output', 'snapshots')
+    SNAPSHOT_KEEP = 20                  # newest snapshots kept per file and environment (None: keep all)
+    SITEMAP_DIFF_SAMPLE_SIZE = 10  # example URLs per change type kept for reports
+
+    # Sharded runs (see sharding.py)
+    SHARD = None                        # (index, count) while testing one shard of a file
+    SHARD_DIR = os.path.join('output', 'shards')
+    SITEMAP_SNAPSHOT = None             # snapshot path judged against instead of the live sitemap
+
+    # Priority scheduling, fail-fast and deadlines (see scheduler.py)
+    PRIORITY_SCHEDULING = True          # test likely failures first instead of CSV order
+    PRIORITY_HISTORY_FILES = 5          # earlier results CSVs read for last outcomes
+    PRIORITY_WEIGHT_FAILED = 100        # failed in the latest earlier run
+    PRIORITY_WEIGHT_NEW = 50            # not tested by any earlier run
+    PRIORITY_WEIGHT_AGE = 20            # full weight once the last result is PRIORITY_AGE_HORIZON old
+    PRIORITY_WEIGHT_LATENCY = 30        # full weight at REQUEST_TIMEOUT response time
+    PRIORITY_AGE_HORIZON = 7 * 24 * 3600
+    FAIL_FAST = None                    # stop after this many failed tests
+    DEADLINE = None                     # stop starting tests after this many seconds
+    UNTESTED_SAMPLE_SIZE = 10           # untested URLs listed in the console summary
+
+    # Stratified sampling for smoke runs (see sampling.py)
+    SAMPLE_SIZE = None                  # test this many URLs of each file
+    SAMPLE_RATE = None                  # or this fraction of them
+    SAMPLE_SEED = None                  # random seed (chosen and printed if None)
+    SAMPLE_CONFIDENCE = 0.95            # confidence level of reported pass-rate intervals
+    SAMPLE_STRATA_SHOWN = 5             # strata with failures listed in the sampling summary
+
+    # Checkpoint journal for resumable runs (see checkpoint.py)
+    USE_CHECKPOINTS = True
+    RESUME = False                      # continue the interrupted run recorded in the journal
+    CHECKPOINT_DIR = os.path.join('output', 'checkpoints')
+    CHECKPOINT_FSYNC_INTERVAL = 100     # records written between fsyncs
+
+    # Run history database (see run_store.py)
+    RECORD_HISTORY = True
+    HISTORY_DB = os.path.join('output', 'history.sqlite')
+    HISTORY_TIMELINE_RUNS = 30          # latest runs shown in a URL timeline
+    HISTORY_FLAKY_RUNS = 20             # latest runs scanned for flaky URLs
+    HISTORY_FLAKY_MIN_FLIPS = 2         # outcome changes between runs that make a URL flaky
+    HISTORY_TREND_DAYS = 30             # days of latency trend shown
+    HISTORY_ROWS_SHOWN = 25             # flaky URLs listed
+
+    # Run profiling (see profiling.py)
+    PROFILE = False                     # print a per-stage time and memory breakdown of each run
+    PROFILE_OUTPUT = None               # write a cProfile of the whole run (all threads) to this pstats file
+
+    # Structured event stream (see events.py)
+    EVENTS = None                       # JSON Lines event file ('-' for stdout)
+    EVENTS_FLUSH_INTERVAL = 0.5         # seconds between flushes of written events
+    EVENTS_BUFFER_SIZE = 64 * 1024      # write buffer of the event file (bytes)
+
+    # Crawl for internal links to redirected or removed URLs (see crawler.py)
+    CRAWL_MAX_PAGES = 10000             # pages fetched at most per crawl
+    CRAWL_MAX_DEPTH = None              # links followed from the sitemap URLs at most (None: unlimited)
+    CRAWL_HOST_RATE = 10                # requests per second per host
+    CRAWL_PARSER_WORKERS = 2            # threads extracting links from downloaded pages
+    CRAWL_MAX_PAGE_BYTES = 2 * 1024 * 1024  # page bytes read for link extraction
+    CRAWL_SKIP_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.ico', '.css', '.js', '.pdf',
+                             '.zip', '.mp3', '.mp4', '.xml', '.txt', '.woff', '.woff2')
+    CRAWL_USER_AGENT = 'Mozilla/5.0 (compatible; SitemapQA-LinkCrawler)'
+    CRAWL_TARGETS_SHOWN = 10            # most linked targets listed in the crawl summary
+
+    # Long-running watch mode (see watcher.py)
+    WATCH_INTERVAL = 300                # seconds between sitemap revalidations
+    WATCH_MAX_RESULT_AGE = 3600         # re-check URLs whose last result is older than this (seconds)
+
+    # Near-match suggestions for URLs missing from the sitemap (see url_suggester.py)
+    SUGGESTION_COUNT = 3           # suggestions reported per missing URL
+    SUGGESTION_CANDIDATES = 20     # index candidates re-scored per missing URL
+    SUGGESTION_MIN_SCORE = 0.6     # minimum path similarity (0-1) to report
+    SUGGESTION_MAX_POSTINGS = 1000 # candidate pool size per missing URL before re-scoring
+
+    # Response body inspection and soft-404 detection (see content_inspector.py)
+    INSPECT_FULL_BODY = True            # hash whole bodies; False stops downloads at </head> (no content checks)
+    CONTENT_CHUNK_SIZE = 65536          # bytes read per streamed chunk
+    MIN_CONTENT_SIZE = 100              # smaller 200 bodies are reported as suspiciously small
+    CONTENT_SKETCH_SIZE = 128           # shingle hashes kept per body for similarity estimates
+    CONTENT_BANDS = 4                   # sketch bands used to find near-identical bodies
+    CONTENT_BAND_WIDTH = 8              # sketch hashes per band
+    CONTENT_BAND_CANDIDATES = 16        # clusters compared per band
+    SOFT_404_SIMILARITY = 0.9           # similarity to the not-found page that counts as a soft 404
+    SOFT_404_CLUSTER_SIMILARITY = 0.98  # similarity at which bodies count as near-identical
+    SOFT_404_CLUSTER_SIZE = 10          # near-identical bodies across this many URLs are soft 404s
+
+    # Redirect verification of original URLs (see URLTester.verify_redirect)
+    VERIFY_REDIRECTS = True
+    MAX_REDIRECT_HOPS = 5               # extra hops probed to detect redirect chains
+
+    # Response-time regressions against the export's Response Time (see performance.py)
+    REGRESSION_RATIO = 2.0              # live time must be at least this multiple of the baseline...
+    REGRESSION_MIN_DELTA = 0.3          # ...and at least this many seconds slower
+    REGRESSION_SAMPLES = 3              # timings (median) used to confirm a flagged URL
+    REGRESSION_MIN_PREFIX_URLS = 5      # URLs needed before a path prefix can be flagged
+    REGRESSION_ALPHA = 0.05             # sign-test significance for path prefix slowdowns
+
+    # <head> checks on redirect targets (see head_parser.py)
+    HEAD_MAX_BYTES = 262144             # stop looking for </head> after this many bytes
+    HEAD_PARSER_WORKERS = 2             # threads parsing collected <head> bytes
+
+    # Crawl export columns read by name for per-URL baselines (see CSVParser.get_page_metadata)
+    CSV_METADATA_COLUMNS = {
+        'address': 'Address',
+        'hash': 'Hash',
+        'size': 'Size (bytes)',
+        'response_time': 'Response Time',
+        'title': 'Title 1',
+        'meta_robots': 'Meta Robots 1',
+        'canonical': 'Canonical Link Element 1',
+        'inlinks': 'Inlinks',
+        'unique_inlinks': 'Unique Inlinks'
+    }
 
     # File paths
     INPUT_DIR = 'in'
     OUTPUT_DIR = 'output'
     CSV_FILE = 'Psychics.csv'
+    CSV_FAST_PATH_MAX_BYTES = 20 * 1024 * 1024  # read smaller CSVs with the stdlib csv module instead of pandas
 
     # CSV column mappings for different files (0-based indices)
     CSV_COLUMN_MAPPINGS = {
@@ -64,6 +219,8 @@ class Config:
     TIMESTAMP = datetime.now().strftime('%Y-%m-%d')
     RESULTS_CSV = f'test_results_{TIMESTAMP}.csv'
     REPORT_HTML = f'test_report_{TIMESTAMP}.html'
+    HTML_REPORT_WORKERS = 4        # report sections rendered concurrently (see html_report.py)
+    HTML_REPORT_CHUNK_SIZE = 1024 * 1024  # bytes copied per write when assembling the report
 
     # Display settings
     ENABLE_COLORS = True
@@ -184,7 +341,7 @@ class Config:
         csv_file = csv_file or cls.CSV_FILE
         env = env or cls.CURRENT_ENV
         csv_name = csv_file.replace('.csv', '')
-        return f'test_results_{csv_name}_{env}_{cls.TIMESTAMP}.csv'
+        return f'test_results_{csv_name}_{env}{cls.get_shard_suffix()}_{cls.TIMESTAMP}.csv'
 
     @classmethod
     def get_report_filename(cls, csv_file=None, env=None):
@@ -192,4 +349,85 @@ class Config:
         csv_file = csv_file or cls.CSV_FILE
         env = env or cls.CURRENT_ENV
         csv_name = csv_file.replace('.csv', '')
-        return f'test_report_{csv_name}_{env}_{cls.TIMESTAMP}.html'
\ No newline at end of file
+        return f'test_report_{csv_name}_{env}{cls.get_shard_suffix()}_{cls.TIMESTAMP}.html'
+
+    @classmethod
+    def get_performance_csv_path(cls, csv_file=None, env=None):
+        """Get full path to the response-time regression CSV file."""
+        csv_file = csv_file or cls.CSV_FILE
+        env = env or cls.CURRENT_ENV
+        csv_name = csv_file.replace('.csv', '')
+        return cls.get_output_file_path(f'performance_{csv_name}_{env}{cls.get_shard_suffix()}_{cls.TIMESTAMP}.csv')
+
+    @classmethod
+    def get_crawl_links_path(cls, csv_file=None, env=None):
+        """Get path of the crawl's CSV of links to redirected or removed URLs."""
+        csv_file = csv_file or cls.CSV_FILE
+        env = env or cls.CURRENT_ENV
+        csv_name = csv_file.replace('.csv', '')
+        return cls.get_output_file_path(f'stale_links_{csv_name}_{env}_{cls.TIMESTAMP}.csv')
+
+    @classmethod
+    def get_shard_suffix(cls, shard=None):
+        """Filename tag of a shard, e.g. '_shard-2-of-4' ('' when not sharded)."""
+        shard = shard or cls.SHARD
+        return f'_shard-{shard[0]}-of-{shard[1]}' if shard else ''
+
+    @classmethod
+    def get_shard_results_path(cls, csv_file=None, env=None, shard=None):
+        """Get path of a shard's JSON Lines result dump, read back by the merge command."""
+        csv_file = csv_file or cls.CSV_FILE
+        env = env or cls.CURRENT_ENV
+        csv_name = csv_file.replace('.csv', '')
+        os.makedirs(cls.SHARD_DIR, exist_ok=True)
+        return os.path.join(cls.SHARD_DIR, f'results_{csv_name}_{env}{cls.get_shard_suffix(shard)}.jsonl')
+
+    @classmethod
+    def get_untested_csv_path(cls, csv_file=None, env=None):
+        """Get path for the URLs a run stopped before testing (--fail-fast/--deadline)."""
+        csv_file = csv_file or cls.CSV_FILE
+        env = env or cls.CURRENT_ENV
+        csv_name = csv_file.replace('.csv', '')
+        return cls.get_output_file_path(f'untested_{csv_name}_{env}{cls.get_shard_suffix()}_{cls.TIMESTAMP}.csv')
+
+    @classmethod
+    def get_checkpoint_path(cls, csv_file=None, env=None, shard=None):
+        """Get path of the checkpoint journal of a file's run (one per file, environment and shard)."""
+        csv_file = csv_file or cls.CSV_FILE
+        env = env or cls.CURRENT_ENV
+        csv_name = csv_file.replace('.csv', '')
+        os.makedirs(cls.CHECKPOINT_DIR, exist_ok=True)
+        return os.path.join(cls.CHECKPOINT_DIR, f'journal_{csv_name}_{env}{cls.get_shard_suffix(shard)}.jsonl')
+
+    @classmethod
+    def get_watch_history_path(cls, csv_file=None, env=None):
+        """Get path of the JSON Lines result history appended by watch mode."""
+        csv_file = csv_file or cls.CSV_FILE
+        env = env or cls.CURRENT_ENV
+        csv_name = csv_file.replace('.csv', '')
+        return cls.get_output_file_path(f'watch_history_{csv_name}_{env}.jsonl')
+
+    @classmethod
+    def get_snapshot_path(cls, csv_file=None, env=None, stamp=None):
+        """
+        Get path for a sitemap snapshot.
+
+        stamp defaults to the current time to the microsecond plus a random
+        suffix, so runs saving snapshots at the same moment (e.g. parallel
+        shards) do not overwrite each other and names still sort by time.
+        """
+        csv_file = csv_file or cls.CSV_FILE
+        env = env or cls.CURRENT_ENV
+        csv_name = csv_file.replace('.csv', '')
+        stamp = stamp or f"{datetime.now().strftime('%Y-%m-%d_%H%M%S_%f')}-{os.urandom(2).hex()}"
+        os.makedirs(cls.SNAPSHOT_DIR, exist_ok=True)
+        return os.path.join(cls.SNAPSHOT_DIR, f'sitemap_{csv_name}_{env}_{stamp}.tsv')
+
+    @classmethod
+    def get_sitemap_diff_csv_path(cls, csv_file=None, env=None, against=None):
+        """Get path for a sitemap diff CSV against another environment or snapshot."""
+        csv_file = csv_file or cls.CSV_FILE
+        env = env or cls.CURRENT_ENV
+        csv_name = csv_file.replace('.csv', '')
+        against = against or 'previous'
+        return cls.get_output_file_path(f'sitemap_diff_{csv_name}_{env}_vs_{against}_{cls.TIMESTAMP}.csv')
@@ -0,0 +1,277 @@
+"""
+Connection management for the HTTP/1.1 session.
+
+Without it, every run resolved and handshaked to the environment hosts lazily,
+so the first burst of concurrent requests all raced to open connections and
+the earliest timings included DNS and TLS setup. ConnectionManager
+- sizes the session's connection pools to Config.MAX_CONCURRENCY, so every
+  worker thread keeps its own keep-alive connection per host
+- resolves the environment hosts once through an in-process DNS cache that
+  keeps their A and AAAA addresses for the record's TTL (with dnspython
+  installed) or Config.DNS_CACHE_TTL otherwise
+- pre-opens Config.PREWARM_CONNECTIONS connections to the tested host before
+  testing starts, with concurrent HEAD requests through the session
+- reports how many requests reused a pooled connection
+
+Only the session's own adapter is affected: its pool manager creates pools
+whose connections count every TCP connection actually opened to a registered
+host (pool counters miss reconnects of dropped keep-alive connections) and
+connect to the addresses in the DNS cache; other hosts, sessions and urllib3
+users connect as before. A host whose cached addresses all refuse
+connections is resolved again on next use.
+"""
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util import connection as urllib3_connection
+from config import Config
+
+try:
+    import dns.resolver
+    DNSPYTHON_AVAILABLE = True
+except ImportError:
+    dns = None
+    DNSPYTHON_AVAILABLE = False
+
+
+class DNSCache:
+    """In-process cache of resolved addresses for registered hosts."""
+
+    def __init__(self):
+        """Initialize an empty cache."""
+        self.hosts = set()
+        self._entries: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self.stats = {'lookups': 0, 'hits': 0, 'resolutions': 0, 'failures': 0}
+
+    def register(self, hosts: Iterable[str]):
+        """Serve these hosts from the cache."""
+        with self._lock:
+            self.hosts.update(host.lower() for host in hosts if host)
+
+    def resolve(self, host: str) -> List[str]:
+        """
+        Get the addresses of a host, resolving it if the cached entry expired.
+
+        Raises:
+            socket.gaierror: If the host cannot be resolved
+        """
+        host = host.lower()
+        with self._lock:
+            self.stats['lookups'] += 1
+            entry = self._entries.get(host)
+            if entry and entry[1] > time.time():
+                self.stats['hits'] += 1
+                return entry[0]
+
+        try:
+            addresses, ttl = self._query(host)
+        except socket.gaierror:
+            with self._lock:
+                self.stats['failures'] += 1
+            raise
+
+        ttl = max(Config.DNS_CACHE_MIN_TTL, ttl)
+        with self._lock:
+            self.stats['resolutions'] += 1
+            self._entries[host] = (addresses, time.time() + ttl)
+        return addresses
+
+    @staticmethod
+    def _query(host: str):
+        """Resolve a host to (IPv4 then IPv6 addresses, ttl seconds)."""
+        if DNSPYTHON_AVAILABLE:
+            addresses, ttls = [], []
+            for record_type in ('A', 'AAAA'):
+                try:
+                    answer = dns.resolver.resolve(host, record_type)
+                except Exception:
+                    continue  # no records of this type
+                addresses += [record.address for record in answer]
+                ttls.append(answer.rrset.ttl)
+            if addresses:
+                return addresses, min(ttls)
+            # e.g. /etc/hosts or IP literal: use the system resolver
+
+        infos = socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        return addresses, Config.DNS_CACHE_TTL
+
+    def invalidate(self, host: str):
+        """Drop a host's cached addresses."""
+        with self._lock:
+            self._entries.pop(host.lower(), None)
+
+
+dns_cache = DNSCache()
+connects: Dict[str, int] = {}  # TCP connections opened per registered host
+_connects_lock = threading.Lock()
+
+
+class CachedDNSConnectionMixin:
+    """urllib3 connection counting connections to registered hosts and resolving them from the DNS cache."""
+
+    def _new_conn(self):
+        """Open the TCP connection (to a cached address for registered hosts)."""
+        host = self.host.lower()
+        if host not in dns_cache.hosts:
+            return super()._new_conn()
+
+        with _connects_lock:
+            connects[host] = connects.get(host, 0) + 1
+        if not Config.USE_DNS_CACHE:
+            return super()._new_conn()
+
+        error = None
+        try:
+            for ip in dns_cache.resolve(host):
+                try:
+                    return urllib3_connection.create_connection((ip, self.port), self.timeout,
+                                                                source_address=self.source_address,
+                                                                socket_options=self.socket_options)
+                except socket.timeout:
+                    raise ConnectTimeoutError(
+                        self, f"Connection to {self.host} timed out. (connect timeout={self.timeout})")
+                except OSError as e:
+                    error = e
+        except socket.gaierror as e:
+            error = e
+        dns_cache.invalidate(host)
+        raise NewConnectionError(self, f"Failed to establish a new connection: {error or 'no addresses'}")
+
+
+class CachedDNSHTTPConnection(CachedDNSConnectionMixin, HTTPConnection):
+    """HTTP connection resolved through the DNS cache."""
+
+
+class CachedDNSHTTPSConnection(CachedDNSConnectionMixin, HTTPSConnection):
+    """HTTPS connection resolved through the DNS cache."""
+
+
+class CachedDNSHTTPConnectionPool(HTTPConnectionPool):
+    """HTTP pool of CachedDNSHTTPConnection."""
+
+    ConnectionCls = CachedDNSHTTPConnection
+
+
+class CachedDNSHTTPSConnectionPool(HTTPSConnectionPool):
+    """HTTPS pool of CachedDNSHTTPSConnection."""
+
+    ConnectionCls = CachedDNSHTTPSConnection
+
+
+class CachedDNSAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools connect through the DNS cache."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        """Create the pool manager with the DNS cache pool classes."""
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': CachedDNSHTTPConnectionPool,
+            'https': CachedDNSHTTPSConnectionPool,
+        }
+
+
+class ConnectionManager:
+    """Pools, DNS cache and pre-warmed connections of a requests.Session."""
+
+    def __init__(self, session: requests.Session, hosts: Iterable[str] = ()):
+        """
+        Mount pools sized to Config.MAX_CONCURRENCY on session.
+
+        Args:
+            session: Session used for URL tests
+            hosts: Hosts to resolve through the DNS cache
+        """
+        self.session = session
+        self.hosts = [host for host in dict.fromkeys(hosts) if host]
+        self.prewarmed = 0
+        dns_cache.register(self.hosts)
+        self._connects_at_start = self._connects()
+
+        self.adapter = CachedDNSAdapter(pool_connections=len(self.hosts) + 1, pool_maxsize=Config.MAX_CONCURRENCY)
+        session.mount('https://', self.adapter)
+        session.mount('http://', self.adapter)
+
+    def _connects(self) -> int:
+        """TCP connections opened to this manager's hosts so far in this process."""
+        with _connects_lock:
+            return sum(connects.get(host.lower(), 0) for host in self.hosts)
+
+    def resolve_hosts(self) -> Dict[str, Optional[List[str]]]:
+        """Resolve all hosts concurrently; None for hosts that do not resolve."""
+        if not Config.USE_DNS_CACHE or not self.hosts:
+            return {}
+
+        def resolve(host):
+            try:
+                return dns_cache.resolve(host)
+            except socket.gaierror:
+                return None
+
+        with ThreadPoolExecutor(max_workers=len(self.hosts)) as executor:
+            return dict(zip(self.hosts, executor.map(resolve, self.hosts)))
+
+    def prewarm(self, url: str, count: int) -> int:
+        """
+        Open up to count keep-alive connections to url's host with concurrent HEAD requests.
+
+        Returns:
+            Number of connections opened
+        """
+        count = min(count, Config.MAX_CONCURRENCY)
+        if count <= 0:
+            return 0
+
+        def head(_):
+            try:
+                self.session.head(url, allow_redirects=False, timeout=Config.REQUEST_TIMEOUT).close()
+            except requests.exceptions.RequestException:
+                pass
+
+        connects_before = self._connects()
+        with ThreadPoolExecutor(max_workers=count) as executor:
+            list(executor.map(head, range(count)))
+        opened = self._connects() - connects_before
+
+        self.prewarmed += opened
+        return opened
+
+    def warm_up(self, url: str, count: int) -> Dict:
+        """Resolve the hosts and pre-open connections to url's host; returns what was done."""
+        start_time = time.time()
+        resolved = self.resolve_hosts()
+        opened = self.prewarm(url, count)
+        return {
+            'host': urlparse(url).netloc,
+            'resolved': resolved,
+            'connections': opened,
+            'duration': round(time.time() - start_time, 3)
+        }
+
+    def get_stats(self) -> Dict:
+        """Connection reuse and DNS cache statistics."""
+        requests_made = 0
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                requests_made += pool.num_requests
+        connections = self._connects() - self._connects_at_start
+
+        return {
+            'requests': requests_made,
+            'connections': connections,
+            'prewarmed': self.prewarmed,
+            'reused': max(0, requests_made - connections),
+            'reuse_rate': round(max(0, requests_made - connections) / requests_made, 3) if requests_made else None,
+            'dns': dict(dns_cache.stats) if Config.USE_DNS_CACHE else None
+        }
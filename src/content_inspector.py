@@ -0,0 +1,246 @@
+"""
+Streaming response body inspection and soft-404 detection.
+
+ContentInspector reads a streamed response chunk by chunk and keeps only:
+- an MD5 digest (the algorithm behind the crawl export's `Hash` column)
+- the byte count
+- a bottom-k sketch: the k smallest hashes of consecutive word pairs of the
+  visible text, which estimates how similar two bodies are without keeping
+  either of them
+
+Word pairs are hashed with BLAKE2b rather than the built-in hash(), which is
+randomized per process: sketches stored in a checkpoint journal stay
+comparable with the ones computed after --resume. Markup, scripts and styles
+(inline JSON-LD included) are left out of the sketch, so pages that share a
+template but not their text are not taken for near-duplicates.
+
+A 200 response is a soft 404 when its sketch matches the host's not-found page
+(fetched once per host from a random path) or when near-identical bodies come
+back for many different URLs.
+"""
+import hashlib
+import heapq
+import re
+import threading
+from typing import Dict, List, Optional
+from config import Config
+from head_parser import HEAD_END_PATTERN
+
+
+def shingle_hash(first: bytes, second: bytes) -> int:
+    """Stable 64-bit hash of a word pair (the same in every process)."""
+    return int.from_bytes(hashlib.blake2b(first + b'\0' + second, digest_size=8).digest(), 'big')
+
+
+class VisibleText:
+    """Incremental extraction of the visible text of streamed HTML."""
+
+    SKIPPED_START = re.compile(rb'<(script|style)\b', re.IGNORECASE)
+    SKIPPED_END = {b'script': re.compile(rb'</script\s*>', re.IGNORECASE),
+                   b'style': re.compile(rb'</style\s*>', re.IGNORECASE)}
+    TAG_PATTERN = re.compile(rb'<[A-Za-z/!?][^>]*>')
+    MAX_TAG_BYTES = 4096  # a '<' without '>' this far on is text, not a tag
+
+    def __init__(self):
+        """Initialize outside any tag."""
+        self.pending = b''
+        self.skip_until = None
+
+    def feed(self, chunk: bytes, final: bool = False) -> bytes:
+        """
+        Text of chunk outside tags, scripts and styles; tags become spaces.
+
+        A tag (or script/style end) split across chunks is held back until
+        the next chunk, or dropped when final.
+        """
+        data = self.pending + chunk
+        self.pending = b''
+        text = []
+        pos = 0
+        while True:
+            if self.skip_until:
+                end = self.skip_until.search(data, pos)
+                if not end:
+                    if not final:
+                        self.pending = data[max(pos, len(data) - 64):]
+                    return b''.join(text)
+                self.skip_until = None
+                pos = end.end()
+
+            start = self.SKIPPED_START.search(data, pos)
+            stop = start.start() if start else len(data)
+            if not start and not final:
+                # Hold back a tag that continues in the next chunk
+                last_open = data.rfind(b'<', pos)
+                if last_open >= 0 and data.find(b'>', last_open) < 0 and len(data) - last_open < self.MAX_TAG_BYTES:
+                    stop = last_open
+                    self.pending = data[last_open:]
+            text.append(self.TAG_PATTERN.sub(b' ', data[pos:stop]))
+            if not start:
+                return b''.join(text)
+
+            text.append(b' ')
+            self.skip_until = self.SKIPPED_END[start.group(1).lower()]
+            pos = start.end()
+
+
+class ContentInspector:
+    """Hashes and fingerprints response bodies without buffering them."""
+
+    TOKEN_CHARS = b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789'
+    TOKEN_PATTERN = re.compile(rb'[A-Za-z0-9]+')
+
+    def __init__(self, sketch_size: int = None):
+        """Initialize inspector with the number of shingle hashes kept per body."""
+        self.sketch_size = sketch_size or Config.CONTENT_SKETCH_SIZE
+        self._not_found: Dict[str, Optional[frozenset]] = {}
+        self._clusters: Dict[object, List[Dict]] = {}
+        self._cluster_list: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def inspect(self, response, collect_head: bool = False) -> Dict:
+        """
+        Stream a response body, then close the response.
+
+        Args:
+            response: Streamed response
+            collect_head: Also collect the raw bytes up to the end of <head>.
+                          Without Config.INSPECT_FULL_BODY the download stops there.
+
+        Returns:
+            Dictionary with 'hash' (MD5 hex), 'size' (bytes), 'sketch' and
+            'head' (bytes or None); hash and size are None if the body was
+            not read to the end
+        """
+        digest = hashlib.md5()
+        size = 0
+        sketch = set()
+        carry = b''
+        previous = None
+        visible = VisibleText()
+        head = bytearray() if collect_head else None
+        head_done = not collect_head
+        complete = True
+
+        def add_tokens(data):
+            nonlocal previous, sketch
+            tokens = self.TOKEN_PATTERN.findall(data)
+            if not tokens:
+                return
+            if previous is not None:
+                tokens.insert(0, previous)
+            previous = tokens[-1]
+            shingles = {shingle_hash(*pair) for pair in set(zip(tokens, tokens[1:]))}
+            sketch = set(heapq.nsmallest(self.sketch_size, sketch | shingles))
+
+        try:
+            for chunk in response.iter_content(chunk_size=Config.CONTENT_CHUNK_SIZE):
+                if not chunk:
+                    continue
+
+                if not head_done:
+                    # Rescan a few bytes before the new chunk for markers split across chunks
+                    start = max(0, len(head) - 8)
+                    head += chunk
+                    match = HEAD_END_PATTERN.search(head, start)
+                    if match:
+                        del head[match.start():]
+                        head_done = True
+                    elif len(head) >= Config.HEAD_MAX_BYTES:
+                        head_done = True
+                    if head_done and not Config.INSPECT_FULL_BODY:
+                        complete = False
+                        break
+
+                digest.update(chunk)
+                size += len(chunk)
+
+                # Hold back a token that may continue in the next chunk
+                data = carry + visible.feed(chunk)
+                cut = len(data.rstrip(self.TOKEN_CHARS))
+                carry = data[cut:]
+                add_tokens(data[:cut])
+
+            add_tokens(carry + visible.feed(b'', final=True))
+        finally:
+            response.close()
+
+        return {
+            'hash': digest.hexdigest() if complete else None,
+            'size': size if complete else None,
+            'sketch': frozenset(sketch) if complete else frozenset(),
+            'head': bytes(head) if head is not None else None
+        }
+
+    def similarity(self, a: frozenset, b: frozenset) -> float:
+        """Estimate Jaccard similarity of two bodies from their sketches."""
+        if not a and not b:
+            return 1.0
+        # Bottom-k estimator: share of the union's k smallest hashes found in both
+        union = sorted(a | b)[:self.sketch_size]
+        largest = union[-1]
+        return sum(1 for h in a & b if h <= largest) / len(union)
+
+    def has_not_found_fingerprint(self, host: str) -> bool:
+        """Check if the not-found page of host has been fingerprinted (or attempted)."""
+        return host in self._not_found
+
+    def set_not_found_fingerprint(self, host: str, inspection: Optional[Dict]):
+        """Store the not-found page sketch for host (None if it could not be fetched)."""
+        self._not_found[host] = inspection['sketch'] if inspection else None
+
+    def matches_not_found(self, host: str, inspection: Dict) -> bool:
+        """Check if a body looks like the host's not-found page."""
+        sketch = self._not_found.get(host)
+        if not sketch:
+            return False
+        return self.similarity(sketch, inspection['sketch']) >= Config.SOFT_404_SIMILARITY
+
+    def _band_keys(self, inspection: Dict) -> List:
+        """
+        Locality-sensitive keys for a body.
+
+        The sorted sketch is cut into bands; near-identical bodies share at
+        least one whole band with high probability, unrelated pages rarely do.
+        """
+        ordered = sorted(inspection['sketch'])
+        width = Config.CONTENT_BAND_WIDTH
+        bands = [tuple(ordered[i:i + width]) for i in range(0, min(len(ordered), width * Config.CONTENT_BANDS), width)]
+        return bands or [inspection['hash']]
+
+    def record(self, result: Dict, inspection: Dict):
+        """Group a 200 result with earlier results whose bodies are near-identical."""
+        keys = self._band_keys(inspection)
+
+        with self._lock:
+            for key in keys:
+                for cluster in self._clusters.get(key, ()):
+                    if (cluster['hash'] == inspection['hash'] or
+                            self.similarity(cluster['sketch'], inspection['sketch']) >= Config.SOFT_404_CLUSTER_SIMILARITY):
+                        cluster['results'].append(result)
+                        return
+
+            cluster = {'hash': inspection['hash'], 'sketch': inspection['sketch'], 'results': [result]}
+            self._cluster_list.append(cluster)
+            for key in keys:
+                candidates = self._clusters.setdefault(key, [])
+                candidates.append(cluster)
+                # Bound comparisons per key; large clusters are the ones worth matching
+                if len(candidates) > Config.CONTENT_BAND_CANDIDATES:
+                    candidates.remove(min(candidates, key=lambda c: len(c['results'])))
+
+    def reset_clusters(self):
+        """Forget recorded bodies (not-found fingerprints are kept)."""
+        with self._lock:
+            self._clusters = {}
+            self._cluster_list = []
+
+    def get_duplicate_clusters(self, min_size: int = None) -> List[List[Dict]]:
+        """Get groups of at least min_size results that returned near-identical bodies."""
+        min_size = min_size or Config.SOFT_404_CLUSTER_SIZE
+        with self._lock:
+            return [
+                cluster['results']
+                for cluster in self._cluster_list
+                if len({r['full_url'] for r in cluster['results']}) >= min_size
+            ]
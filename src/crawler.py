@@ -0,0 +1,321 @@
+"""
+Internal-link crawl that finds links still pointing at redirected or removed URLs.
+
+The crawl exports' Inlinks columns show that many pages still link to URLs
+that now 301 or are marked REMOVE; every such link costs users a redirect
+hop (or a dead end), and URL tests cannot tell which pages carry them. The
+crawl command walks the environment from its sitemap URLs and reports every
+internal link whose target is an original URL of the file's redirect or
+remove rows, with the page it was found on.
+
+- LinkTargets indexes the original URLs by a normalized key (host-less for
+  environment hosts, lowercase, no trailing slash) in a dict, so each link
+  costs one hash lookup however many rows the file has
+- LinkCrawler keeps a deduplicating FIFO frontier of site paths, bounded by
+  Config.CRAWL_MAX_PAGES and Config.CRAWL_MAX_DEPTH; links to any
+  environment host (or production URLs written out in full) are crawled on
+  the tested environment
+- fetch threads (Config.MAX_CONCURRENCY) only download; each host gets at
+  most Config.CRAWL_HOST_RATE requests per second through a RateLimiter
+- downloaded HTML is handed to a separate pool (Config.CRAWL_PARSER_WORKERS)
+  for link extraction, so parsing never holds up a download thread
+- only the crawl loop touches the frontier and results, so neither needs
+  locking
+
+Known redirected and removed URLs are reported but not crawled. Redirects
+met while crawling are followed once, as a new frontier entry.
+"""
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from html.parser import HTMLParser
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urldefrag, urljoin, urlsplit
+import requests
+from config import Config
+from concurrency import RateLimiter
+from connections import ConnectionManager
+from events import emit
+
+
+class LinkExtractor(HTMLParser):
+    """Collects the href and anchor text of <a> and <area> links (honouring <base href>)."""
+
+    def __init__(self, page_url: str):
+        """Initialize for a page, resolving relative links against page_url."""
+        super().__init__(convert_charrefs=True)
+        self.base_url = page_url
+        self.links: List[Tuple[str, str]] = []
+        self._anchor = None
+        self._text_parts = []
+
+    def handle_starttag(self, tag, attrs):
+        """Record link targets."""
+        if tag not in ('a', 'area', 'base'):
+            return
+        href = next((value for name, value in attrs if name == 'href' and value), None)
+        if href is None:
+            return
+        href = href.strip()
+        if tag == 'base':
+            self.base_url = urljoin(self.base_url, href)
+        elif tag == 'area':
+            self.links.append((href, ''))
+        else:
+            self._close_anchor()
+            self._anchor = href
+
+    def handle_endtag(self, tag):
+        """Close the open anchor."""
+        if tag == 'a':
+            self._close_anchor()
+
+    def handle_data(self, data):
+        """Collect anchor text."""
+        if self._anchor is not None:
+            self._text_parts.append(data)
+
+    def _close_anchor(self):
+        """Store the open anchor with its text."""
+        if self._anchor is not None:
+            self.links.append((self._anchor, ' '.join(''.join(self._text_parts).split())))
+            self._anchor = None
+            self._text_parts = []
+
+    def get_links(self) -> List[Tuple[str, str]]:
+        """(absolute URL without fragment, anchor text) of every link, in page order."""
+        self._close_anchor()
+        links = []
+        for href, text in self.links:
+            if href.startswith(('#', 'mailto:', 'tel:', 'javascript:', 'data:')):
+                continue
+            links.append((urldefrag(urljoin(self.base_url, href))[0], text))
+        return links
+
+
+def extract_links(data: bytes, encoding: str, page_url: str) -> List[Tuple[str, str]]:
+    """Parse page bytes into (absolute URL, anchor text) pairs."""
+    parser = LinkExtractor(page_url)
+    parser.feed(data.decode(encoding or 'utf-8', errors='replace'))
+    parser.close()
+    return parser.get_links()
+
+
+def internal_hosts(base_url: str) -> set:
+    """Hosts whose links belong to the crawled site: every environment host and the tested one."""
+    return {host.lower() for host in Config.ENVIRONMENTS.values()} | {urlsplit(base_url).netloc.lower()}
+
+
+def split_url(url: str, hosts: set) -> Tuple[str, str]:
+    """
+    Split a URL (absolute, or as written in the CSVs) into (host, path with query).
+
+    The host is '' for the site's own hosts, so the same page on any
+    environment gets the same path.
+    """
+    if url.startswith('/'):
+        url = f"https://{Config.ENVIRONMENTS['prod']}{url}"
+    elif '://' not in url:
+        url = f'https://{url}'
+    parts = urlsplit(url)
+    host = parts.netloc.lower()
+    path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+    return ('' if host in hosts else host), path
+
+
+class LinkTargets:
+    """Hashed lookup of the original URLs of a file's redirect and remove rows."""
+
+    def __init__(self, redirect_data: List[Dict], remove_data: List[Dict], hosts: set):
+        """Index the rows' original URLs (hosts: the site's own hosts, see internal_hosts)."""
+        self.hosts = hosts
+        self._targets: Dict[str, Tuple[str, Dict]] = {}
+        for test_type, rows in (('redirect', redirect_data), ('remove', remove_data)):
+            for row in rows:
+                self._targets.setdefault(self.key(row['original_url']), (test_type, row))
+
+    def key(self, url: str) -> str:
+        """Lookup key: host-less for the site's own hosts, no trailing slash, lowercase."""
+        host, path = split_url(url, self.hosts)
+        return f"{host}{path.rstrip('/') or '/'}".lower()
+
+    def match(self, url: str) -> Optional[Tuple[str, Dict]]:
+        """(test type, CSV row) of the original URL that url points at, or None."""
+        return self._targets.get(self.key(url))
+
+    def __len__(self) -> int:
+        """Number of indexed original URLs."""
+        return len(self._targets)
+
+
+class LinkCrawler:
+    """Bounded concurrent crawl of one environment collecting links to redirected or removed URLs."""
+
+    def __init__(self, environment: str, targets: LinkTargets, max_pages: int = None, max_depth: int = None):
+        """
+        Initialize crawler.
+
+        Args:
+            environment: Environment to crawl
+            targets: Original URLs whose inbound links are reported
+            max_pages: Pages fetched at most (default: Config.CRAWL_MAX_PAGES)
+            max_depth: Links followed from the seeds at most (default: Config.CRAWL_MAX_DEPTH, None: unlimited)
+        """
+        self.environment = environment
+        self.base_url = Config.get_base_url(environment)
+        self.hosts = internal_hosts(self.base_url)
+        self.targets = targets
+        self.max_pages = max_pages or Config.CRAWL_MAX_PAGES
+        self.max_depth = max_depth if max_depth is not None else Config.CRAWL_MAX_DEPTH
+        self.workers = Config.MAX_CONCURRENCY
+
+        self.session = requests.Session()
+        self.session.headers.update({'User-Agent': Config.CRAWL_USER_AGENT})
+        self.connections = ConnectionManager(self.session, [urlsplit(self.base_url).hostname])
+        self._rate_limiters: Dict[str, RateLimiter] = {}
+
+        self.frontier = deque()
+        self.seen = set()
+        self.links: List[Dict] = []
+        self._link_index: Dict[Tuple[str, str], Dict] = {}
+        self.stats = {'pages': 0, 'html_pages': 0, 'errors': 0, 'links': 0, 'internal_links': 0,
+                      'stale_links': 0, 'unvisited': 0, 'duration': 0.0}
+
+    def _enqueue(self, path: str, depth: int):
+        """Add a site path to the frontier unless seen, too deep, a known target or not a page."""
+        if path in self.seen or (self.max_depth is not None and depth > self.max_depth):
+            return
+        self.seen.add(path)
+        if self.targets.match(path) or path.split('?', 1)[0].lower().endswith(Config.CRAWL_SKIP_EXTENSIONS):
+            return
+        self.frontier.append((path, depth))
+
+    def _fetch(self, path: str, depth: int) -> Dict:
+        """Download a page (runs on a fetch thread; never parses)."""
+        url = f'{self.base_url}{path}'
+        host = urlsplit(url).netloc
+        limiter = self._rate_limiters.get(host)
+        if limiter is None:
+            limiter = self._rate_limiters.setdefault(host, RateLimiter(Config.CRAWL_HOST_RATE, burst=1))
+        limiter.acquire()
+
+        page = {'path': path, 'url': url, 'depth': depth, 'status_code': None, 'body': None,
+                'encoding': None, 'location': None, 'error': None}
+        try:
+            with self.session.get(url, timeout=Config.REQUEST_TIMEOUT, allow_redirects=False, stream=True) as response:
+                page['status_code'] = response.status_code
+                page['location'] = response.headers.get('Location')
+                content_type = response.headers.get('Content-Type', '')
+                if response.status_code == 200 and 'html' in content_type:
+                    chunks, size = [], 0
+                    for chunk in response.iter_content(64 * 1024):
+                        chunks.append(chunk)
+                        size += len(chunk)
+                        if size >= Config.CRAWL_MAX_PAGE_BYTES:
+                            break
+                    page['body'] = b''.join(chunks)
+                    # Without a charset requests assumes ISO-8859-1 for text/html; sites serve UTF-8
+                    page['encoding'] = response.encoding if 'charset=' in content_type.lower() else 'utf-8'
+        except requests.exceptions.RequestException as e:
+            page['error'] = str(e)
+        return page
+
+    def _record_links(self, page: Dict, links: List[Tuple[str, str]]):
+        """Report links to targets and queue the site's other pages."""
+        self.stats['links'] += len(links)
+        emit('crawl_page', url=page['path'], status_code=page['status_code'], depth=page['depth'], links=len(links))
+        for url, text in links:
+            if not url.startswith(('http://', 'https://')):
+                continue
+            host, path = split_url(url, self.hosts)
+            match = self.targets.match(url)
+            if match:
+                self._add_stale_link(page['path'], url, text, *match)
+            if host == '':
+                self.stats['internal_links'] += 1
+                self._enqueue(path, page['depth'] + 1)
+
+    def _add_stale_link(self, source: str, url: str, text: str, test_type: str, row: Dict):
+        """Record a link to a redirected or removed URL (repeats on one page are counted)."""
+        self.stats['stale_links'] += 1
+        key = (source, url)
+        link = self._link_index.get(key)
+        if link:
+            link['occurrences'] += 1
+            return
+
+        link = {
+            'test_type': test_type,
+            'original_url': row['original_url'],
+            'expected_url': row['expected_url'],
+            'source_page': source,
+            'link_url': url,
+            'anchor_text': text,
+            'occurrences': 1
+        }
+        self._link_index[key] = link
+        self.links.append(link)
+        emit('stale_link', **link)
+
+    def crawl(self, seeds: Iterable[str]) -> Dict:
+        """
+        Crawl from the seed URLs (sitemap entries or paths) until the frontier or page budget runs out.
+
+        Returns:
+            Crawl statistics
+        """
+        start_time = time.time()
+        for seed in seeds:
+            host, path = split_url(seed, self.hosts)
+            if host == '':
+                self._enqueue(path, 0)
+
+        fetches = set()
+        parses = {}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='crawl-fetch') as fetcher, \
+                ThreadPoolExecutor(max_workers=Config.CRAWL_PARSER_WORKERS, thread_name_prefix='crawl-parser') as parser_pool:
+            while True:
+                while self.frontier and len(fetches) < self.workers * 2 and self.stats['pages'] < self.max_pages:
+                    path, depth = self.frontier.popleft()
+                    self.stats['pages'] += 1
+                    fetches.add(fetcher.submit(self._fetch, path, depth))
+                if not fetches and not parses:
+                    break
+
+                done, _ = wait(fetches | set(parses), return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in fetches:
+                        fetches.discard(future)
+                        page = future.result()
+                        if page['error'] or page['status_code'] >= 400:
+                            self.stats['errors'] += 1
+                        if page['location']:
+                            host, path = split_url(urljoin(page['url'], page['location']), self.hosts)
+                            if host == '':
+                                self._enqueue(path, page['depth'])
+                        if page['body'] is not None:
+                            self.stats['html_pages'] += 1
+                            body, page['body'] = page['body'], None
+                            parses[parser_pool.submit(extract_links, body, page['encoding'], page['url'])] = page
+                    else:
+                        self._record_links(parses.pop(future), future.result())
+
+        self.stats['unvisited'] = len(self.frontier)
+        self.stats['duration'] = round(time.time() - start_time, 2)
+        self.stats['connections'] = self.connections.get_stats()
+        return self.stats
+
+    def get_targets_summary(self) -> List[Dict]:
+        """Linked targets with their number of linking pages and links, most linked first."""
+        targets = {}
+        for link in self.links:
+            target = targets.setdefault(link['original_url'], {
+                'test_type': link['test_type'],
+                'original_url': link['original_url'],
+                'expected_url': link['expected_url'],
+                'pages': 0,
+                'links': 0
+            })
+            target['pages'] += 1
+            target['links'] += link['occurrences']
+        return sorted(targets.values(), key=lambda target: (-target['pages'], target['original_url']))
@@ -1,12 +1,25 @@
 """
 CSV parser for handling sitemap test data.
+
+Files up to Config.CSV_FAST_PATH_MAX_BYTES are read with the stdlib csv
+module, which keeps pandas (a few hundred milliseconds to import) off the
+startup path; larger exports are read with pandas. Either way rows are
+consumed as plain tuples, with pandas' default missing-value markers treated
+as empty cells so both paths produce the same test data.
 """
-import pandas as pd
+import csv
 import os
 from typing import List, Tuple, Dict
 from config import Config
 
 
+# Cell values pandas.read_csv treats as missing by default
+NA_VALUES = frozenset([
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'
+])
+
+
 class CSVParser:
     """Parser for CSV files containing URL test data."""
 
@@ -14,27 +27,71 @@ class CSVParser:
         """Initialize parser with CSV file path."""
         self.csv_file_path = csv_file_path or Config.get_input_file_path()
         self.data = None
+        self.columns = []
         self.redirect_urls = []
         self.remove_urls = []
         self.column_mapping = self._get_column_mapping()
+        self.page_metadata = None
 
     def _get_column_mapping(self):
         """Get column mapping for the current CSV file."""
         csv_filename = os.path.basename(self.csv_file_path)
         return Config.get_column_mapping(csv_filename)
 
-    def load_data(self) -> pd.DataFrame:
-        """Load CSV data from file."""
+    def load_data(self):
+        """Load CSV data from file (a list of row tuples, or a DataFrame for large files)."""
         if not os.path.exists(self.csv_file_path):
             raise FileNotFoundError(f"CSV file not found: {self.csv_file_path}")
 
         try:
-            self.data = pd.read_csv(self.csv_file_path)
+            if os.path.getsize(self.csv_file_path) <= Config.CSV_FAST_PATH_MAX_BYTES:
+                self.data = self._read_rows()
+            else:
+                import pandas as pd
+                self.data = pd.read_csv(self.csv_file_path)
+                self.columns = list(self.data.columns)
             print(f"✅ Loaded CSV data: {len(self.data)} rows")
             return self.data
         except Exception as e:
             raise Exception(f"Error loading CSV file: {e}")
 
+    def _read_rows(self) -> List[tuple]:
+        """Read the file with the stdlib csv module; missing cells become None."""
+        with open(self.csv_file_path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.reader(f)
+            self.columns = next(reader, [])
+            width = len(self.columns)
+            rows = []
+            for row in reader:
+                if not row:
+                    continue
+                if len(row) < width:
+                    row += [''] * (width - len(row))
+                rows.append(tuple(None if value in NA_VALUES else value for value in row))
+            return rows
+
+    def _iter_rows(self):
+        """Iterate over data rows as tuples."""
+        if self.data is None:
+            self.load_data()
+        if isinstance(self.data, list):
+            return iter(self.data)
+        return self.data.itertuples(index=False, name=None)
+
+    @staticmethod
+    def _is_missing(value) -> bool:
+        """Check for an empty cell (None, or NaN from pandas)."""
+        return value is None or (isinstance(value, float) and value != value)
+
+    def _status_code(self, value):
+        """Status code cell as int ('301', 301 and 301.0 alike), or the raw value if not numeric."""
+        if self._is_missing(value):
+            return value
+        try:
+            return int(float(value))
+        except (TypeError, ValueError):
+            return value
+
     def get_redirect_urls(self) -> List[Dict]:
         """Get URLs with 301 redirects that need testing."""
         if self.data is None:
@@ -45,15 +102,13 @@ class CSVParser:
         original_col = self.column_mapping['original_url']
         expected_col = self.column_mapping['expected_url']
 
-        # Filter rows where Status Code is 301
-        redirect_rows = self.data[
-            self.data.iloc[:, status_col] == Config.TARGET_STATUS_CODE
-        ]
-
         redirect_urls = []
-        for _, row in redirect_rows.iterrows():
-            original_url = row.iloc[original_col]
-            expected_url = row.iloc[expected_col]
+        for row in self._iter_rows():
+            # Only rows where Status Code is 301
+            if self._status_code(row[status_col]) != Config.TARGET_STATUS_CODE:
+                continue
+            original_url = row[original_col]
+            expected_url = row[expected_col]
 
             # Skip if expected URL is marked for removal
             if str(expected_url).strip().upper() == Config.REMOVE_MARKER:
@@ -84,21 +139,18 @@ class CSVParser:
         original_col = self.column_mapping['original_url']
         expected_col = self.column_mapping['expected_url']
 
-        # Filter rows where Expected URL is "REMOVE"
-        remove_rows = self.data[
-            self.data.iloc[:, expected_col].astype(str).str.strip().str.upper() == Config.REMOVE_MARKER
-        ]
-
         remove_urls = []
-        for _, row in remove_rows.iterrows():
-            original_url = row.iloc[original_col]
-            original_url = self._clean_url(original_url)
+        for row in self._iter_rows():
+            # Only rows where Expected URL is "REMOVE"
+            if str(row[expected_col]).strip().upper() != Config.REMOVE_MARKER:
+                continue
+            original_url = self._clean_url(row[original_col])
 
             if original_url:
                 remove_urls.append({
                     'original_url': original_url,
                     'expected_url': Config.REMOVE_MARKER,
-                    'status_code': row.iloc[status_col]
+                    'status_code': self._status_code(row[status_col])
                 })
 
         self.remove_urls = remove_urls
@@ -111,9 +163,46 @@ class CSVParser:
         remove_urls = self.get_remove_urls()
         return redirect_urls, remove_urls
 
+    def get_page_metadata(self, url: str) -> Dict:
+        """
+        Get the crawl export's metadata for a URL (hash, size, title, ...).
+
+        Columns are looked up by name (Config.CSV_METADATA_COLUMNS), so files
+        with different column layouts share the same keys. Missing values are ''.
+
+        Returns:
+            Metadata dictionary, or None if the URL is not a row in the export
+        """
+        if self.page_metadata is None:
+            self._build_page_metadata()
+        return self.page_metadata.get(self._metadata_key(url))
+
+    def _build_page_metadata(self):
+        """Index export rows by cleaned URL."""
+        if self.data is None:
+            self.load_data()
+
+        columns = {key: self.columns.index(name) for key, name in Config.CSV_METADATA_COLUMNS.items()
+                   if name in self.columns}
+        url_col = columns.get('address', self.column_mapping['original_url'])
+        fields = list(columns)
+        indices = [columns[field] for field in fields]
+
+        self.page_metadata = {}
+        for row in self._iter_rows():
+            key = self._metadata_key(row[url_col])
+            if key:
+                self.page_metadata[key] = {
+                    field: '' if self._is_missing(row[i]) else row[i] for field, i in zip(fields, indices)
+                }
+
+    def _metadata_key(self, url: str) -> str:
+        """Lookup key for page metadata: cleaned URL without trailing slash, lowercase."""
+        return self._clean_url(url).rstrip('/').lower()
+
     def _clean_url(self, url: str) -> str:
         """Clean and validate URL."""
-        if pd.isna(url) or not str(url).strip():
+        if self._is_missing(url) or not str(url).strip():
             return ""
 
         url = str(url).strip()
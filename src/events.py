@@ -0,0 +1,194 @@
+"""
+Structured JSON Lines event stream (--events) for log pipelines and dashboards.
+
+Live progress is printed as emoji-decorated text, which log pipelines
+cannot parse. With --events PATH (or - for stdout) every stage transition,
+URL result, retry, sitemap fetch and file summary is also written as one
+JSON object per line:
+
+    {"ts": "2026-10-19T03:32:48.120Z", "run_id": "20261019T033246-5f2c1a", "seq": 17,
+     "event": "url_result", "csv_file": "Psychics.csv", "env": "qa", "test_type": "redirect", ...}
+
+Every event carries the UTC timestamp of when it happened, the run id shared
+by all events of one invocation, a sequence number and the current context
+(CSV file and environment). The event types are
+- run_start / run_end: the invocation's command and options / its exit code and duration
+- file_start / summary: a CSV file's test run starts / its pass counts
+- stage_start / stage_end: run stages as timed by profiling.StageProfiler
+- url_result: a URL test result with its sitemap and content checks applied
+  (results restored by --resume are emitted with restored=true)
+- url_result_update: the same fields for a url_result changed by the checks
+  across all URLs of the file (near-duplicate content flagged as soft 404);
+  keeping the latest event per test_type and original_url gives the counts
+  of the file's summary event
+- retry: a request that will be retried, with the reason and backoff delay
+- sitemap_fetch: a sitemap or child sitemap request and its outcome
+
+emit() only timestamps the event and puts it on a queue, so worker threads
+never wait on serialization or disk; a writer thread encodes events and
+writes them in batches, flushing every Config.EVENTS_FLUSH_INTERVAL seconds.
+Without --events, emit() returns immediately.
+"""
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, TextIO
+from config import Config
+
+_STOP = object()
+
+
+def new_run_id() -> str:
+    """Run id: start time plus a random suffix, unique across parallel shard runs."""
+    return f"{time.strftime('%Y%m%dT%H%M%S')}-{os.urandom(3).hex()}"
+
+
+class EventWriter:
+    """Background writer of JSON Lines events to a file or stream."""
+
+    def __init__(self, stream: TextIO, run_id: str = None, close_stream: bool = False):
+        """
+        Start the writer thread.
+
+        Args:
+            stream: Text stream the events are written to
+            run_id: Id shared by all events (default: a new one)
+            close_stream: Close stream when the writer is closed
+        """
+        self.stream = stream
+        self.run_id = run_id or new_run_id()
+        self.close_stream = close_stream
+        self.context: Dict = {}
+        self.written = 0
+        self.failed = False
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name='event-writer', daemon=True)
+        self._thread.start()
+
+    def set_context(self, **fields):
+        """Fields added to every later event (None removes a field)."""
+        # Replaced rather than updated: queued events keep the context they were emitted in
+        context = dict(self.context, **fields)
+        self.context = {key: value for key, value in context.items() if value is not None}
+
+    def emit(self, event: str, **fields):
+        """Queue an event; never blocks on the writer."""
+        self._queue.put((time.time(), event, self.context, fields))
+
+    def _encode(self, item) -> str:
+        """JSON line of a queued event."""
+        timestamp, event, context, fields = item
+        self.written += 1
+        record = {
+            'ts': datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec='milliseconds')[:-6] + 'Z',
+            'run_id': self.run_id,
+            'seq': self.written,
+            'event': event,
+        }
+        record.update(context)
+        record.update(fields)
+        return json.dumps(record, default=str, ensure_ascii=False) + '\n'
+
+    def _run(self):
+        """Writer thread: encode and write queued events, flushing when idle or every flush interval."""
+        last_flush = time.monotonic()
+        stopping = False
+        while not stopping:
+            batch = []
+            try:
+                batch.append(self._queue.get(timeout=Config.EVENTS_FLUSH_INTERVAL))
+                while True:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            if _STOP in batch:
+                stopping = True
+                batch = batch[:batch.index(_STOP)]
+            if batch and not self.failed:
+                self._write(''.join(self._encode(item) for item in batch))
+
+            if time.monotonic() - last_flush >= Config.EVENTS_FLUSH_INTERVAL or stopping:
+                self._write(None)
+                last_flush = time.monotonic()
+
+    def _write(self, data: Optional[str]):
+        """Write data (None: flush); on errors events are dropped from then on."""
+        if self.failed:
+            return
+        try:
+            if data is None:
+                self.stream.flush()
+            else:
+                self.stream.write(data)
+        except (OSError, ValueError) as e:
+            self.failed = True
+            print(f"⚠️  Event stream stopped: {e}", file=sys.stderr)
+
+    def close(self):
+        """Write the remaining events and stop the writer thread."""
+        self._queue.put(_STOP)
+        self._thread.join()
+        if self.close_stream:
+            try:
+                self.stream.close()
+            except OSError:
+                pass
+
+
+# Scalar result fields copied into url_result events
+RESULT_FIELDS = ('test_type', 'original_url', 'full_url', 'status_code', 'success', 'response_time', 'error',
+                 'sitemap_compliant', 'expected_in_sitemap', 'url_inaccessible', 'removed_from_sitemap',
+                 'original_removed', 'content_hash', 'soft_404')
+
+_writer: Optional[EventWriter] = None
+
+
+def open_events(path: str, run_id: str = None) -> EventWriter:
+    """
+    Start the process-wide event stream to path ('-' for stdout).
+
+    Raises:
+        OSError: If the file cannot be opened
+    """
+    global _writer
+    close_events()
+    if path == '-':
+        _writer = EventWriter(sys.stdout, run_id)
+    else:
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        stream = open(path, 'a', encoding='utf-8', buffering=Config.EVENTS_BUFFER_SIZE)
+        _writer = EventWriter(stream, run_id, close_stream=True)
+    return _writer
+
+
+def close_events():
+    """Write the remaining events and stop the event stream, if one is open."""
+    global _writer
+    writer, _writer = _writer, None
+    if writer:
+        writer.close()
+
+
+def emit(event: str, **fields):
+    """Emit an event to the open event stream (no-op without one)."""
+    writer = _writer
+    if writer is not None:
+        writer.emit(event, **fields)
+
+
+def emit_result(result: Dict, event: str = 'url_result', **fields):
+    """Emit a URL test result (its scalar fields and fields) as a url_result or url_result_update event."""
+    if _writer is not None:
+        _writer.emit(event, **{key: result[key] for key in RESULT_FIELDS if key in result}, **fields)
+
+
+def set_context(**fields):
+    """Add fields to every later event of the open event stream."""
+    if _writer is not None:
+        _writer.set_context(**fields)
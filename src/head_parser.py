@@ -0,0 +1,94 @@
+"""
+HTML <head> extraction for SEO checks on tested pages.
+
+The network side only looks for the end of the head (``</head>`` or
+``<body``) in the raw byte stream and hands the collected bytes over;
+HeadParser then pulls out the title, canonical link and meta robots. Parsing
+runs on a separate worker pool so it never holds up a download thread.
+"""
+import re
+from concurrent.futures import Future, ThreadPoolExecutor
+from html.parser import HTMLParser
+from typing import Dict
+from config import Config
+
+
+HEAD_END_PATTERN = re.compile(rb'</head\s*>|<body[\s>]', re.IGNORECASE)
+
+
+class HeadParser(HTMLParser):
+    """Incremental parser that stops collecting at the end of <head>."""
+
+    def __init__(self):
+        """Initialize empty head fields."""
+        super().__init__(convert_charrefs=True)
+        self.title = None
+        self.canonical = None
+        self.meta_robots = None
+        self.done = False
+        self._in_title = False
+        self._title_parts = []
+
+    def handle_starttag(self, tag, attrs):
+        """Record canonical link and robots meta tags."""
+        if self.done:
+            return
+        if tag == 'body':
+            self.done = True
+            return
+
+        attrs = {name.lower(): (value or '') for name, value in attrs}
+        if tag == 'title' and self.title is None:
+            self._in_title = True
+        elif tag == 'link' and self.canonical is None and 'canonical' in attrs.get('rel', '').lower().split():
+            self.canonical = attrs.get('href', '').strip()
+        elif tag == 'meta' and self.meta_robots is None and attrs.get('name', '').lower() == 'robots':
+            self.meta_robots = attrs.get('content', '').strip()
+
+    def handle_endtag(self, tag):
+        """Close the title and stop at </head>."""
+        if tag == 'title' and self._in_title:
+            self._in_title = False
+            self.title = ' '.join(''.join(self._title_parts).split())
+        elif tag == 'head':
+            self.done = True
+
+    def handle_data(self, data):
+        """Collect title text."""
+        if self._in_title and not self.done:
+            self._title_parts.append(data)
+
+    def get_fields(self) -> Dict:
+        """Get extracted head fields ('' when a field is missing)."""
+        if self._in_title:
+            self.title = ' '.join(''.join(self._title_parts).split())
+        return {
+            'title': self.title or '',
+            'canonical': self.canonical or '',
+            'meta_robots': self.meta_robots or ''
+        }
+
+
+def parse_head(data: bytes, encoding: str = None) -> Dict:
+    """Parse head bytes into title, canonical and meta robots."""
+    parser = HeadParser()
+    parser.feed(data.decode(encoding or 'utf-8', errors='replace'))
+    parser.close()
+    return parser.get_fields()
+
+
+class HeadParserPool:
+    """Worker pool that parses collected <head> bytes off the download threads."""
+
+    def __init__(self, workers: int = None):
+        """Initialize pool with Config.HEAD_PARSER_WORKERS threads."""
+        self.executor = ThreadPoolExecutor(max_workers=workers or Config.HEAD_PARSER_WORKERS,
+                                           thread_name_prefix='head-parser')
+
+    def submit(self, data: bytes, encoding: str = None) -> Future:
+        """Queue head bytes for parsing; the future resolves to the head fields."""
+        return self.executor.submit(parse_head, data, encoding)
+
+    def shutdown(self):
+        """Stop the worker threads."""
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,714 @@
+"""
+Streamed HTML report generation.
+
+The report used to be built as one f-string holding the whole document, so
+memory and time grew with every result and very large runs could not be
+reported at all. HTMLReportWriter renders the page from templates and writes
+it as it goes:
+- results are counted in one pass without copying the result lists
+- every table row is rendered from a row template and written straight to
+  the file, so memory stays flat however many rows there are
+- the independent sections (dashboard, redirect, removal and failed-test
+  tables) are rendered concurrently into temporary part files, which are then
+  copied into the report in page order
+- the report is written next to its final path and moved into place when
+  complete, so an interrupted run never leaves a truncated report behind
+
+Templates use {{ name }} placeholders; everything else, including CSS and
+JavaScript braces and jQuery's $, is literal text.
+"""
+import html
+import os
+import re
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import chain
+from typing import Dict, Iterable, List
+from config import Config
+
+
+class ReportTemplate:
+    """HTML template with {{ name }} placeholders."""
+
+    PLACEHOLDER = re.compile(r'\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*\}\}')
+
+    def __init__(self, text: str):
+        """Compile the template into a str.format pattern (rendering is a single C-level call)."""
+        parts = self.PLACEHOLDER.split(text)
+        self._pattern = ''.join(
+            part.replace('{', '{{').replace('}', '}}') if i % 2 == 0 else '{' + part + '}'
+            for i, part in enumerate(parts))
+
+    def render(self, **values) -> str:
+        """Fill in the placeholders (values are inserted as they are, escape them first)."""
+        return self._pattern.format_map(values)
+
+
+PAGE_START = ReportTemplate("""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>California Psychics Sitemap QA Report</title>
+    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css" rel="stylesheet">
+    <link href="https://cdn.datatables.net/1.13.6/css/dataTables.bootstrap5.min.css" rel="stylesheet">
+    <link href="https://cdn.datatables.net/fixedheader/3.4.0/css/fixedHeader.bootstrap5.min.css" rel="stylesheet">
+    <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css" rel="stylesheet">
+    <script src="https://code.jquery.com/jquery-3.7.1.min.js"></script>
+    <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js"></script>
+    <script src="https://cdn.datatables.net/1.13.6/js/jquery.dataTables.min.js"></script>
+    <script src="https://cdn.datatables.net/1.13.6/js/dataTables.bootstrap5.min.js"></script>
+    <script src="https://cdn.datatables.net/fixedheader/3.4.0/js/dataTables.fixedHeader.min.js"></script>
+    <style>
+        .status-pass { background-color: #d1edff !important; }
+        .status-fail { background-color: #f8d7da !important; }
+        .status-partial { background-color: #fff3cd !important; }
+        .nav-tabs .nav-link.active { font-weight: bold; border-bottom: 3px solid #0d6efd; background: white; }
+        .metric-value { font-size: 2rem; font-weight: bold; }
+        .metric-label { font-size: 0.875rem; color: #6c757d; }
+        .table-responsive { max-height: 70vh; }
+        .nav-tabs { border-bottom: 2px solid #dee2e6; }
+        .nav-tabs .nav-link { border: none; padding: 1rem 1.5rem; font-weight: 500; }
+        .tab-content { background: white; border-radius: 0 0 0.375rem 0.375rem; }
+        /* Fixed header styling */
+        .dataTables_scrollHead {
+            background: white;
+            border-bottom: 2px solid #dee2e6;
+        }
+        .dataTables_scrollHeadInner table thead th {
+            background: #f8f9fa;
+            position: sticky;
+            top: 0;
+            z-index: 10;
+        }
+        /* Fallback sticky headers */
+        .sticky-header th {
+            position: sticky;
+            top: 0;
+            background: #f8f9fa;
+            z-index: 10;
+            border-bottom: 2px solid #dee2e6;
+        }
+        .failure-details {
+            font-size: 0.85rem;
+            line-height: 1.3;
+        }
+    </style>
+</head>
+<body class="bg-light">
+    <div class="container-fluid py-4">
+        <!-- Header -->
+        <div class="row mb-4">
+            <div class="col">
+                <div class="text-center">
+                    <h1 class="display-5 mb-2">
+                        <i class="fas fa-sitemap text-primary"></i>
+                        California Psychics Sitemap QA Report
+                    </h1>
+                    <p class="text-muted">{{ generated }}</p>
+                    <p class="text-muted">Environment: <strong>{{ environment }}</strong> ({{ base_url }})</p>
+                </div>
+            </div>
+        </div>
+
+        <!-- Tab Navigation -->
+        <ul class="nav nav-tabs mb-0" id="reportTabs" role="tablist">
+            <li class="nav-item" role="presentation">
+                <button class="nav-link active" id="dashboard-tab" data-bs-toggle="tab" data-bs-target="#dashboard" type="button" role="tab">
+                    <i class="fas fa-tachometer-alt me-2"></i>Dashboard
+                </button>
+            </li>
+            <li class="nav-item" role="presentation">
+                <button class="nav-link" id="redirects-tab" data-bs-toggle="tab" data-bs-target="#redirects" type="button" role="tab">
+                    <i class="fas fa-exchange-alt me-2"></i>Redirect URLs ({{ total_redirects }})
+                </button>
+            </li>
+            <li class="nav-item" role="presentation">
+                <button class="nav-link" id="removals-tab" data-bs-toggle="tab" data-bs-target="#removals" type="button" role="tab">
+                    <i class="fas fa-trash-alt me-2"></i>Removal URLs ({{ total_removes }})
+                </button>
+            </li>
+            <li class="nav-item" role="presentation">
+                <button class="nav-link" id="failed-tab" data-bs-toggle="tab" data-bs-target="#failed" type="button" role="tab">
+                    <i class="fas fa-exclamation-triangle me-2"></i>Failed Tests ({{ failed_tests }})
+                </button>
+            </li>
+        </ul>
+
+        <!-- Tab Content -->
+        <div class="tab-content p-4 bg-white shadow-sm" id="reportTabContent">
+""")
+
+DASHBOARD = ReportTemplate("""
+            <!-- Dashboard Tab -->
+            <div class="tab-pane fade show active" id="dashboard" role="tabpanel">
+                <div class="row g-4 mb-4">
+                    <div class="col-md-3">
+                        <div class="card border-0 shadow-sm h-100">
+                            <div class="card-body text-center">
+                                <i class="fas fa-list-ol fa-2x text-primary mb-2"></i>
+                                <div class="metric-value text-primary">{{ total_tests }}</div>
+                                <div class="metric-label">Total URLs Tested</div>
+                            </div>
+                        </div>
+                    </div>
+                    <div class="col-md-3">
+                        <div class="card border-0 shadow-sm h-100">
+                            <div class="card-body text-center">
+                                <i class="fas fa-check-circle fa-2x text-success mb-2"></i>
+                                <div class="metric-value text-success">{{ passed_tests }}</div>
+                                <div class="metric-label">Passed Tests</div>
+                            </div>
+                        </div>
+                    </div>
+                    <div class="col-md-3">
+                        <div class="card border-0 shadow-sm h-100">
+                            <div class="card-body text-center">
+                                <i class="fas fa-times-circle fa-2x text-danger mb-2"></i>
+                                <div class="metric-value text-danger">{{ failed_tests }}</div>
+                                <div class="metric-label">Failed Tests</div>
+                            </div>
+                        </div>
+                    </div>
+                    <div class="col-md-3">
+                        <div class="card border-0 shadow-sm h-100">
+                            <div class="card-body text-center">
+                                <i class="fas fa-percentage fa-2x text-info mb-2"></i>
+                                <div class="metric-value text-info">{{ success_rate }}%</div>
+                                <div class="metric-label">Success Rate</div>
+                            </div>
+                        </div>
+                    </div>
+                </div>
+
+                <!-- Quick Stats -->
+                <div class="row">
+                    <div class="col-md-6">
+                        <div class="card">
+                            <div class="card-header">
+                                <h5 class="mb-0"><i class="fas fa-chart-pie me-2"></i>Test Summary</h5>
+                            </div>
+                            <div class="card-body">
+                                <div class="mb-2">
+                                    <span class="badge bg-primary me-2">Redirect Tests:</span> {{ total_redirects }}
+                                </div>
+                                <div class="mb-2">
+                                    <span class="badge bg-warning me-2">Removal Tests:</span> {{ total_removes }}
+                                </div>
+                                <div class="mb-2">
+                                    <span class="badge bg-success me-2">Passed:</span> {{ passed_tests }}
+                                </div>
+                                <div>
+                                    <span class="badge bg-danger me-2">Failed:</span> {{ failed_tests }}
+                                </div>
+                            </div>
+                        </div>
+                    </div>
+                    <div class="col-md-6">
+                        <div class="card">
+                            <div class="card-header">
+                                <h5 class="mb-0"><i class="fas fa-sitemap me-2"></i>Sitemap Analysis</h5>
+                            </div>
+                            <div class="card-body">{{ sitemap }}
+                            </div>
+                        </div>
+                    </div>
+                </div>{{ performance }}
+            </div>
+""")
+
+SITEMAP_ANALYSIS = ReportTemplate("""
+                                    <div class="mb-2">
+                                        <span class="badge bg-info me-2">Total Sitemap URLs:</span> {{ total_urls }}
+                                    </div>
+                                    <div class="mb-2">
+                                        <span class="badge bg-success me-2">Expected URLs Found:</span> {{ found }}/{{ total }}
+                                    </div>
+                                    <div>
+                                        <span class="badge bg-primary me-2">Compliance Rate:</span> {{ compliance_rate }}%
+                                    </div>{{ diff }}""")
+
+SITEMAP_UNAVAILABLE = """
+                                    <div class="text-muted">
+                                        <i class="fas fa-info-circle me-2"></i>Sitemap analysis not available
+                                    </div>"""
+
+SITEMAP_FAILED = """
+                                <div class="text-danger">
+                                    <i class="fas fa-exclamation-triangle me-2"></i>Sitemap fetch failed
+                                </div>"""
+
+SITEMAP_DIFF = ReportTemplate("""
+                                    <hr>
+                                    <div class="mb-2">
+                                        <strong>Changes since {{ baseline }}</strong>
+                                    </div>
+                                    <div class="mb-2">
+                                        <span class="badge bg-success me-2">Added:</span> {{ added }}
+                                        <span class="badge bg-danger ms-3 me-2">Removed:</span> {{ removed }}
+                                        <span class="badge bg-warning ms-3 me-2">Lastmod Changed:</span> {{ lastmod_changed }}
+                                        <span class="badge bg-light text-dark ms-3 me-2">Unchanged:</span> {{ unchanged }}
+                                    </div>{{ samples }}""")
+
+PERFORMANCE = ReportTemplate("""
+                <div class="row g-4 mt-1">
+                    <div class="col-12">
+                        <div class="card">
+                            <div class="card-header">
+                                <h5 class="mb-0"><i class="fas fa-stopwatch me-2"></i>Response Time vs Crawl Baseline</h5>
+                            </div>
+                            <div class="card-body">
+                                <div class="mb-3">
+                                    <span class="badge bg-info me-2">Compared:</span> {{ compared }}
+                                    <span class="badge bg-danger ms-3 me-2">Slower URLs:</span> {{ regressions }}
+                                    <span class="badge bg-warning ms-3 me-2">Slower Path Prefixes:</span> {{ prefix_regressions }}
+                                </div>
+                                <table class="table table-sm">
+                                    <thead><tr><th>Path Prefix</th><th>URLs</th><th>Baseline (median)</th><th>Live (median)</th><th>Ratio</th><th>Slower URLs</th><th>p-value</th></tr></thead>
+                                    <tbody>{{ prefix_rows }}
+                                    </tbody>
+                                </table>
+                                <table class="table table-sm">
+                                    <thead><tr><th>URL</th><th>Timed</th><th>Baseline</th><th>Live (median)</th><th>Ratio</th><th>Samples</th></tr></thead>
+                                    <tbody>{{ url_rows }}
+                                    </tbody>
+                                </table>
+                            </div>
+                        </div>
+                    </div>
+                </div>""")
+
+PERFORMANCE_PREFIX_ROW = ReportTemplate("""
+                                        <tr class="{{ row_class }}">
+                                            <td>{{ prefix }}</td>
+                                            <td>{{ urls }}</td>
+                                            <td>{{ baseline_time }}s</td>
+                                            <td>{{ live_time }}s</td>
+                                            <td>{{ ratio }}x</td>
+                                            <td>{{ slower }}</td>
+                                            <td>{{ p_value }}</td>
+                                        </tr>""")
+
+PERFORMANCE_URL_ROW = ReportTemplate("""
+                                        <tr class="status-fail">
+                                            <td><small>{{ url }}</small></td>
+                                            <td>{{ kind }}</td>
+                                            <td>{{ baseline_time }}s</td>
+                                            <td>{{ live_time }}s</td>
+                                            <td>{{ ratio }}x</td>
+                                            <td>{{ samples }}</td>
+                                        </tr>""")
+
+PERFORMANCE_NO_REGRESSIONS = """
+                                        <tr><td colspan="6" class="text-muted">No URL is significantly slower than its crawl baseline</td></tr>"""
+
+REDIRECTS_START = """
+            <!-- Redirects Tab -->
+            <div class="tab-pane fade" id="redirects" role="tabpanel">
+                <div class="mb-3">
+                    <div class="alert alert-info">
+                        <strong>Legend:</strong>
+                        <span class="badge bg-success ms-2">PASS</span> URL accessible AND sitemap compliant
+                        <span class="badge bg-warning ms-2">PARTIAL</span> URL accessible but sitemap issues
+                        <span class="badge bg-danger ms-2">FAIL</span> URL not accessible or major issues
+                    </div>
+                </div>
+                <div class="table-responsive">
+                    <table id="redirectsTable" class="table table-striped table-hover">
+                        <thead class="table-dark">
+                            <tr>
+                                <th>Original URL</th>
+                                <th>Expected URL</th>
+                                <th>Status</th>
+                                <th>Response Time</th>
+                                <th>URL Access</th>
+                                <th>In Sitemap</th>
+                                <th>Original Removed</th>
+                                <th>Result</th>
+                                <th>Error</th>
+                            </tr>
+                        </thead>
+                        <tbody>"""
+
+REDIRECT_ROW = ReportTemplate("""
+                                <tr class="{{ row_class }}">
+                                    <td><small>{{ original_url }}</small></td>
+                                    <td><small>{{ url }}</small></td>
+                                    <td>{{ status_code }}</td>
+                                    <td>{{ response_time }}s</td>
+                                    <td>{{ url_result }}</td>
+                                    <td>{{ sitemap_result }}</td>
+                                    <td>{{ removed_result }}</td>
+                                    <td>{{ result_badge }}</td>
+                                    <td><small>{{ error }}</small></td>
+                                </tr>""")
+
+REMOVALS_START = """
+            <!-- Removals Tab -->
+            <div class="tab-pane fade" id="removals" role="tabpanel">
+                <div class="mb-3">
+                    <div class="alert alert-info">
+                        <strong>Removal URL Testing:</strong> These URLs should be inaccessible and removed from sitemap.
+                    </div>
+                </div>
+                <div class="table-responsive">
+                    <table id="removalsTable" class="table table-striped table-hover">
+                        <thead class="table-dark">
+                            <tr>
+                                <th>URL to Remove</th>
+                                <th>Status Code</th>
+                                <th>Response Time</th>
+                                <th>URL Access</th>
+                                <th>Sitemap Removal</th>
+                                <th>Overall Result</th>
+                                <th>Error</th>
+                            </tr>
+                        </thead>
+                        <tbody>"""
+
+REMOVAL_ROW = ReportTemplate("""
+                                <tr class="{{ row_class }}">
+                                    <td><small>{{ original_url }}</small></td>
+                                    <td>{{ status_code }}</td>
+                                    <td>{{ response_time }}s</td>
+                                    <td>{{ access_result }}</td>
+                                    <td>{{ sitemap_result }}</td>
+                                    <td>{{ result_badge }}</td>
+                                    <td><small>{{ error }}</small></td>
+                                </tr>""")
+
+FAILED_START = """
+            <!-- Failed Tests Tab -->
+            <div class="tab-pane fade" id="failed" role="tabpanel">
+                <div class="mb-3">
+                    <div class="alert alert-danger">
+                        <strong>Failed Tests:</strong> These URLs require immediate attention.
+                    </div>
+                </div>
+                <div class="table-responsive">
+                    <table id="failedTable" class="table table-striped table-hover">
+                        <thead class="table-dark">
+                            <tr>
+                                <th>URL</th>
+                                <th>Test Type</th>
+                                <th>Status Code</th>
+                                <th>Response Time</th>
+                                <th>Failure Details</th>
+                                <th>Expected URL</th>
+                            </tr>
+                        </thead>
+                        <tbody>"""
+
+FAILED_ROW = ReportTemplate("""
+                                <tr class="status-fail">
+                                    <td><small>{{ url }}</small></td>
+                                    <td><span class="badge bg-info">{{ test_type }}</span></td>
+                                    <td><span class="badge bg-danger">{{ status_code }}</span></td>
+                                    <td>{{ response_time }}s</td>
+                                    <td>{{ failure_details }}</td>
+                                    <td><small>{{ expected_url }}</small></td>
+                                </tr>""")
+
+TABLE_END = """
+                        </tbody>
+                    </table>
+                </div>
+            </div>
+"""
+
+PAGE_END = ReportTemplate("""        </div>
+    </div>
+
+    <script>
+        $(document).ready(function() {
+            // Initialize DataTables with enhanced features and fixed headers
+            const tableConfig = {
+                responsive: true,
+                pageLength: 25,
+                lengthMenu: [[10, 25, 50, 100, -1], [10, 25, 50, 100, "All"]],
+                order: [[0, 'asc']],
+                fixedHeader: true,
+                scrollY: '60vh',
+                scrollCollapse: true,
+                deferRender: true,
+                columnDefs: [
+                    { targets: '_all', className: 'text-nowrap' }
+                ],
+                dom: '<"row"<"col-sm-6"l><"col-sm-6"f>>' +
+                     '<"row"<"col-sm-12"tr>>' +
+                     '<"row"<"col-sm-5"i><"col-sm-7"p>>',
+                language: {
+                    search: "Search URLs:",
+                    lengthMenu: "Show _MENU_ results per page",
+                    info: "Showing _START_ to _END_ of _TOTAL_ URLs",
+                    paginate: {
+                        first: "First",
+                        last: "Last",
+                        next: "Next",
+                        previous: "Previous"
+                    }
+                }
+            };
+
+            $('#redirectsTable').DataTable(tableConfig);
+            $('#removalsTable').DataTable(tableConfig);
+            $('#failedTable').DataTable(tableConfig);
+
+            // Auto-switch to failed tab if there are failures
+            if ({{ failed_tests }} > 0) {
+                // Optionally highlight the failed tab
+                $('#failed-tab').addClass('text-danger');
+            }
+
+            // Enhanced tooltips
+            $('[data-bs-toggle="tooltip"]').tooltip();
+        });
+    </script>
+</body>
+</html>
+""")
+
+BADGE = ReportTemplate('<span class="badge bg-{{ color }}">{{ text }}</span>')
+
+
+def _text(value) -> str:
+    """HTML-escaped text of a result field ('' for None)."""
+    return html.escape(str(value)) if value is not None else ''
+
+
+def _response_time(result: Dict) -> str:
+    """Response time cell value."""
+    return f"{result.get('response_time') or 0:.3f}"
+
+
+def _yes_no(flag: bool) -> str:
+    """Green Yes / red No badge."""
+    return BADGE.render(color='success', text='Yes') if flag else BADGE.render(color='danger', text='No')
+
+
+def render_sitemap_diff(snapshot_diff: Dict = None) -> str:
+    """Sitemap change summary shown in the dashboard's sitemap card."""
+    if not snapshot_diff:
+        return ""
+
+    samples = []
+    for change, label in (('added', 'Added'), ('removed', 'Removed'), ('lastmod_changed', 'Lastmod changed')):
+        for url in snapshot_diff['samples'].get(change, []):
+            samples.append(f'<li><span class="badge bg-secondary me-1">{label}</span><small>{_text(url)}</small></li>')
+    sample_html = f'<ul class="list-unstyled mt-2 mb-0">{"".join(samples)}</ul>' if samples else ''
+
+    return SITEMAP_DIFF.render(baseline=_text(snapshot_diff['baseline']), added=snapshot_diff['added'],
+                               removed=snapshot_diff['removed'], lastmod_changed=snapshot_diff['lastmod_changed'],
+                               unchanged=snapshot_diff['unchanged'], samples=sample_html)
+
+
+def render_sitemap_analysis(sitemap_analysis: Dict = None) -> str:
+    """Body of the dashboard's sitemap card."""
+    if not (sitemap_analysis and sitemap_analysis.get('fetch_success')):
+        return SITEMAP_FAILED
+
+    expected_data = sitemap_analysis.get('expected_urls', {})
+    if not expected_data:
+        return SITEMAP_UNAVAILABLE
+
+    found = expected_data.get('found_in_sitemap', 0)
+    total = expected_data.get('total_expected', 0)
+    compliance_rate = (found / total * 100) if total > 0 else 0
+    return SITEMAP_ANALYSIS.render(total_urls=sitemap_analysis.get('total_urls_in_sitemap', 0), found=found,
+                                   total=total, compliance_rate=f"{compliance_rate:.1f}",
+                                   diff=render_sitemap_diff(sitemap_analysis.get('snapshot_diff')))
+
+
+def render_performance(performance: Dict = None) -> str:
+    """Response-time regression section of the dashboard."""
+    if not performance:
+        return ""
+
+    prefix_rows = ''.join(PERFORMANCE_PREFIX_ROW.render(
+        row_class='status-fail' if row['regression'] else '', prefix=_text(row['prefix']), urls=row['urls'],
+        baseline_time=f"{row['baseline_time']:.3f}", live_time=f"{row['live_time']:.3f}", ratio=row['ratio'],
+        slower=row['slower'], p_value=row['p_value']) for row in performance['prefixes'])
+
+    url_rows = ''.join(PERFORMANCE_URL_ROW.render(
+        url=_text(row['url']), kind=row['kind'], baseline_time=f"{row['baseline_time']:.3f}",
+        live_time=f"{row['live_time']:.3f}", ratio=row['ratio'], samples=row['samples'])
+        for row in performance['urls'] if row['regression'])
+
+    return PERFORMANCE.render(compared=performance['compared'], regressions=performance['regressions'],
+                              prefix_regressions=performance['prefix_regressions'], prefix_rows=prefix_rows,
+                              url_rows=url_rows or PERFORMANCE_NO_REGRESSIONS)
+
+
+def render_failure_details(result: Dict) -> str:
+    """Detailed failure description for a failed test."""
+    details = []
+    test_type = result.get('test_type', 'unknown')
+
+    if test_type == 'redirect':
+        if not result.get('url_accessible', False):
+            details.append(f'<span class="badge bg-danger">URL Not Accessible</span> ({result.get("status_code", "N/A")})')
+
+        if result.get('soft_404'):
+            details.append('<span class="badge bg-danger">Soft 404</span>')
+
+        redirect_check = result.get('redirect_check')
+        if redirect_check and not redirect_check['verified']:
+            details.append(f'<span class="badge bg-danger">Redirect Mismatch</span> {_text(redirect_check["issue"] or "")}')
+
+        for issue in result.get('head_issues', []):
+            details.append(f'<span class="badge bg-danger">SEO Head</span> {_text(issue)}')
+
+        if not result.get('expected_in_sitemap', False):
+            details.append('<span class="badge bg-warning">Missing from Sitemap</span>')
+            suggestions = result.get('sitemap_suggestions', [])
+            if suggestions:
+                closest = ', '.join(f"{_text(s['url'])} ({s['score']:.0%})" for s in suggestions)
+                details.append(f'<small class="text-muted">Closest in sitemap: {closest}</small>')
+
+        if not result.get('original_removed', False):
+            details.append('<span class="badge bg-warning">Original URL Still in Sitemap</span>')
+
+    elif test_type == 'remove':
+        if not result.get('url_inaccessible', False):
+            details.append('<span class="badge bg-danger">URL Still Accessible</span>')
+
+        if not result.get('removed_from_sitemap', False):
+            details.append('<span class="badge bg-warning">Still in Sitemap</span>')
+
+    if test_type in ('redirect', 'remove') and result.get('error'):
+        details.append(f'<span class="badge bg-secondary">Error</span> {_text(result["error"])}')
+
+    return '<div class="failure-details">' + '<br>'.join(details) + '</div>' if details else 'Unknown failure'
+
+
+def render_redirect_row(result: Dict) -> str:
+    """Row of the redirect table."""
+    url_accessible = result.get('url_accessible', False)
+    expected_in_sitemap = result.get('expected_in_sitemap', False)
+    original_removed = result.get('original_removed', False)
+
+    if result.get('success', False):
+        row_class, result_badge = 'status-pass', BADGE.render(color='success', text='PASS')
+    elif url_accessible and not (expected_in_sitemap and original_removed):
+        row_class, result_badge = 'status-partial', BADGE.render(color='warning', text='PARTIAL')
+    else:
+        row_class, result_badge = 'status-fail', BADGE.render(color='danger', text='FAIL')
+
+    url_result = (BADGE.render(color='success', text='200') if url_accessible
+                  else BADGE.render(color='danger', text=_text(result.get('status_code', 'FAIL'))))
+
+    return REDIRECT_ROW.render(row_class=row_class, original_url=_text(result.get('original_url', '')),
+                               url=_text(result.get('url', '')), status_code=_text(result.get('status_code', 'N/A')),
+                               response_time=_response_time(result), url_result=url_result,
+                               sitemap_result=_yes_no(expected_in_sitemap), removed_result=_yes_no(original_removed),
+                               result_badge=result_badge, error=_text(result.get('error', '')))
+
+
+def render_removal_row(result: Dict) -> str:
+    """Row of the removal table."""
+    if result.get('fully_removed', False):
+        row_class, result_badge = 'status-pass', BADGE.render(color='success', text='FULLY REMOVED')
+    else:
+        row_class, result_badge = 'status-fail', BADGE.render(color='danger', text='STILL PRESENT')
+
+    access_result = (BADGE.render(color='success', text='Inaccessible') if result.get('url_inaccessible', False)
+                     else BADGE.render(color='danger', text='Still Accessible'))
+    sitemap_result = (BADGE.render(color='success', text='Removed') if result.get('removed_from_sitemap', False)
+                      else BADGE.render(color='danger', text='Still in Sitemap'))
+
+    return REMOVAL_ROW.render(row_class=row_class, original_url=_text(result.get('original_url', '')),
+                              status_code=_text(result.get('status_code', 'N/A')), response_time=_response_time(result),
+                              access_result=access_result, sitemap_result=sitemap_result, result_badge=result_badge,
+                              error=_text(result.get('error', '')))
+
+
+def render_failed_row(result: Dict) -> str:
+    """Row of the failed-tests table."""
+    return FAILED_ROW.render(url=_text(result.get('original_url', result.get('url', ''))),
+                             test_type=_text(result.get('test_type', 'unknown').upper()),
+                             status_code=_text(result.get('status_code', 'N/A')), response_time=_response_time(result),
+                             failure_details=render_failure_details(result),
+                             expected_url=_text(result.get('expected_url', result.get('url', ''))))
+
+
+class HTMLReportWriter:
+    """Writes the HTML report of a run to a file, section by section."""
+
+    def __init__(self, path: str, environment: str = None):
+        """Initialize writer for the report at path."""
+        self.path = path
+        self.environment = environment or Config.CURRENT_ENV
+
+    def write(self, redirect_results: List[Dict], remove_results: List[Dict],
+              sitemap_analysis: Dict = None, performance: Dict = None) -> str:
+        """
+        Render and write the report.
+
+        Returns:
+            Path of the written report
+        """
+        passed_tests = sum(1 for r in chain(redirect_results, remove_results) if r.get('success', False))
+        total_tests = len(redirect_results) + len(remove_results)
+        counts = {
+            'total_tests': total_tests,
+            'total_redirects': len(redirect_results),
+            'total_removes': len(remove_results),
+            'passed_tests': passed_tests,
+            'failed_tests': total_tests - passed_tests,
+            'success_rate': f"{(passed_tests / total_tests * 100) if total_tests else 0:.1f}",
+        }
+
+        dashboard = DASHBOARD.render(sitemap=render_sitemap_analysis(sitemap_analysis),
+                                     performance=render_performance(performance), **counts)
+        failed = (r for r in chain(redirect_results, remove_results) if not r.get('success', False))
+        sections = [
+            ([dashboard], None),
+            (redirect_results, (REDIRECTS_START, render_redirect_row)),
+            (remove_results, (REMOVALS_START, render_removal_row)),
+            (failed, (FAILED_START, render_failed_row)),
+        ]
+
+        temp_path = f"{self.path}.tmp"
+        parts = []
+        try:
+            with ThreadPoolExecutor(max_workers=Config.HTML_REPORT_WORKERS) as executor:
+                parts = list(executor.map(lambda section: self._render_part(*section), sections))
+
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(PAGE_START.render(generated=datetime.now().strftime('%Y-%m-%d at %H:%M:%S'),
+                                          environment=_text(self.environment.upper()),
+                                          base_url=_text(Config.get_base_url(self.environment)), **counts))
+                for part in parts:
+                    part.seek(0)
+                    shutil.copyfileobj(part, f, Config.HTML_REPORT_CHUNK_SIZE)
+                f.write(PAGE_END.render(failed_tests=counts['failed_tests']))
+            os.replace(temp_path, self.path)
+        finally:
+            for part in parts:
+                part.close()
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        return self.path
+
+    @staticmethod
+    def _render_part(rows: Iterable, table=None):
+        """
+        Render one section into an anonymous temporary file.
+
+        Args:
+            rows: Results to render as table rows (or ready HTML if table is None)
+            table: (opening HTML, row renderer) of a results table
+        """
+        part = tempfile.TemporaryFile('w+', encoding='utf-8')
+        if table is None:
+            part.writelines(rows)
+            return part
+
+        start, render_row = table
+        part.write(start)
+        part.writelines(map(render_row, rows))
+        part.write(TABLE_END)
+        return part
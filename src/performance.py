@@ -0,0 +1,155 @@
+"""
+Response-time regression detection against the crawl export's baseline.
+
+Every row of a Screaming Frog export carries the `Response Time` measured
+during the original crawl. ResponseTimeAnalyzer joins those baselines with
+the timings measured in this run:
+- per URL, a slowdown counts when the live time is both Config.REGRESSION_RATIO
+  times the baseline and Config.REGRESSION_MIN_DELTA seconds slower; flagged
+  URLs are re-measured and judged on the median of Config.REGRESSION_SAMPLES
+- per path prefix (first path segment), a one-sided sign test over the URLs
+  in the prefix tells a consistent slowdown from noise
+"""
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from math import comb, erfc, sqrt
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
+from config import Config
+
+
+class ResponseTimeAnalyzer:
+    """Compares live response times with crawl export baselines."""
+
+    def __init__(self):
+        """Initialize with no samples."""
+        self.samples: List[Dict] = []
+
+    def add(self, url: str, kind: str, live_time: Optional[float], baseline_time,
+            remeasure: Callable[[], Optional[float]] = None):
+        """
+        Add a live timing for a URL that has a baseline.
+
+        Args:
+            url: Tested URL
+            kind: What was timed ('original', 'target' or 'remove')
+            live_time: Response time measured in this run (seconds)
+            baseline_time: `Response Time` from the export ('' or 0 if missing)
+            remeasure: Callable returning a fresh timing, used to confirm slowdowns
+        """
+        try:
+            baseline_time = float(baseline_time)
+        except (TypeError, ValueError):
+            return
+        if live_time is None or baseline_time <= 0:
+            return
+
+        self.samples.append({
+            'url': url,
+            'kind': kind,
+            'prefix': self.path_prefix(url),
+            'baseline': baseline_time,
+            'timings': [live_time],
+            'remeasure': remeasure
+        })
+
+    @staticmethod
+    def path_prefix(url: str) -> str:
+        """First path segment of a URL, e.g. '/horoscope'."""
+        if '://' in url:
+            path = urlparse(url).path
+        elif url.startswith('/'):
+            path = url
+        else:
+            path = url.partition('/')[2]  # 'host/path' as cleaned by CSVParser
+        segment = path.strip('/').split('/', 1)[0]
+        return f'/{segment}' if segment else '/'
+
+    @staticmethod
+    def is_regression(live_time: float, baseline_time: float) -> bool:
+        """Check the ratio and absolute slowdown thresholds."""
+        return (live_time >= baseline_time * Config.REGRESSION_RATIO and
+                live_time - baseline_time >= Config.REGRESSION_MIN_DELTA)
+
+    @staticmethod
+    def sign_test_p_value(slower: int, total: int) -> float:
+        """One-sided sign test: chance of at least `slower` of `total` URLs being slower by luck."""
+        if total == 0:
+            return 1.0
+        if total > 1000:
+            # Normal approximation with continuity correction; exact sums get slow
+            z = (slower - 0.5 - total / 2) / sqrt(total / 4)
+            return 0.5 * erfc(z / sqrt(2))
+        return sum(comb(total, k) for k in range(slower, total + 1)) / 2 ** total
+
+    def _confirm(self):
+        """Re-measure URLs whose first timing crossed the thresholds."""
+        flagged = [s for s in self.samples
+                   if s['remeasure'] and self.is_regression(s['timings'][0], s['baseline'])]
+        if not flagged or Config.REGRESSION_SAMPLES <= 1:
+            return
+
+        def collect(sample):
+            for _ in range(Config.REGRESSION_SAMPLES - 1):
+                timing = sample['remeasure']()
+                if timing is not None:
+                    sample['timings'].append(timing)
+
+        with ThreadPoolExecutor(max_workers=min(Config.MAX_CONCURRENCY, len(flagged))) as executor:
+            list(executor.map(collect, flagged))
+
+    def analyze(self) -> Dict:
+        """
+        Confirm slowdowns and summarize them per URL and per path prefix.
+
+        Returns:
+            Dictionary with 'urls' and 'prefixes' rows plus regression counts
+        """
+        self._confirm()
+
+        url_rows = []
+        for sample in self.samples:
+            live = statistics.median(sample['timings'])
+            url_rows.append({
+                'url': sample['url'],
+                'kind': sample['kind'],
+                'prefix': sample['prefix'],
+                'baseline_time': sample['baseline'],
+                'live_time': round(live, 3),
+                'samples': len(sample['timings']),
+                'ratio': round(live / sample['baseline'], 2),
+                'delta': round(live - sample['baseline'], 3),
+                'regression': self.is_regression(live, sample['baseline'])
+            })
+
+        by_prefix = {}
+        for row in url_rows:
+            by_prefix.setdefault(row['prefix'], []).append(row)
+
+        prefix_rows = []
+        for prefix, rows in sorted(by_prefix.items()):
+            baseline = statistics.median(r['baseline_time'] for r in rows)
+            live = statistics.median(r['live_time'] for r in rows)
+            slower = sum(1 for r in rows if r['live_time'] > r['baseline_time'])
+            p_value = self.sign_test_p_value(slower, len(rows))
+            prefix_rows.append({
+                'prefix': prefix,
+                'urls': len(rows),
+                'baseline_time': round(baseline, 3),
+                'live_time': round(live, 3),
+                'ratio': round(live / baseline, 2),
+                'slower': slower,
+                'p_value': round(p_value, 4),
+                'regression': (len(rows) >= Config.REGRESSION_MIN_PREFIX_URLS and
+                               p_value < Config.REGRESSION_ALPHA and
+                               self.is_regression(live, baseline))
+            })
+
+        url_rows.sort(key=lambda r: (not r['regression'], -r['ratio']))
+        return {
+            'compared': len(url_rows),
+            'regressions': sum(1 for r in url_rows if r['regression']),
+            'prefix_regressions': sum(1 for r in prefix_rows if r['regression']),
+            'urls': url_rows,
+            'prefixes': prefix_rows
+        }
@@ -0,0 +1,143 @@
+"""
+Per-stage timing of a run (--profile) and whole-run cProfile dumps (--profile-output).
+
+The only timing a run used to print was its total execution time.
+StageProfiler splits a run into the stages run_test_for_file goes through
+(CSV load, sitemap fetch, sitemap parse, URL testing, sitemap analysis,
+report writing, ...) and records for each
+- wall time
+- CPU time of the whole process (worker threads included, so CPU time above
+  wall time means the stage used several cores or threads at once)
+- peak resident memory at the end of the stage and how much the stage raised
+  it (from getrusage; not available on Windows)
+- how many items it handled (rows, URLs, tests)
+
+Stages are laps: starting one ends the previous one, so instrumenting a run
+takes one line per stage and costs two clock and getrusage reads per stage.
+Stage transitions are also emitted as stage_start/stage_end events (see
+events.py).
+
+ThreadProfile runs cProfile in every thread of the process, the URL testing
+worker threads included, and merges them into one pstats file. Before Python
+3.12 cProfile only sees the thread that enabled it, so every new thread gets
+its own profile. From 3.12 on cProfile is built on sys.monitoring, which
+allows one active profiler per process but sees all threads, so the calling
+thread's profile alone covers the run.
+"""
+import cProfile
+import pstats
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+from events import emit
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_memory() -> Optional[int]:
+    """Peak resident set size of the process in bytes (None where unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class StageProfiler:
+    """Wall time, CPU time, peak memory and item counts per stage of a run."""
+
+    def __init__(self):
+        """Initialize profiler with no stage running."""
+        self.stages: List[Dict] = []
+        self._current: Optional[Dict] = None
+
+    def stage(self, name: str, items: int = None):
+        """End the running stage (if any) and start the named one."""
+        self.end()
+        self._current = {
+            'name': name,
+            'items': items,
+            'wall_start': time.perf_counter(),
+            'cpu_start': time.process_time(),
+            'memory_start': peak_memory(),
+        }
+        emit('stage_start', stage=name)
+
+    def count(self, items: int):
+        """Set how many items the running stage handled."""
+        if self._current:
+            self._current['items'] = items
+
+    def end(self):
+        """End the running stage."""
+        stage, self._current = self._current, None
+        if stage is None:
+            return
+
+        memory = peak_memory()
+        self.stages.append({
+            'name': stage['name'],
+            'items': stage['items'],
+            'wall_time': time.perf_counter() - stage['wall_start'],
+            'cpu_time': time.process_time() - stage['cpu_start'],
+            'peak_memory': memory,
+            'memory_growth': memory - stage['memory_start'] if memory is not None else None,
+        })
+        emit('stage_end', stage=stage['name'], items=stage['items'],
+             wall_time=round(self.stages[-1]['wall_time'], 3), cpu_time=round(self.stages[-1]['cpu_time'], 3),
+             peak_memory=memory)
+
+    def get_breakdown(self) -> Dict:
+        """Recorded stages with their share of the total wall time."""
+        self.end()
+        total = sum(stage['wall_time'] for stage in self.stages)
+        return {
+            'total_wall_time': total,
+            'total_cpu_time': sum(stage['cpu_time'] for stage in self.stages),
+            'stages': [dict(stage, share=stage['wall_time'] / total if total else 0.0) for stage in self.stages],
+        }
+
+
+class ThreadProfile:
+    """cProfile of all threads of the process, dumped as one pstats file."""
+
+    def __init__(self):
+        """Initialize profile (not started)."""
+        self.profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Profile the calling thread and every thread started from now on."""
+        profile = cProfile.Profile()
+        self.profiles.append(profile)
+        profile.enable()
+        if sys.version_info < (3, 12):
+            threading.setprofile(self._profile_thread)
+
+    def _profile_thread(self, frame, event, arg):
+        """First profile event of a new thread: replace this hook with a cProfile of the thread."""
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:  # another profiler is active (sys.monitoring based cProfile)
+            sys.setprofile(None)
+            return
+        with self._lock:
+            self.profiles.append(profile)
+
+    def stop(self, path: str) -> pstats.Stats:
+        """Stop profiling and write the merged statistics to path."""
+        threading.setprofile(None)
+        main, *threads = self.profiles
+        # Disable the calling thread's profile first: collecting the others
+        # clears the calling thread's profile hook
+        main.disable()
+        stats = pstats.Stats(main)
+        with self._lock:
+            for profile in threads:
+                stats.add(profile)
+        stats.dump_stats(path)
+        return stats
@@ -6,7 +6,6 @@ import json
 from datetime import datetime
 from typing import List, Dict
 from colorama import Fore, Style, init
-from tqdm import tqdm
 from config import Config
 
 # Initialize colorama for cross-platform colored output
@@ -121,6 +120,12 @@ Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
         print(f"        Sitemap: {sitemap_symbol} {sitemap_color}{sitemap_status}{Style.RESET_ALL}")
         print(f"        Overall: {overall_symbol} {overall_color}{overall_status}{Style.RESET_ALL}")
 
+        if result.get('redirect_check') and not result['redirect_check']['verified']:
+            print(f"        Redirect: {Fore.RED}{result['redirect_check']['issue']}{Style.RESET_ALL}")
+
+        if result.get('head_issues'):
+            print(f"        Head: {Fore.RED}{'; '.join(result['head_issues'])}{Style.RESET_ALL}")
+
         if result.get('error'):
             print(f"        Error: {Fore.RED}{result['error']}{Style.RESET_ALL}")
 
@@ -137,13 +142,24 @@ Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
             if current == total:
                 print()  # New line when complete
 
-    def create_progress_bar(self, total: int, description: str = "Testing URLs") -> tqdm:
-        """Create a tqdm progress bar."""
+    def create_progress_bar(self, total: int, description: str = "Testing URLs"):
+        """Create a tqdm progress bar (tqdm is only imported when progress is shown)."""
         if Config.SHOW_PROGRESS:
+            from tqdm import tqdm
             return tqdm(total=total, desc=description, unit="url")
         else:
             return None
 
+    def print_sitemap_diff_summary(self, summary: Dict):
+        """Print added/removed/changed counts from a sitemap snapshot diff."""
+        print(f"🔀 Sitemap changes vs {summary['baseline']}:")
+        print(f"   • Added: {summary['added']}")
+        print(f"   • Removed: {summary['removed']}")
+        print(f"   • Lastmod changed: {summary['lastmod_changed']}")
+        print(f"   • Unchanged: {summary['unchanged']}")
+        if summary.get('csv_path'):
+            print(f"   • Details: {summary['csv_path']}")
+
     def print_summary(self, redirect_results: List[Dict], remove_results: List[Dict],
                      sitemap_analysis: Dict = None, csv_file: str = None):
         """Print comprehensive test summary with dual criteria."""
@@ -166,6 +182,10 @@ Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
             print(f"\n🔄 Redirect URL Testing ({total_redirects} URLs):")
             print(f"  📱 URL Accessibility:     {url_accessible}/{total_redirects} ({(url_accessible/total_redirects)*100:.1f}%)")
             print(f"  🗺️  Sitemap Compliance:    {sitemap_compliant}/{total_redirects} ({(sitemap_compliant/total_redirects)*100:.1f}%)")
+            checked = [r for r in redirect_results if r.get('redirect_check')]
+            if checked:
+                verified = sum(1 for r in checked if r['redirect_check']['verified'])
+                print(f"  🔁 Redirect Verified:     {verified}/{len(checked)} ({(verified/len(checked))*100:.1f}%)")
             print(f"  ✅ Overall Success:       {overall_success}/{total_redirects} ({(overall_success/total_redirects)*100:.1f}%)")
 
             print(f"\n🔍 Sitemap Details:")
@@ -180,6 +200,9 @@ Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
                     print(f"  ❌ URLs not accessible: {failed_accessibility}")
                 if failed_sitemap > 0:
                     print(f"  ❌ Sitemap non-compliant: {failed_sitemap}")
+                failed_redirects = sum(1 for r in checked if not r['redirect_check']['verified'])
+                if failed_redirects > 0:
+                    print(f"  ❌ Original URL not 301 to expected URL: {failed_redirects}")
 
         # Remove URL testing summary
         if remove_results:
@@ -203,6 +226,11 @@ Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
                 total = expected_data.get('total_expected', 0)
                 print(f"  Expected URLs found: {found}/{total}")
 
+            snapshot_diff = sitemap_analysis.get('snapshot_diff')
+            if snapshot_diff:
+                print(f"  Changes since last snapshot: +{snapshot_diff['added']} / -{snapshot_diff['removed']} "
+                      f"({snapshot_diff['lastmod_changed']} lastmod changed)")
+
         # Calculate overall statistics
         all_results = (redirect_results or []) + (remove_results or [])
         if all_results:
@@ -237,7 +265,10 @@ Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
                     'test_type', 'original_url', 'expected_url', 'tested_url',
                     'status_code', 'response_time',
                     'url_accessible', 'url_inaccessible', 'expected_in_sitemap', 'original_removed', 'removed_from_sitemap',
-                    'sitemap_compliant', 'fully_removed', 'overall_success', 'error', 'redirect_chain'
+                    'sitemap_compliant', 'fully_removed', 'overall_success', 'error', 'redirect_chain',
+                    'sitemap_suggestions', 'content_hash', 'content_size', 'hash_match', 'soft_404',
+                    'page_title', 'page_canonical', 'page_meta_robots', 'head_issues', 'head_changes',
+                    'original_status', 'original_location', 'redirect_verified', 'redirect_issue'
                 ]
                 writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
                 writer.writeheader()
@@ -260,7 +291,21 @@ Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
                         'fully_removed': 'N/A',  # Not applicable for redirect URLs
                         'overall_success': result.get('success', False),
                         'error': result.get('error', ''),
-                        'redirect_chain': ','.join(map(str, result.get('redirect_chain', [])))
+                        'redirect_chain': ','.join(map(str, result.get('redirect_chain', []))),
+                        'sitemap_suggestions': ' | '.join(s['url'] for s in result.get('sitemap_suggestions', [])),
+                        'content_hash': result.get('content_hash', ''),
+                        'content_size': result.get('content_size', ''),
+                        'hash_match': result.get('hash_match', 'N/A'),
+                        'soft_404': result.get('soft_404', False),
+                        'page_title': (result.get('page_head') or {}).get('title', ''),
+                        'page_canonical': (result.get('page_head') or {}).get('canonical', ''),
+                        'page_meta_robots': (result.get('page_head') or {}).get('meta_robots', ''),
+                        'head_issues': '; '.join(result.get('head_issues', [])),
+                        'head_changes': ', '.join(result.get('head_changes', [])),
+                        'original_status': (result.get('redirect_check') or {}).get('status_code', ''),
+                        'original_location': (result.get('redirect_check') or {}).get('location', ''),
+                        'redirect_verified': (result.get('redirect_check') or {}).get('verified', 'N/A'),
+                        'redirect_issue': (result.get('redirect_check') or {}).get('issue') or ''
                     })
 
                 # Write remove results
@@ -281,7 +326,21 @@ Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
                         'fully_removed': result.get('fully_removed', False),
                         'overall_success': result.get('fully_removed', False),  # Use fully_removed for success
                         'error': result.get('error', ''),
-                        'redirect_chain': ','.join(map(str, result.get('redirect_chain', [])))
+                        'redirect_chain': ','.join(map(str, result.get('redirect_chain', []))),
+                        'sitemap_suggestions': '',
+                        'content_hash': result.get('content_hash', ''),
+                        'content_size': result.get('content_size', ''),
+                        'hash_match': result.get('hash_match', 'N/A'),
+                        'soft_404': result.get('soft_404', False),
+                        'page_title': 'N/A',  # Not applicable for removal URLs
+                        'page_canonical': 'N/A',
+                        'page_meta_robots': 'N/A',
+                        'head_issues': '',
+                        'head_changes': '',
+                        'original_status': 'N/A',  # Not applicable for removal URLs
+                        'original_location': 'N/A',
+                        'redirect_verified': 'N/A',
+                        'redirect_issue': ''
                     })
 
             print(f"✅ CSV results saved to: {csv_path}")
@@ -291,486 +350,278 @@ Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
             print(f"❌ Error saving CSV results: {e}")
             return ""
 
-    def _generate_failure_details(self, result: Dict) -> str:
-        """Generate detailed failure description for failed tests."""
-        details = []
-        test_type = result.get('test_type', 'unknown')
+    def save_performance_csv(self, performance: Dict, csv_file: str = None) -> str:
+        """Save per-URL and per-prefix response-time comparisons to CSV."""
+        csv_path = Config.get_performance_csv_path(csv_file, self.environment)
 
-        if test_type == 'redirect':
-            url_accessible = result.get('url_accessible', False)
-            expected_in_sitemap = result.get('expected_in_sitemap', False)
-            original_removed = result.get('original_removed', False)
+        try:
+            with open(csv_path, 'w', newline='', encoding='utf-8') as csvfile:
+                fieldnames = ['level', 'url_or_prefix', 'kind', 'baseline_time', 'live_time', 'ratio',
+                              'delta', 'samples', 'slower_urls', 'p_value', 'regression']
+                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+                writer.writeheader()
 
-            if not url_accessible:
-                status_code = result.get('status_code', 'N/A')
-                details.append(f'<span class="badge bg-danger">URL Not Accessible</span> ({status_code})')
+                for row in performance['prefixes']:
+                    writer.writerow({
+                        'level': 'prefix',
+                        'url_or_prefix': row['prefix'],
+                        'kind': '',
+                        'baseline_time': row['baseline_time'],
+                        'live_time': row['live_time'],
+                        'ratio': row['ratio'],
+                        'delta': round(row['live_time'] - row['baseline_time'], 3),
+                        'samples': row['urls'],
+                        'slower_urls': row['slower'],
+                        'p_value': row['p_value'],
+                        'regression': row['regression']
+                    })
 
-            if not expected_in_sitemap:
-                details.append('<span class="badge bg-warning">Missing from Sitemap</span>')
+                for row in performance['urls']:
+                    writer.writerow({
+                        'level': 'url',
+                        'url_or_prefix': row['url'],
+                        'kind': row['kind'],
+                        'baseline_time': row['baseline_time'],
+                        'live_time': row['live_time'],
+                        'ratio': row['ratio'],
+                        'delta': row['delta'],
+                        'samples': row['samples'],
+                        'slower_urls': '',
+                        'p_value': '',
+                        'regression': row['regression']
+                    })
 
-            if not original_removed:
-                details.append('<span class="badge bg-warning">Original URL Still in Sitemap</span>')
+            print(f"✅ Performance comparison saved to: {csv_path}")
+            return csv_path
 
-            if result.get('error'):
-                details.append(f'<span class="badge bg-secondary">Error</span> {result.get("error")}')
+        except Exception as e:
+            print(f"❌ Error saving performance CSV: {e}")
+            return ""
 
-        elif test_type == 'remove':
-            url_inaccessible = result.get('url_inaccessible', False)
-            removed_from_sitemap = result.get('removed_from_sitemap', False)
+    def print_sampling_summary(self, estimates: Dict):
+        """Print file-wide pass-rate estimates of a sampled run with confidence intervals."""
+        print(f"🎲 Sampled run (seed {estimates['seed']}): estimated pass rates for the whole file, "
+              f"{estimates['confidence']:.0%} confidence intervals")
+        for label, key in (('Overall', 'overall'), ('Redirects', 'redirect'), ('Removals', 'remove')):
+            estimate = estimates[key]
+            if estimate is None:
+                continue
+            print(f"   • {label}: {estimate['pass_rate']:.1%} "
+                  f"[{estimate['ci_low']:.1%} - {estimate['ci_high']:.1%}] "
+                  f"from {estimate['tested']} of {estimate['population']} URLs ({estimate['passed']} passed)")
+
+        failing = [s for s in estimates['strata'] if s['tested'] and s['passed'] < s['tested']]
+        failing.sort(key=lambda s: s['passed'] / s['tested'])
+        for stratum in failing[:Config.SAMPLE_STRATA_SHOWN]:
+            print(f"   ⚠️  {stratum['test_type']} {stratum['prefix']} (previously {stratum['previous']}): "
+                  f"{stratum['passed']}/{stratum['tested']} passed of {stratum['population']} URLs")
+
+    def save_untested_csv(self, untested: List[Dict], reason: str, csv_file: str = None) -> str:
+        """Save the rows a run stopped before testing (highest priority first)."""
+        csv_path = Config.get_untested_csv_path(csv_file, self.environment)
 
-            if not url_inaccessible:
-                details.append('<span class="badge bg-danger">URL Still Accessible</span>')
+        try:
+            with open(csv_path, 'w', newline='', encoding='utf-8') as csvfile:
+                fieldnames = ['test_type', 'original_url', 'expected_url', 'priority', 'reason']
+                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+                writer.writeheader()
 
-            if not removed_from_sitemap:
-                details.append('<span class="badge bg-warning">Still in Sitemap</span>')
+                for item in untested:
+                    writer.writerow({
+                        'test_type': item['test_type'],
+                        'original_url': item['original_url'],
+                        'expected_url': item.get('expected_url') or 'REMOVE',
+                        'priority': item.get('priority', ''),
+                        'reason': reason
+                    })
 
-            if result.get('error'):
-                details.append(f'<span class="badge bg-secondary">Error</span> {result.get("error")}')
+            print(f"✅ Untested URLs saved to: {csv_path}")
+            return csv_path
 
-        return '<div class="failure-details">' + '<br>'.join(details) + '</div>' if details else 'Unknown failure'
+        except Exception as e:
+            print(f"❌ Error saving untested URLs CSV: {e}")
+            return ""
 
-    def save_html_report(self, redirect_results: List[Dict], remove_results: List[Dict],
-                        sitemap_analysis: Dict = None, csv_file: str = None) -> str:
-        """Save comprehensive HTML report."""
-        html_path = Config.get_report_html_path(csv_file, self.environment)
+    def print_untested_summary(self, untested: List[Dict], reason: str):
+        """Print why a run stopped early and how many URLs it left untested."""
+        redirects = sum(1 for item in untested if item['test_type'] == 'redirect')
+        print(f"⏭️  Stopped early ({reason}): {len(untested)} URLs not tested "
+              f"({redirects} redirect, {len(untested) - redirects} remove)")
+        for item in untested[:Config.UNTESTED_SAMPLE_SIZE]:
+            print(f"   • {item['test_type']}: {item['original_url']}")
+        if len(untested) > Config.UNTESTED_SAMPLE_SIZE:
+            print(f"   • ... and {len(untested) - Config.UNTESTED_SAMPLE_SIZE} more")
+
+    def append_watch_history(self, cycle: Dict, results: List[Dict], csv_file: str = None) -> str:
+        """Append one watch cycle and the results it re-checked to the JSON Lines history."""
+        history_path = Config.get_watch_history_path(csv_file, self.environment)
 
         try:
-            # Calculate enhanced statistics
-            total_redirects = len(redirect_results)
-            url_accessible = sum(1 for r in redirect_results if r.get('url_accessible', False))
-            sitemap_compliant = sum(1 for r in redirect_results if r.get('sitemap_compliant', False))
-            overall_success = sum(1 for r in redirect_results if r['success'])
-            total_removes = len(remove_results)
-            passed_removes = sum(1 for r in remove_results if r['success'])
+            with open(history_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({'type': 'cycle', **cycle}) + '\n')
+                for result in results:
+                    f.write(json.dumps({
+                        'type': 'result',
+                        'cycle': cycle['cycle'],
+                        'checked_at': cycle['started'],
+                        'test_type': result.get('test_type', ''),
+                        'original_url': result.get('original_url', ''),
+                        'url': result.get('full_url', result.get('url', '')),
+                        'status_code': result.get('status_code'),
+                        'response_time': result.get('response_time'),
+                        'success': result['success'],
+                        'error': result.get('error') or ''
+                    }) + '\n')
+            return history_path
 
-            # Calculate overall statistics for HTML report
-            all_results = redirect_results + remove_results
-            passed_tests = sum(1 for r in all_results if r.get('success', False))
-            failed_tests = len(all_results) - passed_tests
-            success_rate = (passed_tests / len(all_results) * 100) if all_results else 0
-
-            html_content = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>California Psychics Sitemap QA Report</title>
-    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css" rel="stylesheet">
-    <link href="https://cdn.datatables.net/1.13.6/css/dataTables.bootstrap5.min.css" rel="stylesheet">
-    <link href="https://cdn.datatables.net/fixedheader/3.4.0/css/fixedHeader.bootstrap5.min.css" rel="stylesheet">
-    <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css" rel="stylesheet">
-    <script src="https://code.jquery.com/jquery-3.7.1.min.js"></script>
-    <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js"></script>
-    <script src="https://cdn.datatables.net/1.13.6/js/jquery.dataTables.min.js"></script>
-    <script src="https://cdn.datatables.net/1.13.6/js/dataTables.bootstrap5.min.js"></script>
-    <script src="https://cdn.datatables.net/fixedheader/3.4.0/js/dataTables.fixedHeader.min.js"></script>
-    <style>
-        .status-pass {{ background-color: #d1edff !important; }}
-        .status-fail {{ background-color: #f8d7da !important; }}
-        .status-partial {{ background-color: #fff3cd !important; }}
-        .nav-tabs .nav-link.active {{ font-weight: bold; border-bottom: 3px solid #0d6efd; background: white; }}
-        .metric-value {{ font-size: 2rem; font-weight: bold; }}
-        .metric-label {{ font-size: 0.875rem; color: #6c757d; }}
-        .table-responsive {{ max-height: 70vh; }}
-        .nav-tabs {{ border-bottom: 2px solid #dee2e6; }}
-        .nav-tabs .nav-link {{ border: none; padding: 1rem 1.5rem; font-weight: 500; }}
-        .tab-content {{ background: white; border-radius: 0 0 0.375rem 0.375rem; }}
-        /* Fixed header styling */
-        .dataTables_scrollHead {{
-            background: white;
-            border-bottom: 2px solid #dee2e6;
-        }}
-        .dataTables_scrollHeadInner table thead th {{
-            background: #f8f9fa;
-            position: sticky;
-            top: 0;
-            z-index: 10;
-        }}
-        /* Fallback sticky headers */
-        .sticky-header th {{
-            position: sticky;
-            top: 0;
-            background: #f8f9fa;
-            z-index: 10;
-            border-bottom: 2px solid #dee2e6;
-        }}
-        .failure-details {{
-            font-size: 0.85rem;
-            line-height: 1.3;
-        }}
-    </style>
-</head>
-<body class="bg-light">
-    <div class="container-fluid py-4">
-        <!-- Header -->
-        <div class="row mb-4">
-            <div class="col">
-                <div class="text-center">
-                    <h1 class="display-5 mb-2">
-                        <i class="fas fa-sitemap text-primary"></i>
-                        California Psychics Sitemap QA Report
-                    </h1>
-                    <p class="text-muted">{datetime.now().strftime('%Y-%m-%d at %H:%M:%S')}</p>
-                    <p class="text-muted">Environment: <strong>{Config.CURRENT_ENV.upper()}</strong> ({Config.get_base_url()})</p>
-                </div>
-            </div>
-        </div>
-
-        <!-- Tab Navigation -->
-        <ul class="nav nav-tabs mb-0" id="reportTabs" role="tablist">
-            <li class="nav-item" role="presentation">
-                <button class="nav-link active" id="dashboard-tab" data-bs-toggle="tab" data-bs-target="#dashboard" type="button" role="tab">
-                    <i class="fas fa-tachometer-alt me-2"></i>Dashboard
-                </button>
-            </li>
-            <li class="nav-item" role="presentation">
-                <button class="nav-link" id="redirects-tab" data-bs-toggle="tab" data-bs-target="#redirects" type="button" role="tab">
-                    <i class="fas fa-exchange-alt me-2"></i>Redirect URLs ({len(redirect_results)})
-                </button>
-            </li>
-            <li class="nav-item" role="presentation">
-                <button class="nav-link" id="removals-tab" data-bs-toggle="tab" data-bs-target="#removals" type="button" role="tab">
-                    <i class="fas fa-trash-alt me-2"></i>Removal URLs ({len(remove_results)})
-                </button>
-            </li>
-            <li class="nav-item" role="presentation">
-                <button class="nav-link" id="failed-tab" data-bs-toggle="tab" data-bs-target="#failed" type="button" role="tab">
-                    <i class="fas fa-exclamation-triangle me-2"></i>Failed Tests ({failed_tests})
-                </button>
-            </li>
-        </ul>
-
-        <!-- Tab Content -->
-        <div class="tab-content p-4 bg-white shadow-sm" id="reportTabContent">
-
-            <!-- Dashboard Tab -->
-            <div class="tab-pane fade show active" id="dashboard" role="tabpanel">
-                <div class="row g-4 mb-4">
-                    <div class="col-md-3">
-                        <div class="card border-0 shadow-sm h-100">
-                            <div class="card-body text-center">
-                                <i class="fas fa-list-ol fa-2x text-primary mb-2"></i>
-                                <div class="metric-value text-primary">{len(all_results)}</div>
-                                <div class="metric-label">Total URLs Tested</div>
-                            </div>
-                        </div>
-                    </div>
-                    <div class="col-md-3">
-                        <div class="card border-0 shadow-sm h-100">
-                            <div class="card-body text-center">
-                                <i class="fas fa-check-circle fa-2x text-success mb-2"></i>
-                                <div class="metric-value text-success">{passed_tests}</div>
-                                <div class="metric-label">Passed Tests</div>
-                            </div>
-                        </div>
-                    </div>
-                    <div class="col-md-3">
-                        <div class="card border-0 shadow-sm h-100">
-                            <div class="card-body text-center">
-                                <i class="fas fa-times-circle fa-2x text-danger mb-2"></i>
-                                <div class="metric-value text-danger">{failed_tests}</div>
-                                <div class="metric-label">Failed Tests</div>
-                            </div>
-                        </div>
-                    </div>
-                    <div class="col-md-3">
-                        <div class="card border-0 shadow-sm h-100">
-                            <div class="card-body text-center">
-                                <i class="fas fa-percentage fa-2x text-info mb-2"></i>
-                                <div class="metric-value text-info">{success_rate:.1f}%</div>
-                                <div class="metric-label">Success Rate</div>
-                            </div>
-                        </div>
-                    </div>
-                </div>
-
-                <!-- Quick Stats -->
-                <div class="row">
-                    <div class="col-md-6">
-                        <div class="card">
-                            <div class="card-header">
-                                <h5 class="mb-0"><i class="fas fa-chart-pie me-2"></i>Test Summary</h5>
-                            </div>
-                            <div class="card-body">
-                                <div class="mb-2">
-                                    <span class="badge bg-primary me-2">Redirect Tests:</span> {len(redirect_results)}
-                                </div>
-                                <div class="mb-2">
-                                    <span class="badge bg-warning me-2">Removal Tests:</span> {len(remove_results)}
-                                </div>
-                                <div class="mb-2">
-                                    <span class="badge bg-success me-2">Passed:</span> {passed_tests}
-                                </div>
-                                <div>
-                                    <span class="badge bg-danger me-2">Failed:</span> {failed_tests}
-                                </div>
-                            </div>
-                        </div>
-                    </div>
-                    <div class="col-md-6">
-                        <div class="card">
-                            <div class="card-header">
-                                <h5 class="mb-0"><i class="fas fa-sitemap me-2"></i>Sitemap Analysis</h5>
-                            </div>
-                            <div class="card-body">"""
-
-            # Add sitemap analysis if available
-            if sitemap_analysis and sitemap_analysis.get('fetch_success'):
-                expected_data = sitemap_analysis.get('expected_urls', {})
-                if expected_data:
-                    found = expected_data.get('found_in_sitemap', 0)
-                    total = expected_data.get('total_expected', 0)
-                    compliance_rate = (found / total * 100) if total > 0 else 0
-                    html_content += f"""
-                                    <div class="mb-2">
-                                        <span class="badge bg-info me-2">Total Sitemap URLs:</span> {sitemap_analysis.get('total_urls_in_sitemap', 0)}
-                                    </div>
-                                    <div class="mb-2">
-                                        <span class="badge bg-success me-2">Expected URLs Found:</span> {found}/{total}
-                                    </div>
-                                    <div>
-                                        <span class="badge bg-primary me-2">Compliance Rate:</span> {compliance_rate:.1f}%
-                                    </div>"""
-                else:
-                    html_content += """
-                                    <div class="text-muted">
-                                        <i class="fas fa-info-circle me-2"></i>Sitemap analysis not available
-                                    </div>"""
-            else:
-                html_content += """
-                                <div class="text-danger">
-                                    <i class="fas fa-exclamation-triangle me-2"></i>Sitemap fetch failed
-                                </div>"""
-
-            html_content += """
-                            </div>
-                        </div>
-                    </div>
-                </div>
-            </div>
-
-            <!-- Redirects Tab -->
-            <div class="tab-pane fade" id="redirects" role="tabpanel">
-                <div class="mb-3">
-                    <div class="alert alert-info">
-                        <strong>Legend:</strong>
-                        <span class="badge bg-success ms-2">PASS</span> URL accessible AND sitemap compliant
-                        <span class="badge bg-warning ms-2">PARTIAL</span> URL accessible but sitemap issues
-                        <span class="badge bg-danger ms-2">FAIL</span> URL not accessible or major issues
-                    </div>
-                </div>
-                <div class="table-responsive">
-                    <table id="redirectsTable" class="table table-striped table-hover">
-                        <thead class="table-dark">
-                            <tr>
-                                <th>Original URL</th>
-                                <th>Expected URL</th>
-                                <th>Status</th>
-                                <th>Response Time</th>
-                                <th>URL Access</th>
-                                <th>In Sitemap</th>
-                                <th>Original Removed</th>
-                                <th>Result</th>
-                                <th>Error</th>
-                            </tr>
-                        </thead>
-                        <tbody>"""
-
-            # Add redirect results
-            for result in redirect_results:
-                url_accessible = result.get('url_accessible', False)
-                expected_in_sitemap = result.get('expected_in_sitemap', False)
-                original_removed = result.get('original_removed', False)
-                overall_success = result.get('success', False)
-
-                if overall_success:
-                    row_class = "status-pass"
-                    result_badge = '<span class="badge bg-success">PASS</span>'
-                elif url_accessible and not (expected_in_sitemap and original_removed):
-                    row_class = "status-partial"
-                    result_badge = '<span class="badge bg-warning">PARTIAL</span>'
-                else:
-                    row_class = "status-fail"
-                    result_badge = '<span class="badge bg-danger">FAIL</span>'
-
-                url_result = f'<span class="badge bg-success">200</span>' if url_accessible else f'<span class="badge bg-danger">{result.get("status_code", "FAIL")}</span>'
-                sitemap_result = '<span class="badge bg-success">Yes</span>' if expected_in_sitemap else '<span class="badge bg-danger">No</span>'
-                removed_result = '<span class="badge bg-success">Yes</span>' if original_removed else '<span class="badge bg-danger">No</span>'
-
-                html_content += f"""
-                                <tr class="{row_class}">
-                                    <td><small>{result.get('original_url', '')}</small></td>
-                                    <td><small>{result.get('url', '')}</small></td>
-                                    <td>{result.get('status_code', 'N/A')}</td>
-                                    <td>{result.get('response_time', 0):.3f}s</td>
-                                    <td>{url_result}</td>
-                                    <td>{sitemap_result}</td>
-                                    <td>{removed_result}</td>
-                                    <td>{result_badge}</td>
-                                    <td><small>{result.get('error', '')}</small></td>
-                                </tr>"""
-
-            html_content += """
-                        </tbody>
-                    </table>
-                </div>
-            </div>
-
-            <!-- Removals Tab -->
-            <div class="tab-pane fade" id="removals" role="tabpanel">
-                <div class="mb-3">
-                    <div class="alert alert-info">
-                        <strong>Removal URL Testing:</strong> These URLs should be inaccessible and removed from sitemap.
-                    </div>
-                </div>
-                <div class="table-responsive">
-                    <table id="removalsTable" class="table table-striped table-hover">
-                        <thead class="table-dark">
-                            <tr>
-                                <th>URL to Remove</th>
-                                <th>Status Code</th>
-                                <th>Response Time</th>
-                                <th>URL Access</th>
-                                <th>Sitemap Removal</th>
-                                <th>Overall Result</th>
-                                <th>Error</th>
-                            </tr>
-                        </thead>
-                        <tbody>"""
-
-            # Add removal results with enhanced reporting
-            for result in remove_results:
-                url_inaccessible = result.get('url_inaccessible', False)
-                removed_from_sitemap = result.get('removed_from_sitemap', False)
-                fully_removed = result.get('fully_removed', False)
-
-                if fully_removed:
-                    row_class = "status-pass"
-                    result_badge = '<span class="badge bg-success">FULLY REMOVED</span>'
-                else:
-                    row_class = "status-fail"
-                    result_badge = '<span class="badge bg-danger">STILL PRESENT</span>'
-
-                access_result = '<span class="badge bg-success">Inaccessible</span>' if url_inaccessible else '<span class="badge bg-danger">Still Accessible</span>'
-                sitemap_result = '<span class="badge bg-success">Removed</span>' if removed_from_sitemap else '<span class="badge bg-danger">Still in Sitemap</span>'
-
-                html_content += f"""
-                                <tr class="{row_class}">
-                                    <td><small>{result.get('original_url', '')}</small></td>
-                                <td>{result.get('status_code', 'N/A')}</td>
-                                <td>{result.get('response_time', 0):.3f}s</td>
-                                <td>{access_result}</td>
-                                <td>{sitemap_result}</td>
-                                <td>{result_badge}</td>
-                                <td><small>{result.get('error', '')}</small></td>
-                            </tr>"""
-
-            html_content += """
-                        </tbody>
-                    </table>
-                </div>
-            </div>
-
-            <!-- Failed Tests Tab -->
-            <div class="tab-pane fade" id="failed" role="tabpanel">
-                <div class="mb-3">
-                    <div class="alert alert-danger">
-                        <strong>Failed Tests:</strong> These URLs require immediate attention.
-                    </div>
-                </div>
-                <div class="table-responsive">
-                    <table id="failedTable" class="table table-striped table-hover">
-                        <thead class="table-dark">
-                            <tr>
-                                <th>URL</th>
-                                <th>Test Type</th>
-                                <th>Status Code</th>
-                                <th>Response Time</th>
-                                <th>Failure Details</th>
-                                <th>Expected URL</th>
-                            </tr>
-                        </thead>
-                        <tbody>"""
-
-            # Add failed tests
-            failed_results = [r for r in all_results if not r.get('success', False)]
-            for result in failed_results:
-                test_type = result.get('test_type', 'unknown')
-                type_badge = f'<span class="badge bg-info">{test_type.upper()}</span>'
-                failure_details = self._generate_failure_details(result)
-
-                html_content += f"""
-                                <tr class="status-fail">
-                                    <td><small>{result.get('original_url', result.get('url', ''))}</small></td>
-                                    <td>{type_badge}</td>
-                                    <td><span class="badge bg-danger">{result.get('status_code', 'N/A')}</span></td>
-                                    <td>{result.get('response_time', 0):.3f}s</td>
-                                    <td>{failure_details}</td>
-                                    <td><small>{result.get('expected_url', result.get('url', ''))}</small></td>
-                                </tr>"""
-
-            html_content += """
-                        </tbody>
-                    </table>
-                </div>
-            </div>
-        </div>
-    </div>
-
-    <script>
-        $(document).ready(function() {{
-            // Initialize DataTables with enhanced features and fixed headers
-            const tableConfig = {{
-                responsive: true,
-                pageLength: 25,
-                lengthMenu: [[10, 25, 50, 100, -1], [10, 25, 50, 100, "All"]],
-                order: [[0, 'asc']],
-                fixedHeader: true,
-                scrollY: '60vh',
-                scrollCollapse: true,
-                columnDefs: [
-                    {{ targets: '_all', className: 'text-nowrap' }}
-                ],
-                dom: '<"row"<"col-sm-6"l><"col-sm-6"f>>' +
-                     '<"row"<"col-sm-12"tr>>' +
-                     '<"row"<"col-sm-5"i><"col-sm-7"p>>',
-                language: {{
-                    search: "Search URLs:",
-                    lengthMenu: "Show _MENU_ results per page",
-                    info: "Showing _START_ to _END_ of _TOTAL_ URLs",
-                    paginate: {{
-                        first: "First",
-                        last: "Last",
-                        next: "Next",
-                        previous: "Previous"
-                    }}
-                }}
-            }};
-
-            $('#redirectsTable').DataTable(tableConfig);
-            $('#removalsTable').DataTable(tableConfig);
-            $('#failedTable').DataTable(tableConfig);
-
-            // Auto-switch to failed tab if there are failures
-            if ({failed_tests} > 0) {{
-                // Optionally highlight the failed tab
-                $('#failed-tab').addClass('text-danger');
-            }}
-
-            // Enhanced tooltips
-            $('[data-bs-toggle="tooltip"]').tooltip();
-        }});
-    </script>
-</body>
-</html>
-"""
+        except Exception as e:
+            print(f"❌ Error saving watch history: {e}")
+            return ""
 
-            with open(html_path, 'w', encoding='utf-8') as f:
-                f.write(html_content)
+    def save_stale_links_csv(self, links: List[Dict], csv_file: str = None) -> str:
+        """Save the crawled links that point at redirected or removed URLs, grouped by target."""
+        csv_path = Config.get_crawl_links_path(csv_file, self.environment)
 
+        try:
+            with open(csv_path, 'w', newline='', encoding='utf-8') as csvfile:
+                fieldnames = ['test_type', 'original_url', 'expected_url', 'source_page', 'link_url',
+                              'anchor_text', 'occurrences']
+                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+                writer.writeheader()
+                writer.writerows(sorted(links, key=lambda link: (link['original_url'], link['source_page'])))
+
+            print(f"✅ Stale links saved to: {csv_path}")
+            return csv_path
+
+        except Exception as e:
+            print(f"❌ Error saving stale links CSV: {e}")
+            return ""
+
+    def print_crawl_summary(self, stats: Dict, targets: List[Dict]):
+        """Print crawl totals and the most linked redirected or removed URLs."""
+        print(f"🕸️  Crawled {stats['pages']} pages ({stats['html_pages']} HTML, {stats['errors']} errors) "
+              f"in {stats['duration']:.1f}s: {stats['links']} links, {stats['internal_links']} internal")
+        if stats['unvisited']:
+            print(f"   ⚠️  Page budget reached: {stats['unvisited']} discovered pages not crawled")
+
+        if not targets:
+            print("✅ No links to redirected or removed URLs found")
+            return
+
+        redirects = sum(1 for target in targets if target['test_type'] == 'redirect')
+        print(f"❌ {stats['stale_links']} links still point at {redirects} redirected and "
+              f"{len(targets) - redirects} removed URLs")
+        print(f"   {'Linking pages':>13} {'Export inlinks':>14}  URL")
+        for target in targets[:Config.CRAWL_TARGETS_SHOWN]:
+            symbol = "↪️ " if target['test_type'] == 'redirect' else "🗑️ "
+            inlinks = target.get('export_inlinks') or '-'
+            print(f"   {target['pages']:>13} {inlinks:>14}  {symbol}{target['original_url']}"
+                  + (f" → {target['expected_url']}" if target['test_type'] == 'redirect' else ""))
+
+    def print_watch_cycle(self, cycle: Dict):
+        """Print a one-block summary of a watch cycle."""
+        if cycle['cycle'] == 1:
+            sitemap_state = 'fetched'
+        else:
+            sitemap_state = 'changed' if cycle['sitemap_changed'] else 'unchanged'
+        print(f"🔁 Cycle {cycle['cycle']} ({cycle['csv_file']}, {cycle['started']}): sitemap {sitemap_state}, "
+              f"re-checked {cycle['checked']} of {cycle['total']} URLs "
+              f"({cycle['new']} new, {cycle['sitemap_affected']} sitemap-affected, {cycle['stale']} stale) "
+              f"in {cycle['duration']:.1f}s")
+        if cycle['failed']:
+            print(f"   ❌ Newly failing: {cycle['failed']}")
+        if cycle['recovered']:
+            print(f"   ✅ Recovered: {cycle['recovered']}")
+        print(f"   • Currently failing: {cycle['failing']}")
+
+    def print_url_timeline(self, url: str, timeline: List[Dict]):
+        """Print the recorded outcomes of a URL, oldest first, marking where it started or stopped failing."""
+        if not timeline:
+            print(f"ℹ️  No recorded results for {url}")
+            return
+
+        print(f"🕒 {url}: {len(timeline)} recorded result(s)")
+        previous = None
+        for entry in timeline:
+            symbol = "✅" if entry['success'] else "❌"
+            time_text = f"{entry['response_time']:.3f}s" if entry['response_time'] is not None else "-"
+            change = ""
+            if previous is not None and entry['success'] != previous:
+                change = "  ← started failing" if not entry['success'] else "  ← recovered"
+            print(f"   {symbol} {datetime.fromtimestamp(entry['started_at']).strftime('%Y-%m-%d %H:%M')} "
+                  f"{entry['environment']:<4} {entry['test_type']:<8} {entry['status_code'] or '-':>4} "
+                  f"{time_text:>8}{change}")
+            if entry['error'] and not entry['success']:
+                print(f"        {entry['error']}")
+            previous = entry['success']
+
+    def print_flaky_urls(self, flaky: List[Dict], runs: int):
+        """Print URLs whose outcome keeps changing between runs."""
+        if not flaky:
+            print(f"✅ No flaky URLs in the latest {runs} runs")
+            return
+
+        print(f"🎲 Flaky URLs in the latest {runs} runs:")
+        for row in flaky:
+            print(f"   ⚠️  {row['url']} ({row['test_type']}): {row['flips']} outcome changes, "
+                  f"passed {row['passed']}/{row['runs']}")
+
+    def print_latency_trend(self, trend: List[Dict]):
+        """Print per-day pass rates and response-time percentiles."""
+        if not trend:
+            print("ℹ️  No recorded runs in this period")
+            return
+
+        print(f"📈 {'Day':<10} {'Runs':>5} {'Tests':>7} {'Pass rate':>10} {'p50':>8} {'p95':>8} {'max p95':>8}")
+        for row in trend:
+            pass_rate = f"{row['passed'] / row['tests']:.1%}" if row['tests'] else "-"
+            times = [f"{row[key]:.3f}s" if row[key] is not None else "-" for key in ('p50', 'p95', 'max_p95')]
+            print(f"   {row['day']:<10} {row['runs']:>5} {row['tests']:>7} {pass_rate:>10} "
+                  f"{times[0]:>8} {times[1]:>8} {times[2]:>8}")
+
+    def print_profile(self, breakdown: Dict):
+        """Print the per-stage time and memory breakdown of a run (see profiling.py)."""
+        def megabytes(value):
+            return f"{value / 1024 / 1024:.1f} MB" if value is not None else "-"
+
+        self.print_section_header("⏱️  RUN PROFILE")
+        print(f"{'Stage':<20} {'Items':>8} {'Wall':>9} {'Share':>7} {'CPU':>9} {'Peak RSS':>10} {'Growth':>10}")
+        for stage in breakdown['stages']:
+            items = stage['items'] if stage['items'] is not None else "-"
+            print(f"{stage['name']:<20} {items:>8} {stage['wall_time']:>8.2f}s {stage['share']:>7.1%} "
+                  f"{stage['cpu_time']:>8.2f}s {megabytes(stage['peak_memory']):>10} "
+                  f"{megabytes(stage['memory_growth']):>10}")
+        print(f"{'Total':<20} {'':>8} {breakdown['total_wall_time']:>8.2f}s {'':>7} "
+              f"{breakdown['total_cpu_time']:>8.2f}s")
+
+    def print_performance_summary(self, performance: Dict):
+        """Print response-time regressions against the crawl baseline."""
+        print(f"⏱️  Response times compared with crawl baseline: {performance['compared']} URLs")
+        print(f"   • Slower URLs (≥{Config.REGRESSION_RATIO}x and ≥{Config.REGRESSION_MIN_DELTA}s, "
+              f"median of up to {Config.REGRESSION_SAMPLES} samples): {performance['regressions']}")
+        for row in performance['urls'][:5]:
+            if not row['regression']:
+                break
+            print(f"     - {row['url']} ({row['kind']}): {row['baseline_time']:.3f}s → {row['live_time']:.3f}s ({row['ratio']}x)")
+
+        for row in performance['prefixes']:
+            if row['regression']:
+                print(f"   ⚠️  {row['prefix']}: median {row['baseline_time']:.3f}s → {row['live_time']:.3f}s "
+                      f"({row['slower']}/{row['urls']} URLs slower, p={row['p_value']})")
+
+    def save_html_report(self, redirect_results: List[Dict], remove_results: List[Dict],
+                        sitemap_analysis: Dict = None, csv_file: str = None, performance: Dict = None) -> str:
+        """Save comprehensive HTML report (streamed to disk, see html_report.py)."""
+        from html_report import HTMLReportWriter
+
+        html_path = Config.get_report_html_path(csv_file, self.environment)
+
+        try:
+            HTMLReportWriter(html_path, self.environment).write(redirect_results, remove_results,
+                                                                sitemap_analysis, performance)
             print(f"✅ HTML report saved to: {html_path}")
             return html_path
 
         except Exception as e:
             print(f"❌ Error saving HTML report: {e}")
-            return ""
\ No newline at end of file
+            return ""
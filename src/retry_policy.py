@@ -0,0 +1,172 @@
+"""
+Retry policy and per-host circuit breaker for URL testing.
+
+RetryPolicy decides whether an attempt should be retried and how long to wait:
+full-jitter exponential backoff, overridden by a server's Retry-After header.
+
+CircuitBreaker tracks recent outcomes per host. Once a host's error rate crosses
+the threshold the circuit opens and remaining requests fast-fail for a cool-down
+period, after which a single probe request decides whether to close it again.
+A QA environment that is down therefore fails a run in seconds, not minutes.
+"""
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict
+import requests
+from config import Config
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised when a request is skipped because the host's circuit is open."""
+
+
+class RetryPolicy:
+    """Full-jitter exponential backoff that honors Retry-After."""
+
+    def __init__(self, base_delay: float = None, max_delay: float = None, retry_status_codes=None):
+        """Initialize policy from Config defaults."""
+        self.base_delay = base_delay if base_delay is not None else Config.RETRY_DELAY
+        self.max_delay = max_delay if max_delay is not None else Config.RETRY_MAX_DELAY
+        self.retry_status_codes = set(retry_status_codes or Config.RETRY_STATUS_CODES)
+
+    def is_retryable_status(self, status_code: int) -> bool:
+        """Check if a response status should be retried."""
+        return status_code in self.retry_status_codes
+
+    def get_delay(self, attempt: int, response: requests.Response = None) -> float:
+        """
+        Get the sleep before the next attempt.
+
+        Args:
+            attempt: Zero-based number of the attempt that just failed
+            response: Failed response, if any, to read Retry-After from
+        """
+        retry_after = self._parse_retry_after(response)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+
+        ceiling = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    @staticmethod
+    def _parse_retry_after(response: requests.Response = None):
+        """Parse Retry-After as delta-seconds or HTTP-date; None if absent or invalid."""
+        if response is None:
+            return None
+
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+
+        value = value.strip()
+        if value.isdigit():
+            return float(value)
+
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class HostCircuit:
+    """Circuit state for a single host."""
+
+    def __init__(self, window: int):
+        """Initialize a closed circuit with an outcome window."""
+        self.state = CircuitBreaker.CLOSED
+        self.outcomes = deque(maxlen=window)
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.trips = 0
+        self.fast_failed = 0
+
+
+class CircuitBreaker:
+    """Per-host circuit breaker driven by recent request error rate."""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, error_threshold: float = None, min_requests: int = None,
+                 cooldown: float = None, window: int = None):
+        """Initialize breaker from Config defaults."""
+        self.error_threshold = error_threshold if error_threshold is not None else Config.CIRCUIT_ERROR_THRESHOLD
+        self.min_requests = min_requests or Config.CIRCUIT_MIN_REQUESTS
+        self.cooldown = cooldown if cooldown is not None else Config.CIRCUIT_COOLDOWN
+        self.window = window or Config.CIRCUIT_WINDOW
+        self._circuits = {}
+        self._lock = threading.Lock()
+
+    def _get_circuit(self, host: str) -> HostCircuit:
+        """Get or create circuit for host (caller must hold the lock)."""
+        circuit = self._circuits.get(host)
+        if circuit is None:
+            circuit = HostCircuit(self.window)
+            self._circuits[host] = circuit
+        return circuit
+
+    def allow_request(self, host: str) -> bool:
+        """Check whether a request to host may proceed right now."""
+        with self._lock:
+            circuit = self._get_circuit(host)
+
+            if circuit.state == self.CLOSED:
+                return True
+
+            if circuit.state == self.OPEN and time.time() - circuit.opened_at >= self.cooldown:
+                circuit.state = self.HALF_OPEN
+                circuit.probe_in_flight = False
+
+            if circuit.state == self.HALF_OPEN and not circuit.probe_in_flight:
+                circuit.probe_in_flight = True
+                return True
+
+            circuit.fast_failed += 1
+            return False
+
+    def record(self, host: str, success: bool):
+        """Record a request outcome for host."""
+        with self._lock:
+            circuit = self._get_circuit(host)
+
+            if circuit.state == self.HALF_OPEN:
+                circuit.probe_in_flight = False
+                if success:
+                    circuit.state = self.CLOSED
+                    circuit.outcomes.clear()
+                else:
+                    self._open(circuit)
+                return
+
+            circuit.outcomes.append(success)
+            if circuit.state == self.CLOSED and len(circuit.outcomes) >= self.min_requests:
+                error_rate = circuit.outcomes.count(False) / len(circuit.outcomes)
+                if error_rate >= self.error_threshold:
+                    self._open(circuit)
+
+    def _open(self, circuit: HostCircuit):
+        """Open a circuit and start its cool-down."""
+        circuit.state = self.OPEN
+        circuit.opened_at = time.time()
+        circuit.trips += 1
+
+    def get_stats(self) -> Dict:
+        """Get per-host circuit statistics."""
+        with self._lock:
+            return {
+                host: {
+                    'state': circuit.state,
+                    'trips': circuit.trips,
+                    'fast_failed': circuit.fast_failed
+                }
+                for host, circuit in self._circuits.items()
+            }
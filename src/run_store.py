@@ -0,0 +1,274 @@
+"""
+Run history store for URL timelines, flaky-URL detection and latency trends.
+
+Results CSVs are dated per day (a second run the same day replaces the
+first) and answering "when did this URL start failing?" meant grepping them.
+Every completed run is now also recorded in a SQLite database
+(Config.HISTORY_DB): one row per run with its metadata, pass counts and
+response-time percentiles, and one row per URL test with its outcome and
+timing. Results CSVs written before the store existed can be imported.
+
+Layout, chosen so the history subcommand stays well under a second with
+thousands of runs:
+- URLs are stored once in ``urls`` and referenced by id
+- ``results`` is a WITHOUT ROWID table keyed by (url_id, run_id, test_type),
+  so a URL's timeline is one index range scan
+- ``results_by_run`` indexes results by run for flaky-URL scans over the
+  latest runs
+- run-level aggregates (p50/p95, passed, failed) are computed on insert, so
+  trends only read ``runs`` (indexed by environment, file and start time)
+
+Sharded runs are recorded once, by the merge command.
+"""
+import csv
+import os
+import re
+import sqlite3
+import statistics
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from config import Config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    csv_file TEXT NOT NULL,
+    environment TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    duration REAL,
+    total INTEGER NOT NULL,
+    passed INTEGER NOT NULL,
+    failed INTEGER NOT NULL,
+    untested INTEGER NOT NULL DEFAULT 0,
+    sampled INTEGER NOT NULL DEFAULT 0,
+    p50 REAL,
+    p95 REAL,
+    source TEXT UNIQUE
+);
+CREATE INDEX IF NOT EXISTS runs_by_target ON runs (environment, csv_file, started_at);
+
+CREATE TABLE IF NOT EXISTS urls (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS results (
+    url_id INTEGER NOT NULL REFERENCES urls (id),
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    test_type TEXT NOT NULL,
+    tested_url TEXT,
+    status_code INTEGER,
+    success INTEGER NOT NULL,
+    response_time REAL,
+    error TEXT,
+    PRIMARY KEY (url_id, run_id, test_type)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_by_run ON results (run_id, url_id, success);
+"""
+
+RESULTS_CSV_NAME = re.compile(r'^test_results_(?P<name>.+)_(?P<env>[a-z]+)_(?P<date>\d{4}-\d{2}-\d{2})\.csv$')
+
+
+def _percentile(values: List[float], fraction: float) -> Optional[float]:
+    """Percentile of values (None if empty)."""
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[int(fraction * 100) - 1]
+
+
+def _int_or_none(value) -> Optional[int]:
+    """Integer value of a status code cell, None if missing."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class RunStore:
+    """SQLite database of all recorded runs and their URL results."""
+
+    def __init__(self, path: str = None):
+        """Open (and create if needed) the store at path (default: Config.HISTORY_DB)."""
+        self.path = path or Config.HISTORY_DB
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        """Close the database."""
+        self.db.close()
+
+    def _url_ids(self, urls: Iterable[str]) -> Dict[str, int]:
+        """Ids of URLs, adding the ones not stored yet."""
+        urls = list(dict.fromkeys(urls))
+        self.db.executemany('INSERT OR IGNORE INTO urls (url) VALUES (?)', ((url,) for url in urls))
+        ids = {}
+        for start in range(0, len(urls), 500):
+            chunk = urls[start:start + 500]
+            query = f"SELECT url, id FROM urls WHERE url IN ({','.join('?' * len(chunk))})"
+            ids.update(self.db.execute(query, chunk))
+        return ids
+
+    def _insert_run(self, csv_file: str, env: str, started_at: float, duration: Optional[float],
+                    rows: List[tuple], untested: int = 0, sampled: bool = False, source: str = None) -> int:
+        """
+        Store a run.
+
+        Args:
+            rows: (test_type, original_url, tested_url, status_code, success, response_time, error) per test
+        """
+        times = sorted(row[5] for row in rows if row[5] is not None)
+        passed = sum(1 for row in rows if row[4])
+        with self.db:
+            cursor = self.db.execute(
+                'INSERT INTO runs (csv_file, environment, started_at, duration, total, passed, failed, untested,'
+                ' sampled, p50, p95, source) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (csv_file, env, started_at, duration, len(rows), passed, len(rows) - passed, untested,
+                 int(sampled), _percentile(times, 0.5), _percentile(times, 0.95), source))
+            run_id = cursor.lastrowid
+            url_ids = self._url_ids(row[1] for row in rows)
+            self.db.executemany(
+                'INSERT OR REPLACE INTO results (url_id, run_id, test_type, tested_url, status_code, success,'
+                ' response_time, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                ((url_ids[row[1]], run_id, row[0], row[2], row[3], int(bool(row[4])), row[5], row[6])
+                 for row in rows))
+        return run_id
+
+    @staticmethod
+    def source_of(path: str) -> str:
+        """Identity of a results CSV version, so a run is not imported again after it was recorded."""
+        return f"{os.path.abspath(path)}@{os.stat(path).st_mtime_ns}"
+
+    def record_run(self, csv_file: str, env: str, redirect_results: List[Dict], remove_results: List[Dict],
+                   started_at: float, duration: float = None, untested: int = 0, sampled: bool = False,
+                   results_csv: str = None) -> int:
+        """
+        Record a completed run (results_csv: the results CSV written for it, if any).
+
+        Returns:
+            Id of the stored run
+        """
+        rows = [(result.get('test_type', test_type), result['original_url'], result.get('full_url'),
+                 _int_or_none(result.get('status_code')), result['success'], result.get('response_time'),
+                 result.get('error'))
+                for test_type, results in (('redirect', redirect_results), ('remove', remove_results))
+                for result in results]
+        source = self.source_of(results_csv) if results_csv and os.path.exists(results_csv) else None
+        return self._insert_run(csv_file, env, started_at, duration, rows, untested, sampled, source)
+
+    def import_results_csv(self, path: str) -> Optional[int]:
+        """
+        Record the run behind a results CSV written by Reporter.save_csv_results.
+
+        The run is dated by the file's modification time. Files already
+        recorded (same path and modification time) and shard results are
+        skipped.
+
+        Returns:
+            Id of the stored run, None if skipped
+        """
+        match = RESULTS_CSV_NAME.match(os.path.basename(path))
+        if not match or '_shard-' in match.group('name'):
+            return None
+
+        started_at = os.path.getmtime(path)
+        source = self.source_of(path)
+        if self.db.execute('SELECT 1 FROM runs WHERE source = ?', (source,)).fetchone():
+            return None
+
+        with open(path, newline='', encoding='utf-8') as f:
+            rows = [(row['test_type'], row['original_url'], row.get('tested_url') or None,
+                     _int_or_none(row.get('status_code')), self._csv_success(row),
+                     float(row['response_time']) if row.get('response_time') else None, row.get('error') or None)
+                    for row in csv.DictReader(f)]
+        return self._insert_run(f"{match.group('name')}.csv", match.group('env'), started_at, None, rows,
+                                source=source)
+
+    @staticmethod
+    def _csv_success(row: Dict) -> bool:
+        """A results CSV row's outcome as the run summary counted it."""
+        if row['test_type'] == 'remove':
+            # overall_success of removals is fully_removed; the summary counts the URL check,
+            # which the CSV keeps negated as url_inaccessible
+            return row.get('url_inaccessible') == 'False'
+        return row['overall_success'] == 'True'
+
+    def url_timeline(self, url: str, env: str = None, csv_file: str = None, limit: int = None) -> List[Dict]:
+        """Outcomes of a URL's tests, oldest first (the latest limit runs)."""
+        query = ('SELECT runs.started_at, runs.environment, runs.csv_file, results.test_type, results.status_code,'
+                 ' results.success, results.response_time, results.error'
+                 ' FROM urls JOIN results ON results.url_id = urls.id JOIN runs ON runs.id = results.run_id'
+                 ' WHERE urls.url = ?')
+        params = [url]
+        if env:
+            query += ' AND runs.environment = ?'
+            params.append(env)
+        if csv_file:
+            query += ' AND runs.csv_file = ?'
+            params.append(csv_file)
+        query += ' ORDER BY runs.started_at DESC LIMIT ?'
+        params.append(limit or Config.HISTORY_TIMELINE_RUNS)
+
+        keys = ('started_at', 'environment', 'csv_file', 'test_type', 'status_code', 'success', 'response_time', 'error')
+        rows = [dict(zip(keys, row)) for row in self.db.execute(query, params)]
+        rows.reverse()
+        return rows
+
+    def flaky_urls(self, env: str, csv_file: str = None, runs: int = None, min_flips: int = None,
+                   limit: int = None) -> List[Dict]:
+        """
+        URLs whose outcome changed between consecutive runs at least min_flips times.
+
+        Only the latest runs runs of the environment (and file) are considered.
+        """
+        target = 'environment = ?' + (' AND csv_file = ?' if csv_file else '')
+        params = [env] + ([csv_file] if csv_file else [])
+        query = f"""
+            WITH recent AS (
+                SELECT id, started_at FROM runs WHERE {target} ORDER BY started_at DESC LIMIT ?
+            ), outcomes AS (
+                SELECT results.url_id, results.test_type, results.success,
+                       LAG(results.success) OVER (PARTITION BY results.url_id, results.test_type
+                                                  ORDER BY recent.started_at) AS previous
+                FROM recent JOIN results ON results.run_id = recent.id
+            )
+            SELECT urls.url, outcomes.test_type, COUNT(*) AS runs, SUM(outcomes.success) AS passed,
+                   SUM(outcomes.previous IS NOT NULL AND outcomes.success != outcomes.previous) AS flips
+            FROM outcomes JOIN urls ON urls.id = outcomes.url_id
+            GROUP BY outcomes.url_id, outcomes.test_type
+            HAVING flips >= ?
+            ORDER BY flips DESC, passed ASC
+            LIMIT ?"""
+        params += [runs or Config.HISTORY_FLAKY_RUNS, min_flips or Config.HISTORY_FLAKY_MIN_FLIPS,
+                   limit or Config.HISTORY_ROWS_SHOWN]
+
+        keys = ('url', 'test_type', 'runs', 'passed', 'flips')
+        return [dict(zip(keys, row)) for row in self.db.execute(query, params)]
+
+    def latency_trend(self, env: str, csv_file: str = None, days: int = None) -> List[Dict]:
+        """Per-day runs, pass rate and mean run p50/p95 response times over the last days days."""
+        since = time.time() - (days or Config.HISTORY_TREND_DAYS) * 24 * 3600
+        target = 'environment = ?' + (' AND csv_file = ?' if csv_file else '')
+        params = [env] + ([csv_file] if csv_file else []) + [since]
+        query = f"""
+            SELECT date(started_at, 'unixepoch', 'localtime') AS day, COUNT(*), SUM(total), SUM(passed),
+                   AVG(p50), AVG(p95), MAX(p95)
+            FROM runs WHERE {target} AND started_at >= ?
+            GROUP BY day ORDER BY day"""
+
+        keys = ('day', 'runs', 'tests', 'passed', 'p50', 'p95', 'max_p95')
+        return [dict(zip(keys, row)) for row in self.db.execute(query, params)]
+
+    def get_stats(self) -> Dict:
+        """Number of stored runs, URLs and results."""
+        return {table: self.db.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                for table in ('runs', 'urls', 'results')}
+
+
+def format_run_time(timestamp: float) -> str:
+    """Local time of a run for display."""
+    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M')
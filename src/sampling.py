@@ -0,0 +1,172 @@
+"""
+Stratified random sampling for quick smoke runs on large exports.
+
+``--sample N`` / ``--sample-rate p`` test a random subset of a file instead of
+every row. Rows are grouped into strata by test type, path prefix (first path
+segment of the original URL) and previous outcome (passed, failed or new, from
+earlier results CSVs); the sample is allocated to strata in proportion to
+their size (largest remainder, at least one row per stratum while the sample
+allows) and drawn uniformly within each stratum, with ``--seed`` making the
+draw reproducible.
+
+Pass rates are then estimated for the whole file, not just the sample: each
+stratum's pass rate is weighted by its share of the file, and the confidence
+interval uses the stratified variance with finite population correction.
+"""
+import math
+import random
+import statistics
+from typing import Dict, List, Optional, Tuple
+from config import Config
+from performance import ResponseTimeAnalyzer
+
+
+class StratifiedSampler:
+    """Draws a stratified sample of CSV rows and estimates file-wide pass rates from it."""
+
+    def __init__(self, history=None, seed: int = None):
+        """
+        Initialize sampler.
+
+        Args:
+            history: Optional RunHistory giving each row's previous outcome
+            seed: Random seed; a random one is chosen (and kept in self.seed) if None
+        """
+        self.history = history
+        self.seed = seed if seed is not None else random.SystemRandom().randrange(1, 10 ** 6)
+        self.random = random.Random(self.seed)
+        self.strata: Dict[Tuple[str, str, str], Dict] = {}
+
+    def stratum(self, item: Dict, test_type: str) -> Tuple[str, str, str]:
+        """(test type, path prefix, previous outcome) stratum of a row."""
+        outcome = self.history.get(test_type, item['original_url']) if self.history else None
+        previous = 'new' if outcome is None else ('passed' if outcome[0] else 'failed')
+        return test_type, ResponseTimeAnalyzer.path_prefix(item['original_url']), previous
+
+    @staticmethod
+    def allocate(sizes: Dict, total: int) -> Dict:
+        """Split a sample of total rows over strata proportionally to their sizes."""
+        population = sum(sizes.values())
+        total = min(total, population)
+        if total <= 0:
+            return {key: 0 for key in sizes}
+
+        # Every stratum gets a row first if the sample is large enough to cover them all
+        base = 1 if total >= len(sizes) else 0
+        remaining = total - base * len(sizes)
+        capacity = {key: size - base for key, size in sizes.items()}
+        capacity_total = sum(capacity.values())
+
+        quotas = {key: remaining * size / capacity_total if capacity_total else 0 for key, size in capacity.items()}
+        counts = {key: base + int(quota) for key, quota in quotas.items()}
+        leftover = total - sum(counts.values())
+        by_remainder = sorted(quotas, key=lambda key: (quotas[key] - int(quotas[key]), sizes[key]), reverse=True)
+        for key in by_remainder:
+            if leftover <= 0:
+                break
+            if counts[key] < sizes[key]:
+                counts[key] += 1
+                leftover -= 1
+        return counts
+
+    def sample(self, redirect_data: List[Dict], remove_data: List[Dict], size: int = None,
+               rate: float = None) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Draw the sample.
+
+        Args:
+            size: Total rows to test (over both test types)
+            rate: Fraction of rows to test (used if size is None)
+
+        Returns:
+            (redirect rows, remove rows) in file order, tagged with 'position'
+        """
+        members = {}
+        for test_type, url_data in (('redirect', redirect_data), ('remove', remove_data)):
+            for position, item in enumerate(url_data):
+                key = self.stratum(item, test_type)
+                members.setdefault(key, []).append(position)
+
+        population = len(redirect_data) + len(remove_data)
+        if size is None:
+            size = math.ceil(population * rate)
+        counts = self.allocate({key: len(positions) for key, positions in members.items()}, size)
+
+        chosen = {'redirect': [], 'remove': []}
+        self.strata = {}
+        for key in sorted(members):
+            picked = self.random.sample(members[key], counts[key])
+            chosen[key[0]].extend(picked)
+            self.strata[key] = {'population': len(members[key]), 'sampled': counts[key], 'passed': 0, 'tested': 0}
+
+        data = {'redirect': redirect_data, 'remove': remove_data}
+        return tuple(
+            [dict(data[test_type][position], position=data[test_type][position].get('position', position))
+             for position in sorted(chosen[test_type])]
+            for test_type in ('redirect', 'remove')
+        )
+
+    def estimate(self, redirect_results: List[Dict], remove_results: List[Dict]) -> Dict:
+        """
+        Estimate file-wide pass rates from the results of the sampled rows.
+
+        Returns:
+            Dictionary with 'seed', 'confidence', and 'overall', 'redirect' and
+            'remove' estimates (population, tested, passed, pass_rate, ci_low,
+            ci_high; None if nothing of that type was tested), plus
+            per-stratum counts in 'strata'
+        """
+        for stratum in self.strata.values():
+            stratum['passed'] = stratum['tested'] = 0
+
+        for test_type, results in (('redirect', redirect_results), ('remove', remove_results)):
+            for result in results:
+                stratum = self.strata[self.stratum(result, test_type)]
+                stratum['tested'] += 1
+                stratum['passed'] += 1 if result['success'] else 0
+
+        z = statistics.NormalDist().inv_cdf(0.5 + Config.SAMPLE_CONFIDENCE / 2)
+        estimates = {
+            'seed': self.seed,
+            'confidence': Config.SAMPLE_CONFIDENCE,
+            'overall': self._estimate(list(self.strata.values()), z),
+            'strata': [dict(stratum, test_type=key[0], prefix=key[1], previous=key[2])
+                       for key, stratum in sorted(self.strata.items())]
+        }
+        for test_type in ('redirect', 'remove'):
+            estimates[test_type] = self._estimate(
+                [stratum for key, stratum in self.strata.items() if key[0] == test_type], z)
+        return estimates
+
+    @staticmethod
+    def _estimate(strata: List[Dict], z: float) -> Optional[Dict]:
+        """
+        Stratified pass rate and normal-approximation interval over the given strata.
+
+        Stratum variances use the Agresti-Coull adjusted rate (passed + 1) /
+        (tested + 2), so strata that all passed or all failed still add
+        uncertainty instead of a zero-width interval.
+        """
+        population = sum(stratum['population'] for stratum in strata)
+        tested = [stratum for stratum in strata if stratum['tested']]
+        if not tested:
+            return None
+        covered = sum(stratum['population'] for stratum in tested)
+
+        rate = variance = 0.0
+        for stratum in tested:
+            weight = stratum['population'] / covered
+            rate += weight * stratum['passed'] / stratum['tested']
+            adjusted = (stratum['passed'] + 1) / (stratum['tested'] + 2)
+            correction = 1 - stratum['tested'] / stratum['population']
+            variance += weight ** 2 * correction * adjusted * (1 - adjusted) / stratum['tested']
+
+        margin = z * math.sqrt(variance)
+        return {
+            'population': population,
+            'tested': sum(stratum['tested'] for stratum in tested),
+            'passed': sum(stratum['passed'] for stratum in tested),
+            'pass_rate': rate,
+            'ci_low': max(0.0, rate - margin),
+            'ci_high': min(1.0, rate + margin),
+        }
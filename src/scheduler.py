@@ -0,0 +1,182 @@
+"""
+Priority scheduling of URL tests and run budgets.
+
+URLs used to be tested in CSV order, so the ones most likely to fail could be
+checked last. PriorityScheduler orders each batch by a score built from the
+URL's previous outcome, its age and its historical latency:
+- a failure in the latest earlier run adds Config.PRIORITY_WEIGHT_FAILED
+- a row that no earlier run tested adds Config.PRIORITY_WEIGHT_NEW
+- the age of the last result adds up to Config.PRIORITY_WEIGHT_AGE
+  (reached at Config.PRIORITY_AGE_HORIZON)
+- the last response time, or the crawl export's Response Time for new rows,
+  adds up to Config.PRIORITY_WEIGHT_LATENCY (reached at the request timeout)
+
+History comes from the results CSVs of earlier runs of the same file and
+environment. Results are still reported in row order.
+
+RunBudget implements --fail-fast and --deadline: once either is reached, tests
+that have not started are cancelled and reported as untested.
+"""
+import argparse
+import csv
+import glob
+import os
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from config import Config
+
+
+def parse_duration(spec: str) -> float:
+    """Parse a duration such as '90s', '10m', '1h' or '600' (seconds) for argparse."""
+    units = {'s': 1, 'm': 60, 'h': 3600}
+    spec = spec.strip().lower()
+    try:
+        if spec and spec[-1] in units:
+            seconds = float(spec[:-1]) * units[spec[-1]]
+        else:
+            seconds = float(spec)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid duration '{spec}', expected e.g. 90s, 10m or 1h")
+    if seconds <= 0:
+        raise argparse.ArgumentTypeError(f"invalid duration '{spec}', must be positive")
+    return seconds
+
+
+def format_duration(seconds: float) -> str:
+    """Format seconds as e.g. '10m00s'."""
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    return f"{minutes}m{seconds:02d}s" if minutes else f"{seconds}s"
+
+
+def _parse_float(value) -> Optional[float]:
+    """Float value of a CSV cell, None if empty or not numeric."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class RunHistory:
+    """Latest earlier outcome of every URL test of a file and environment."""
+
+    def __init__(self, outcomes: Dict[Tuple[str, str], Tuple[bool, Optional[float], float]] = None):
+        """Initialize with (test_type, original_url) -> (success, response_time, tested_at) outcomes."""
+        self.outcomes = outcomes or {}
+
+    @classmethod
+    def load(cls, csv_file: str, env: str) -> 'RunHistory':
+        """
+        Read the newest Config.PRIORITY_HISTORY_FILES results CSVs of earlier runs.
+
+        Shard results count too; a URL's outcome comes from the newest file
+        that tested it, dated by the file's modification time.
+        """
+        csv_name = csv_file.replace('.csv', '')
+        pattern = os.path.join(Config.OUTPUT_DIR, f'test_results_{csv_name}_{env}_*.csv')
+        paths = sorted(glob.glob(pattern), key=os.path.getmtime, reverse=True)
+
+        outcomes = {}
+        for path in paths[:Config.PRIORITY_HISTORY_FILES]:
+            tested_at = os.path.getmtime(path)
+            try:
+                with open(path, newline='', encoding='utf-8') as f:
+                    for row in csv.DictReader(f):
+                        key = (row['test_type'], row['original_url'])
+                        if key not in outcomes:
+                            outcomes[key] = (row['overall_success'] == 'True',
+                                             _parse_float(row['response_time']), tested_at)
+            except (OSError, KeyError, csv.Error) as e:
+                print(f"⚠️  Skipping unreadable results file {path}: {e}")
+        return cls(outcomes)
+
+    def get(self, test_type: str, original_url: str) -> Optional[Tuple[bool, Optional[float], float]]:
+        """Latest (success, response_time, tested_at) of a URL test, None if never tested."""
+        return self.outcomes.get((test_type, original_url))
+
+
+class PriorityScheduler:
+    """Orders URL tests so the ones most likely to fail run first."""
+
+    def __init__(self, history: RunHistory, baseline_latency: Callable[[str], Optional[float]] = None,
+                 now: float = None):
+        """
+        Initialize scheduler.
+
+        Args:
+            history: Outcomes of earlier runs
+            baseline_latency: Optional callback(url) giving the export's response time
+                              for URLs without history
+        """
+        self.history = history
+        self.baseline_latency = baseline_latency
+        self.now = now or time.time()
+
+    def score(self, item: Dict, test_type: str) -> float:
+        """Priority of a URL test (higher runs earlier)."""
+        tested_url = item['original_url'] if test_type == 'remove' else item['expected_url']
+        outcome = self.history.get(test_type, item['original_url'])
+
+        score = 0.0
+        if outcome is None:
+            score += Config.PRIORITY_WEIGHT_NEW
+            latency = _parse_float(self.baseline_latency(tested_url)) if self.baseline_latency else None
+        else:
+            success, latency, tested_at = outcome
+            if not success:
+                score += Config.PRIORITY_WEIGHT_FAILED
+            age = max(0.0, self.now - tested_at)
+            score += Config.PRIORITY_WEIGHT_AGE * min(age / Config.PRIORITY_AGE_HORIZON, 1.0)
+
+        if latency:
+            score += Config.PRIORITY_WEIGHT_LATENCY * min(latency / Config.REQUEST_TIMEOUT, 1.0)
+        return round(score, 3)
+
+    def order(self, url_data: List[Dict], test_type: str) -> List[Dict]:
+        """
+        Get the rows highest priority first (stable for equal scores).
+
+        Rows are tagged with their 'position' in url_data (kept if already
+        set) and their 'priority'.
+        """
+        tagged = [dict(item, position=item.get('position', position), priority=self.score(item, test_type))
+                  for position, item in enumerate(url_data)]
+        tagged.sort(key=lambda item: -item['priority'])
+        return tagged
+
+
+class RunBudget:
+    """Fail-fast and deadline limits shared by all tests of a run."""
+
+    def __init__(self, max_failures: int = None, deadline: float = None):
+        """
+        Initialize budget; the deadline clock starts now.
+
+        Args:
+            max_failures: Stop after this many failed tests (None: no limit)
+            deadline: Stop starting tests after this many seconds (None: no limit)
+        """
+        self.max_failures = max_failures
+        self.deadline = deadline
+        self.started = time.time()
+        self.failures = 0
+        self.reason = None
+
+    def time_left(self) -> Optional[float]:
+        """Seconds until the deadline (None without a deadline)."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.started + self.deadline - time.time())
+
+    def record(self, result: Dict):
+        """Count a completed test."""
+        if not result['success']:
+            self.failures += 1
+
+    def exhausted(self) -> Optional[str]:
+        """Why no further tests should start, or None while within budget."""
+        if self.reason is None:
+            if self.max_failures and self.failures >= self.max_failures:
+                self.reason = f"fail-fast: {self.failures} failures (limit {self.max_failures})"
+            elif self.deadline is not None and self.time_left() <= 0:
+                self.reason = f"deadline of {format_duration(self.deadline)} reached"
+        return self.reason
@@ -0,0 +1,99 @@
+"""
+Sharded runs and merging of shard results.
+
+``--shard i/N`` splits a CSV file into N disjoint slices by a stable hash of
+each row's original URL, so every worker (machine, container, CI job) tests
+its own slice independently. Besides the usual shard-tagged CSV/HTML
+reports, each shard writes a JSON Lines dump of its complete result dicts;
+``merge`` reads the dumps of all N shards back and produces one results CSV,
+summary and HTML report, exactly as if the file had been tested in one run.
+
+To make shards judge sitemap compliance against the same sitemap, run them
+with ``--sitemap-snapshot`` pointing to one shared snapshot file.
+"""
+import argparse
+import glob
+import hashlib
+import json
+from datetime import datetime
+from typing import Dict, List, Tuple
+from config import Config
+
+
+def parse_shard_spec(spec: str) -> Tuple[int, int]:
+    """Parse an 'i/N' shard spec (1 <= i <= N) for argparse."""
+    try:
+        index, _, count = spec.partition('/')
+        index, count = int(index), int(count)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid shard '{spec}', expected i/N such as 1/4")
+    if count < 1 or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"invalid shard '{spec}', i must be between 1 and N")
+    return index, count
+
+
+def shard_of(original_url: str, count: int) -> int:
+    """Stable 1-based shard number of a row (the same on every machine and Python run)."""
+    digest = hashlib.md5(str(original_url).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % count + 1
+
+
+def select_shard(url_data: List[Dict], shard: Tuple[int, int]) -> List[Dict]:
+    """
+    Keep the rows belonging to a shard.
+
+    Every row is tagged with its 'position' in the full list first, so merged
+    results can be put back into file order.
+    """
+    index, count = shard
+    selected = []
+    for position, item in enumerate(url_data):
+        if shard_of(item['original_url'], count) == index:
+            selected.append(dict(item, position=position))
+    return selected
+
+
+class ShardResults:
+    """JSON Lines dump of one shard's result dicts."""
+
+    def __init__(self, path: str, metadata: Dict, redirect_results: List[Dict], remove_results: List[Dict]):
+        """Initialize with loaded or to-be-saved shard data."""
+        self.path = path
+        self.metadata = metadata
+        self.redirect_results = redirect_results
+        self.remove_results = remove_results
+
+    @classmethod
+    def save(cls, csv_file: str, env: str, shard: Tuple[int, int], metadata: Dict,
+             redirect_results: List[Dict], remove_results: List[Dict]) -> 'ShardResults':
+        """Write a shard's results next to its reports."""
+        path = Config.get_shard_results_path(csv_file, env, shard)
+        metadata = dict(metadata, csv_file=csv_file, environment=env, shard=shard[0], shard_count=shard[1],
+                        created=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'type': 'meta', **metadata}) + '\n')
+            for test_type, results in (('redirect', redirect_results), ('remove', remove_results)):
+                for result in results:
+                    f.write(json.dumps({'type': test_type, 'result': result}, default=str) + '\n')
+
+        return cls(path, metadata, redirect_results, remove_results)
+
+    @classmethod
+    def load(cls, path: str) -> 'ShardResults':
+        """Read a shard dump written by save()."""
+        metadata = {}
+        results = {'redirect': [], 'remove': []}
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                if record['type'] == 'meta':
+                    metadata = record
+                else:
+                    results[record['type']].append(record['result'])
+        return cls(path, metadata, results['redirect'], results['remove'])
+
+    @staticmethod
+    def find(csv_file: str, env: str) -> List[str]:
+        """Shard dumps stored for a CSV file and environment."""
+        return sorted(glob.glob(Config.get_shard_results_path(csv_file, env, ('*', '*'))))
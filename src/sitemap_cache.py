@@ -0,0 +1,82 @@
+"""
+Persistent cache of child sitemaps listed in a sitemap index.
+
+Large sitemap indexes mostly list child sitemaps that have not changed since
+the last run. For every child sitemap the cache keeps one TSV file of its
+normalized entries (``url<TAB>lastmod<TAB>changefreq<TAB>priority``, the
+values as stored in SitemapHandler.URL_COLUMNS) preceded by ``#key=value``
+lines with the child's index lastmod and HTTP validators. SitemapHandler then
+- skips a child entirely when the index lists the same lastmod as cached
+- otherwise sends a conditional request and replays the cache on 304
+- otherwise parses the child and rewrites its cache file while streaming
+
+Cache files are written to a temporary path and moved into place only once
+the child was parsed completely, so an interrupted run never leaves a
+truncated cache behind.
+"""
+import hashlib
+import os
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+from config import Config
+
+
+class ChildSitemapCache:
+    """Stores the parsed entries and validators of child sitemaps between runs."""
+
+    def __init__(self, cache_dir: str = None):
+        """Initialize cache in cache_dir (default Config.SITEMAP_CACHE_DIR)."""
+        self.cache_dir = cache_dir or Config.SITEMAP_CACHE_DIR
+
+    def _path(self, loc: str) -> str:
+        """Cache file path for a child sitemap URL."""
+        return os.path.join(self.cache_dir, hashlib.md5(loc.encode('utf-8')).hexdigest() + '.tsv')
+
+    def get_metadata(self, loc: str) -> Optional[Dict]:
+        """Get the stored '#key=value' metadata of a child sitemap, or None if not cached."""
+        path = self._path(loc)
+        if not os.path.exists(path):
+            return None
+
+        metadata = {}
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if not line.startswith('#'):
+                    break
+                key, _, value = line[1:].rstrip('\n').partition('=')
+                metadata[key] = value
+        return metadata if metadata.get('loc') == loc else None
+
+    def iter_entries(self, loc: str) -> Iterator[Tuple[str, tuple]]:
+        """Replay cached (url, (lastmod, changefreq, priority)) entries of a child sitemap."""
+        with open(self._path(loc), encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('#'):
+                    continue
+                url, lastmod, changefreq, priority = line.rstrip('\n').split('\t')
+                yield url, (int(lastmod), int(changefreq), int(priority))
+
+    def store(self, loc: str, metadata: Dict, entries: Iterable[Tuple[str, tuple]]) -> Iterator[Tuple[str, tuple]]:
+        """
+        Pass entries through while writing them as the new cache file for loc.
+
+        The cache file is only replaced if entries is consumed to the end.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(loc)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        complete = False
+
+        try:
+            with open(temp_path, 'w', encoding='utf-8', newline='') as f:
+                f.write(f"#loc={loc}\n")
+                for key, value in metadata.items():
+                    f.write(f"#{key}={value or ''}\n")
+                for url, values in entries:
+                    f.write(url + '\t' + '\t'.join(str(value) for value in values) + '\n')
+                    yield url, values
+            complete = True
+        finally:
+            if complete:
+                os.replace(temp_path, path)
+            elif os.path.exists(temp_path):
+                os.remove(temp_path)
@@ -0,0 +1,216 @@
+"""
+Sitemap snapshots and snapshot diffs.
+
+Every run can store a normalized sitemap snapshot: a TSV of
+``url<TAB>lastmod<TAB>changefreq<TAB>priority`` lines sorted by (host, path),
+preceded by ``#key=value`` metadata lines. Diffs compare lastmod only.
+Because snapshots are sorted, two of them are compared with a single streaming
+merge, so diffing sitemaps with millions of URLs needs constant memory.
+
+Only the newest Config.SNAPSHOT_KEEP snapshots per CSV file and environment
+are kept; older ones are deleted whenever a new one is saved, unless a
+--sitemap-snapshot option or the checkpoint of an interrupted run still
+refers to them.
+
+URLs are normalized the same way SitemapHandler compares them (qa-www/rel-www
+mapped to www, lowercase), so snapshots from different environments are
+directly comparable.
+"""
+import csv
+import glob
+import os
+from datetime import datetime
+from typing import Dict, Iterator, Optional, Tuple
+from config import Config
+from sitemap_handler import SitemapHandler
+from url_store import CompactURLSet
+
+
+class SitemapSnapshot:
+    """A stored, normalized sitemap snapshot file."""
+
+    def __init__(self, path: str):
+        """Open snapshot metadata from path."""
+        self.path = path
+        self.metadata = self._read_metadata()
+
+    @property
+    def label(self) -> str:
+        """Human readable label: environment and capture time."""
+        return f"{self.metadata.get('environment', '?')} @ {self.metadata.get('created', '?')}"
+
+    @classmethod
+    def save(cls, sitemap_handler: SitemapHandler, csv_file: str, environment: str) -> 'SitemapSnapshot':
+        """Write the handler's parsed sitemap to a new snapshot file."""
+        path = Config.get_snapshot_path(csv_file, environment)
+        urls = sitemap_handler.get_sitemap_urls()
+
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write(f"#sitemap_url={sitemap_handler.sitemap_url}\n")
+            f.write(f"#environment={environment}\n")
+            f.write(f"#csv_file={csv_file}\n")
+            f.write(f"#created={datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+            f.write(f"#url_count={len(urls)}\n")
+            for url, (lastmod, changefreq, priority) in urls.iter_items():
+                f.write(f"{url}\t{SitemapHandler.format_lastmod(lastmod)}\t"
+                        f"{SitemapHandler.format_changefreq(changefreq)}\t{SitemapHandler.format_priority(priority)}\n")
+
+        cls.prune(csv_file, environment)
+        return cls(path)
+
+    @staticmethod
+    def prune(csv_file: str, environment: str, keep: int = None) -> int:
+        """
+        Delete all but the newest keep (default Config.SNAPSHOT_KEEP, at least 2) snapshots of a file and environment.
+
+        Snapshots still referenced by Config.SITEMAP_SNAPSHOT or by a
+        checkpoint journal are kept.
+
+        Returns:
+            Number of snapshots deleted
+        """
+        from checkpoint import CheckpointJournal
+
+        keep = Config.SNAPSHOT_KEEP if keep is None else keep
+        if not keep:
+            return 0
+
+        pattern = Config.get_snapshot_path(csv_file, environment, stamp='*')
+        old = sorted(glob.glob(pattern))[:-max(2, keep)]
+        if not old:
+            return 0
+
+        referenced = [Config.SITEMAP_SNAPSHOT]
+        for journal_path in glob.glob(os.path.join(Config.CHECKPOINT_DIR, '*.jsonl')):
+            header = CheckpointJournal(journal_path).read_header()
+            referenced.append(header and header.get('sitemap_snapshot'))
+        referenced = {os.path.abspath(path) for path in referenced if path}
+
+        deleted = 0
+        for path in old:
+            if os.path.abspath(path) in referenced:
+                continue
+            try:
+                os.remove(path)
+                deleted += 1
+            except OSError:
+                pass
+        return deleted
+
+    @staticmethod
+    def find_latest(csv_file: str, environment: str, exclude: str = None) -> Optional['SitemapSnapshot']:
+        """Find the most recent snapshot for a CSV file and environment."""
+        pattern = Config.get_snapshot_path(csv_file, environment, stamp='*')
+        candidates = sorted(p for p in glob.glob(pattern) if not exclude or os.path.abspath(p) != os.path.abspath(exclude))
+        return SitemapSnapshot(candidates[-1]) if candidates else None
+
+    def _read_metadata(self) -> Dict:
+        """Read the '#key=value' header lines."""
+        metadata = {}
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                if not line.startswith('#'):
+                    break
+                key, _, value = line[1:].rstrip('\n').partition('=')
+                metadata[key] = value
+        return metadata
+
+    def load_into(self, sitemap_handler: SitemapHandler):
+        """Make the handler judge sitemap compliance against this snapshot instead of the live sitemap."""
+        def entries():
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    if line.startswith('#'):
+                        continue
+                    url, lastmod, changefreq, priority = (line.rstrip('\n').split('\t') + ['', '', ''])[:4]
+                    yield url, (SitemapHandler.parse_lastmod(lastmod), SitemapHandler.parse_changefreq(changefreq),
+                                SitemapHandler.parse_priority(priority))
+
+        sitemap_handler.use_url_set(CompactURLSet(entries(), columns=SitemapHandler.URL_COLUMNS),
+                                    sitemap_url=self.metadata.get('sitemap_url'))
+        print(f"✅ Using sitemap snapshot {self.path} ({self.label}): {len(sitemap_handler.urls)} URLs")
+
+    def iter_entries(self) -> Iterator[Tuple[str, str]]:
+        """Stream (url, lastmod) pairs in (host, path) order."""
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('#'):
+                    continue
+                # Older snapshots only have the url and lastmod columns
+                url, _, rest = line.rstrip('\n').partition('\t')
+                yield url, rest.partition('\t')[0]
+
+
+class SitemapDiff:
+    """Streaming sorted-merge diff of two sitemap snapshots."""
+
+    def __init__(self, old: SitemapSnapshot, new: SitemapSnapshot):
+        """Initialize diff of old (baseline) against new (current)."""
+        self.old = old
+        self.new = new
+
+    @staticmethod
+    def _sort_key(url: str) -> Tuple[str, str]:
+        """Snapshot ordering key: (host, path)."""
+        # Keep the slash: 'host' sorts before 'host/' as in CompactURLSet
+        host, slash, path = url.partition('/')
+        return host, slash + path
+
+    def compute(self, output_csv: str = None) -> Dict:
+        """
+        Compare snapshots, optionally writing changed URLs to CSV.
+
+        Returns:
+            Summary with added/removed/unchanged/lastmod_changed counts
+        """
+        summary = {
+            'baseline': self.old.label,
+            'current': self.new.label,
+            'baseline_path': self.old.path,
+            'current_path': self.new.path,
+            'added': 0,
+            'removed': 0,
+            'unchanged': 0,
+            'lastmod_changed': 0,
+            'csv_path': output_csv or '',
+            'samples': {'added': [], 'removed': [], 'lastmod_changed': []}
+        }
+
+        csv_file = open(output_csv, 'w', newline='', encoding='utf-8') if output_csv else None
+        writer = None
+        if csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(['change', 'url', 'baseline_lastmod', 'current_lastmod'])
+
+        def record(change, url, old_lastmod, new_lastmod):
+            summary[change] += 1
+            if len(summary['samples'][change]) < Config.SITEMAP_DIFF_SAMPLE_SIZE:
+                summary['samples'][change].append(url)
+            if writer:
+                writer.writerow([change, url, old_lastmod, new_lastmod])
+
+        try:
+            old_entries = self.old.iter_entries()
+            new_entries = self.new.iter_entries()
+            old_entry = next(old_entries, None)
+            new_entry = next(new_entries, None)
+
+            while old_entry is not None or new_entry is not None:
+                if new_entry is None or (old_entry is not None and self._sort_key(old_entry[0]) < self._sort_key(new_entry[0])):
+                    record('removed', old_entry[0], old_entry[1], '')
+                    old_entry = next(old_entries, None)
+                elif old_entry is None or self._sort_key(new_entry[0]) < self._sort_key(old_entry[0]):
+                    record('added', new_entry[0], '', new_entry[1])
+                    new_entry = next(new_entries, None)
+                else:
+                    if old_entry[1] != new_entry[1]:
+                        record('lastmod_changed', new_entry[0], old_entry[1], new_entry[1])
+                    else:
+                        summary['unchanged'] += 1
+                    old_entry = next(old_entries, None)
+                    new_entry = next(new_entries, None)
+        finally:
+            if csv_file:
+                csv_file.close()
+
+        return summary
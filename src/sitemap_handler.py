@@ -10,17 +10,36 @@ Key QA Environment Considerations:
 IMPORTANT NOTE: Manual review identified discrepancies in QA sitemap requiring attention.
 Current 4.7% compliance rate indicates systematic sitemap updates needed.
 See sitemap-qa.md for detailed action items for next session.
+
+Sitemap indexes are followed one level deep. Child sitemaps are cached on
+disk (see sitemap_cache.py), so unchanged children are neither fetched nor
+parsed again on later runs.
 """
+import hashlib
+import io
+import time
 import requests
 import xml.etree.ElementTree as ET
-from typing import List, Dict, Set
-from urllib.parse import urlparse
+from datetime import datetime, timezone
+from typing import List, Dict, Optional, Set, Tuple
 from config import Config
+from events import emit
+from url_store import CompactURLSet
+from sitemap_cache import ChildSitemapCache
+from url_suggester import SitemapSuggester
 
 
 class SitemapHandler:
     """Handler for sitemap XML operations."""
 
+    # Per-URL attributes kept alongside the compact URL set
+    URL_COLUMNS = (
+        ('lastmod', 'q'),     # UTC epoch seconds, 0 if absent
+        ('changefreq', 'B'),  # index into CHANGEFREQ_VALUES, 0 if absent
+        ('priority', 'h'),    # thousandths (0-1000), -1 if absent
+    )
+    CHANGEFREQ_VALUES = ('', 'always', 'hourly', 'daily', 'weekly', 'monthly', 'yearly', 'never')
+
     def __init__(self, environment: str = None, sitemap_url: str = None, enable_fallback: bool = False):
         """
         Initialize sitemap handler with environment and optional sitemap URL.
@@ -34,8 +53,25 @@ class SitemapHandler:
         self.environment = environment or Config.CURRENT_ENV
         self.sitemap_url = sitemap_url or Config.get_sitemap_url(self.environment)
         self.enable_fallback = enable_fallback
-        self.urls = []
-        self.raw_xml = None
+        self.urls = CompactURLSet()
+        self.raw_xml = None  # response body bytes until parsed
+        self.fetch_success = False
+        # Validators and body digest of the last 200 response, for revalidate()
+        self.etag = None
+        self.last_modified = None
+        self.content_digest = None
+        self.not_modified = False
+        self.session = requests.Session()
+        self.child_cache = ChildSitemapCache() if Config.USE_SITEMAP_CACHE else None
+        self.child_stats = {'children': 0, 'fetched': 0, 'unchanged': 0, 'not_modified': 0, 'failed': 0}
+        self.is_index = False
+        self._index_xml = None
+        self._parsed = False
+        self._namespace_uri = None
+        self._suggester = None
+        # Membership results keyed by (normalized URL, preserve_trailing_slash);
+        # filled while testing and reused by get_sitemap_analysis
+        self._lookup_cache: Dict[Tuple[str, bool], bool] = {}
 
     def fetch_sitemap(self) -> bool:
         """
@@ -64,91 +100,308 @@ class SitemapHandler:
 
         return False
 
-    def _try_fetch_sitemap(self, url: str, env_name: str) -> bool:
-        """Try to fetch sitemap from a specific URL."""
+    def revalidate(self) -> bool:
+        """
+        Re-fetch the sitemap with conditional request headers.
+
+        A 304 response, or a 200 whose body is byte-identical to the last
+        one, keeps the parsed URL set as is.
+
+        For a sitemap index the children are revalidated even when the index
+        itself is unchanged; unchanged children are served from the child
+        sitemap cache.
+
+        Returns:
+            True if the sitemap changed and was re-parsed
+        """
+        if not self.fetch_success:
+            self.parse_sitemap()
+            return self.fetch_success
+
+        previous_digest = self.content_digest
+        if not self._try_fetch_sitemap(self.sitemap_url, self.environment.upper(), conditional=True):
+            return False
+        changed = not self.not_modified and self.content_digest != previous_digest
+        if not changed:
+            if not self.is_index:
+                self.raw_xml = None
+                return False
+            self.raw_xml = self._index_xml
+
+        self.parse_sitemap()
+        return changed or self.child_stats['fetched'] > 0
+
+    def _try_fetch_sitemap(self, url: str, env_name: str, conditional: bool = False) -> bool:
+        """Try to fetch sitemap from a specific URL, optionally as a conditional request."""
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+        }
+        if conditional and self.etag:
+            headers['If-None-Match'] = self.etag
+        if conditional and self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+
         try:
-            print(f"🔄 Fetching {env_name} sitemap from: {url}")
-
-            response = requests.get(
-                url,
-                timeout=Config.REQUEST_TIMEOUT,
-                headers={
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                }
-            )
+            if not conditional:
+                print(f"🔄 Fetching {env_name} sitemap from: {url}")
+
+            start_time = time.time()
+            response = self.session.get(url, timeout=Config.REQUEST_TIMEOUT, headers=headers)
+            emit('sitemap_fetch', url=url, status_code=response.status_code, bytes=len(response.content),
+                 duration=round(time.time() - start_time, 3), conditional=conditional)
+
+            self.not_modified = response.status_code == 304
+            if self.not_modified:
+                return True
 
             if response.status_code == 200:
-                self.raw_xml = response.text
-                print(f"✅ {env_name} sitemap fetched successfully ({len(self.raw_xml)} bytes)")
+                # Kept as bytes: the parser reads the XML declaration's encoding itself
+                self.raw_xml = response.content
+                self.fetch_success = True
+                self.etag = response.headers.get('ETag')
+                self.last_modified = response.headers.get('Last-Modified')
+                self.content_digest = hashlib.md5(response.content).hexdigest()
+                if not conditional:
+                    print(f"✅ {env_name} sitemap fetched successfully ({len(self.raw_xml)} bytes)")
                 return True
             else:
                 print(f"❌ Failed to fetch {env_name} sitemap: HTTP {response.status_code}")
                 return False
 
         except requests.exceptions.RequestException as e:
+            emit('sitemap_fetch', url=url, error=str(e), conditional=conditional)
             print(f"❌ Error fetching {env_name} sitemap: {e}")
             return False
 
-    def parse_sitemap(self) -> List[str]:
-        """Parse sitemap XML and extract URLs."""
+    def parse_sitemap(self) -> CompactURLSet:
+        """
+        Parse sitemap XML and extract URLs into a compact normalized URL set.
+
+        URLs are normalized with their trailing slash preserved so both lookup
+        modes can be answered from one set. For a sitemap index, the URLs of
+        all child sitemaps are collected into the same set. The raw XML is
+        released once parsing succeeds (an index is kept for revalidation).
+        """
         if not self.raw_xml:
             if not self.fetch_sitemap():
-                return []
+                self._parsed = True
+                return self.urls
 
         try:
-            # Parse XML
-            root = ET.fromstring(self.raw_xml)
-
-            # Detect namespace from root element
-            namespace_uri = None
-            if root.tag.startswith('{'):
-                namespace_uri = root.tag[1:root.tag.find('}')]
-
-            # Extract URLs from sitemap
-            urls = []
-
-            # Try with detected namespace first
-            if namespace_uri:
-                namespaces = {'ns': namespace_uri}
-                for url_element in root.findall('.//ns:url', namespaces):
-                    loc_element = url_element.find('ns:loc', namespaces)
-                    if loc_element is not None and loc_element.text:
-                        urls.append(loc_element.text.strip())
-
-            # If no URLs found, try standard sitemap namespace
-            if not urls:
-                namespaces = {
-                    'sitemap': 'http://www.sitemaps.org/schemas/sitemap/0.9'
-                }
-                for url_element in root.findall('.//sitemap:url', namespaces):
-                    loc_element = url_element.find('sitemap:loc', namespaces)
-                    if loc_element is not None and loc_element.text:
-                        urls.append(loc_element.text.strip())
-
-            # If still no URLs found, try without namespace
-            if not urls:
-                for url_element in root.findall('.//url'):
-                    loc_element = url_element.find('loc')
-                    if loc_element is not None and loc_element.text:
-                        urls.append(loc_element.text.strip())
-
-            self.urls = urls
-            print(f"✅ Parsed {len(urls)} URLs from sitemap")
-            if namespace_uri:
-                print(f"ℹ️  Used namespace: {namespace_uri}")
-            return urls
+            self._namespace_uri = None
+            self.is_index = False
+            self.child_stats = dict.fromkeys(self.child_stats, 0)
+            raw_xml = self.raw_xml
+            self.urls = CompactURLSet(self._iter_url_entries(raw_xml), columns=self.URL_COLUMNS)
+            self._suggester = None
+            self._lookup_cache = {}
+            if len(self.urls) >= Config.SITEMAP_BLOOM_MIN_URLS:
+                self.urls.enable_bloom_filter()
+            self._index_xml = raw_xml if self.is_index else None
+            self.raw_xml = None
+            self._parsed = True
+
+            print(f"✅ Parsed {len(self.urls)} URLs from sitemap")
+            if self.is_index:
+                stats = self.child_stats
+                print(f"ℹ️  Sitemap index with {stats['children']} child sitemaps: {stats['fetched']} fetched, "
+                      f"{stats['unchanged']} unchanged (skipped), {stats['not_modified']} not modified, "
+                      f"{stats['failed']} failed")
+            if self._namespace_uri:
+                print(f"ℹ️  Used namespace: {self._namespace_uri}")
+            return self.urls
 
         except ET.ParseError as e:
             print(f"❌ Error parsing sitemap XML: {e}")
-            return []
+            self._parsed = True
+            return self.urls
 
         except Exception as e:
             print(f"❌ Unexpected error parsing sitemap: {e}")
-            return []
+            self._parsed = True
+            return self.urls
+
+    def use_url_set(self, urls: CompactURLSet, sitemap_url: str = None):
+        """Use an already built URL set (e.g. from a stored snapshot) instead of fetching the sitemap."""
+        self.urls = urls
+        if sitemap_url:
+            self.sitemap_url = sitemap_url
+        self._suggester = None
+        self._lookup_cache = {}
+        if len(self.urls) >= Config.SITEMAP_BLOOM_MIN_URLS:
+            self.urls.enable_bloom_filter()
+        self.raw_xml = None
+        self.fetch_success = True
+        self._parsed = True
+
+    def _iter_url_entries(self, xml: bytes, follow_children: bool = True):
+        """
+        Stream-parse sitemap XML and yield (normalized loc, (lastmod, changefreq, priority)) per <url>.
 
-    def get_sitemap_urls(self) -> List[str]:
-        """Get all URLs from sitemap."""
-        if not self.urls:
+        <url>, <sitemap> and their fields are matched by local name, so the
+        standard, custom (QA CDN) and namespace-less sitemap variants are all
+        handled. Processed elements are cleared immediately so memory stays
+        flat regardless of sitemap size. <sitemap> entries of an index are
+        followed after the index itself has been read.
+        """
+        root = None
+        children = []
+        for event, element in ET.iterparse(io.BytesIO(xml), events=('start', 'end')):
+            if event == 'start':
+                if root is None:
+                    root = element
+                    if element.tag.startswith('{') and self._namespace_uri is None:
+                        self._namespace_uri = element.tag[1:element.tag.find('}')]
+                continue
+
+            name = self._local_name(element.tag)
+            if name not in ('url', 'sitemap'):
+                continue
+
+            fields = {}
+            for child in element:
+                field = self._local_name(child.tag)
+                if child.text and field not in fields:
+                    fields[field] = child.text.strip()
+            root.clear()
+
+            loc = fields.get('loc')
+            if not loc:
+                continue
+            if name == 'sitemap':
+                children.append((loc, fields.get('lastmod', '')))
+                continue
+
+            yield self.normalize_url_for_comparison(loc, preserve_trailing_slash=True), (
+                self.parse_lastmod(fields.get('lastmod', '')),
+                self.parse_changefreq(fields.get('changefreq', '')),
+                self.parse_priority(fields.get('priority', ''))
+            )
+
+        if children and follow_children:
+            self.is_index = True
+            self.child_stats['children'] += len(children)
+            for loc, lastmod in children:
+                yield from self._iter_child_sitemap(loc, lastmod)
+
+    def _iter_child_sitemap(self, loc: str, listed_lastmod: str):
+        """
+        Yield the entries of one child sitemap of an index.
+
+        A child whose index lastmod matches the cached one is replayed from
+        the cache without a request; otherwise it is fetched conditionally and
+        the cache is replayed on 304 (or, as a fallback, on fetch errors).
+        A child that is not well-formed XML is reported and skipped (after the
+        entries before the error) instead of failing the whole index.
+        """
+        cached = self.child_cache.get_metadata(loc) if self.child_cache else None
+        if cached and listed_lastmod and cached.get('index_lastmod') == listed_lastmod:
+            self.child_stats['unchanged'] += 1
+            yield from self.child_cache.iter_entries(loc)
+            return
+
+        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+        if cached and cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached and cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+        conditional = 'If-None-Match' in headers or 'If-Modified-Since' in headers
+
+        try:
+            start_time = time.time()
+            response = self.session.get(loc, timeout=Config.REQUEST_TIMEOUT, headers=headers)
+            emit('sitemap_fetch', url=loc, status_code=response.status_code, bytes=len(response.content),
+                 duration=round(time.time() - start_time, 3), conditional=conditional, child=True)
+        except requests.exceptions.RequestException as e:
+            response = None
+            emit('sitemap_fetch', url=loc, error=str(e), conditional=conditional, child=True)
+            print(f"❌ Error fetching child sitemap {loc}: {e}")
+
+        if response is not None and response.status_code == 304 and cached:
+            self.child_stats['not_modified'] += 1
+            yield from self.child_cache.iter_entries(loc)
+            return
+
+        if response is None or response.status_code != 200:
+            self.child_stats['failed'] += 1
+            if response is not None:
+                print(f"❌ Failed to fetch child sitemap {loc}: HTTP {response.status_code}")
+            if cached:
+                print(f"ℹ️  Using cached copy of {loc}")
+                yield from self.child_cache.iter_entries(loc)
+            return
+
+        entries = self._iter_url_entries(response.content, follow_children=False)
+        if self.child_cache:
+            metadata = {
+                'index_lastmod': listed_lastmod,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified')
+            }
+            entries = self.child_cache.store(loc, metadata, entries)
+        try:
+            yield from entries
+        except ET.ParseError as e:
+            # The entries read before the error are kept; the broken copy is not cached
+            self.child_stats['failed'] += 1
+            print(f"❌ Error parsing child sitemap {loc}: {e} (skipped)")
+            if cached:
+                print(f"ℹ️  Using cached copy of {loc}")
+                yield from self.child_cache.iter_entries(loc)
+            return
+        self.child_stats['fetched'] += 1
+
+    @staticmethod
+    def parse_lastmod(value: str) -> int:
+        """Parse a W3C datetime lastmod into UTC epoch seconds (0 if invalid)."""
+        try:
+            parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+        except ValueError:
+            return 0
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return int(parsed.timestamp())
+
+    @classmethod
+    def parse_changefreq(cls, value: str) -> int:
+        """Parse a changefreq into its CHANGEFREQ_VALUES index (0 if absent or invalid)."""
+        value = value.strip().lower()
+        return cls.CHANGEFREQ_VALUES.index(value) if value in cls.CHANGEFREQ_VALUES else 0
+
+    @staticmethod
+    def parse_priority(value: str) -> int:
+        """Parse a 0.0-1.0 priority into thousandths (-1 if absent or invalid)."""
+        try:
+            priority = float(value)
+        except ValueError:
+            return -1
+        return int(round(priority * 1000)) if 0 <= priority <= 1 else -1
+
+    @classmethod
+    def format_changefreq(cls, index: int) -> str:
+        """Format a stored changefreq index ('' if absent)."""
+        return cls.CHANGEFREQ_VALUES[index] if 0 <= index < len(cls.CHANGEFREQ_VALUES) else ''
+
+    @staticmethod
+    def format_priority(thousandths: int) -> str:
+        """Format a stored priority as e.g. '0.8' ('' if absent)."""
+        return f"{thousandths / 1000:g}" if thousandths >= 0 else ''
+
+    @staticmethod
+    def format_lastmod(epoch: int) -> str:
+        """Format epoch seconds from parse_lastmod as ISO 8601 UTC ('' if absent)."""
+        if not epoch:
+            return ''
+        return datetime.fromtimestamp(epoch, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    @staticmethod
+    def _local_name(tag: str) -> str:
+        """Strip the '{namespace}' prefix from an element tag."""
+        return tag.rsplit('}', 1)[-1]
+
+    def get_sitemap_urls(self) -> CompactURLSet:
+        """Get all (normalized) URLs from sitemap, parsing it once on first use."""
+        if not self._parsed:
             self.parse_sitemap()
         return self.urls
 
@@ -179,12 +432,12 @@ class SitemapHandler:
         sitemap_urls = self.get_sitemap_urls()
         normalized_test_url = self.normalize_url_for_comparison(test_url, preserve_trailing_slash)
 
-        # Normalize all sitemap URLs for comparison
-        normalized_sitemap_urls = [
-            self.normalize_url_for_comparison(url, preserve_trailing_slash) for url in sitemap_urls
-        ]
-
-        is_present = normalized_test_url in normalized_sitemap_urls
+        cache_key = (normalized_test_url, preserve_trailing_slash)
+        is_present = self._lookup_cache.get(cache_key)
+        if is_present is None:
+            candidates = self._lookup_candidates(normalized_test_url, preserve_trailing_slash)
+            is_present = any(candidate in sitemap_urls for candidate in candidates)
+            self._lookup_cache[cache_key] = is_present
 
         return {
             'url': test_url,
@@ -192,6 +445,45 @@ class SitemapHandler:
             'normalized_url': normalized_test_url
         }
 
+    def get_url_lastmod(self, test_url: str, preserve_trailing_slash: bool = False) -> Optional[int]:
+        """Get a URL's sitemap lastmod (epoch seconds, 0 if unset), or None if it is not listed."""
+        sitemap_urls = self.get_sitemap_urls()
+        normalized_test_url = self.normalize_url_for_comparison(test_url, preserve_trailing_slash)
+        for candidate in self._lookup_candidates(normalized_test_url, preserve_trailing_slash):
+            lastmod = sitemap_urls.get_value(candidate, 'lastmod')
+            if lastmod is not None:
+                return lastmod
+        return None
+
+    @staticmethod
+    def _lookup_candidates(normalized_test_url: str, preserve_trailing_slash: bool) -> List[str]:
+        """Sitemap keys that match a normalized test URL."""
+        # The sitemap set keeps trailing slashes, so a slash-insensitive lookup
+        # matches either form of the (already stripped) test URL
+        if preserve_trailing_slash:
+            return [normalized_test_url]
+        if normalized_test_url.endswith('/'):
+            return [normalized_test_url + '/']
+        return [normalized_test_url, normalized_test_url + '/']
+
+    def suggest_sitemap_matches(self, test_url: str, limit: int = None) -> List[Dict]:
+        """
+        Get the closest sitemap URLs for a URL that is missing from the sitemap.
+
+        The suggestion index is built on first use, so runs without misses
+        never pay for it.
+
+        Returns:
+            List of {'url', 'score'} dicts, best first
+        """
+        sitemap_urls = self.get_sitemap_urls()
+        if not sitemap_urls:
+            return []
+        if self._suggester is None:
+            self._suggester = SitemapSuggester(sitemap_urls)
+        normalized_test_url = self.normalize_url_for_comparison(test_url, preserve_trailing_slash=True)
+        return self._suggester.suggest(normalized_test_url, limit)
+
     def validate_expected_urls(self, expected_urls: List[str]) -> Dict:
         """Validate that expected URLs are present in sitemap."""
         results = {
@@ -235,7 +527,15 @@ class SitemapHandler:
         return results
 
     def get_sitemap_analysis(self, redirect_data: List[Dict], remove_data: List[Dict]) -> Dict:
-        """Perform comprehensive sitemap analysis."""
+        """
+        Perform comprehensive sitemap analysis.
+
+        Membership checks already made while testing are served from the
+        lookup cache; only URLs not seen yet hit the sitemap set. The cache
+        key includes the trailing-slash mode, so this applies to the redirect
+        targets and remove URLs: original URLs were checked with their
+        trailing slash preserved while testing and are looked up again here.
+        """
         # Extract URLs for analysis
         expected_urls = [item['expected_url'] for item in redirect_data if item['expected_url'] != 'REMOVE']
         original_urls = [item['original_url'] for item in redirect_data]
@@ -254,23 +554,23 @@ class SitemapHandler:
             'expected_urls': expected_validation,
             'removed_urls': removed_validation,
             'original_urls_check': original_validation,
-            'fetch_success': bool(self.raw_xml)
+            'fetch_success': self.fetch_success
         }
 
     def get_sitemap_stats(self) -> Dict:
         """Get basic statistics about the sitemap."""
         urls = self.get_sitemap_urls()
 
-        # Analyze URL patterns
-        paths = []
+        # Analyze URL patterns (stored URLs are 'host/path' without scheme)
+        paths = set()
         for url in urls:
-            parsed = urlparse(url)
-            paths.append(parsed.path)
+            paths.add('/' + url.partition('/')[2])
 
         return {
             'total_urls': len(urls),
             'sitemap_url': self.sitemap_url,
             'environment': self.environment,
-            'unique_paths': len(set(paths)),
-            'sample_urls': urls[:5] if urls else []
+            'unique_paths': len(paths),
+            'sample_urls': urls[:5] if urls else [],
+            'memory_bytes': urls.memory_usage()
         }
\ No newline at end of file
@@ -0,0 +1,139 @@
+"""
+HTTP transports for URL testing.
+
+URLTester talks to a transport through a requests-style ``request(method, url,
+timeout, allow_redirects, stream)`` call. The default is the plain requests.Session
+(HTTP/1.1). Http2Transport multiplexes many in-flight requests over a few
+connections per host using httpx; it is optional and only used when the
+``httpx[http2]`` extra is installed. Servers that do not negotiate h2 via ALPN
+are transparently spoken to over HTTP/1.1.
+
+Errors are mapped onto the requests exception hierarchy so URLTester's
+retry and result handling is identical for both transports.
+"""
+import threading
+from typing import Dict
+import requests
+from config import Config
+
+try:
+    import httpx
+    import h2  # noqa: F401 - httpx needs it for http2=True
+    HTTP2_AVAILABLE = True
+except ImportError:
+    httpx = None
+    HTTP2_AVAILABLE = False
+
+
+class Http2Response:
+    """Minimal requests.Response look-alike wrapping an httpx response."""
+
+    def __init__(self, response, history=None):
+        """Wrap httpx response."""
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.url = str(response.url)
+        self.http_version = response.http_version
+        self.history = history if history is not None else [
+            Http2Response(r, history=[]) for r in response.history
+        ]
+
+    @property
+    def encoding(self):
+        """Charset declared in the Content-Type header (None if absent), like requests.Response.encoding."""
+        return self._response.charset_encoding
+
+    @property
+    def content(self) -> bytes:
+        """Full response body (reads the stream if needed)."""
+        return self._response.read()
+
+    @property
+    def text(self) -> str:
+        """Decoded response body."""
+        self._response.read()
+        return self._response.text
+
+    def iter_content(self, chunk_size: int = 8192):
+        """Iterate over the body in chunks, like requests.Response.iter_content."""
+        return self._response.iter_bytes(chunk_size)
+
+    def close(self):
+        """Release the underlying stream."""
+        self._response.close()
+
+
+class Http2Transport:
+    """HTTP/2 transport backed by a shared httpx.Client."""
+
+    def __init__(self, headers: Dict = None, max_connections: int = 10):
+        """
+        Initialize transport.
+
+        Args:
+            headers: Default headers sent with every request
+            max_connections: Connection pool size; with h2 each connection
+                             carries many concurrent streams
+        """
+        if not HTTP2_AVAILABLE:
+            raise ImportError("HTTP/2 transport requires 'httpx[http2]' (pip install 'httpx[http2]')")
+
+        self.client = httpx.Client(
+            http2=True,
+            headers=headers or {},
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_connections)
+        )
+        self._version_counts = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str, timeout: float = None, allow_redirects: bool = True,
+            stream: bool = False, headers: Dict = None) -> Http2Response:
+        """Send a GET request, raising requests exceptions on failure."""
+        return self.request('GET', url, timeout=timeout, allow_redirects=allow_redirects,
+                            stream=stream, headers=headers)
+
+    def request(self, method: str, url: str, timeout: float = None, allow_redirects: bool = True,
+                stream: bool = False, headers: Dict = None) -> Http2Response:
+        """Send a request, raising requests exceptions on failure."""
+        try:
+            request = self.client.build_request(method, url, headers=headers, timeout=timeout)
+            response = self.client.send(request, stream=stream, follow_redirects=allow_redirects)
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e))
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(str(e))
+        except httpx.HTTPError as e:
+            raise requests.exceptions.RequestException(str(e))
+
+        with self._lock:
+            self._version_counts[response.http_version] = self._version_counts.get(response.http_version, 0) + 1
+
+        return Http2Response(response)
+
+    def get_stats(self) -> Dict:
+        """Get count of responses per negotiated HTTP version."""
+        with self._lock:
+            return dict(self._version_counts)
+
+    def close(self):
+        """Close pooled connections."""
+        self.client.close()
+
+
+def create_transport(session: requests.Session, use_http2: bool = False):
+    """
+    Get the transport URLTester should send requests through.
+
+    Falls back to the HTTP/1.1 requests session when HTTP/2 is requested but
+    httpx[http2] is not installed.
+    """
+    if not use_http2:
+        return session
+
+    if not HTTP2_AVAILABLE:
+        print("⚠️  HTTP/2 requested but 'httpx[http2]' is not installed; falling back to HTTP/1.1")
+        return session
+
+    return Http2Transport(headers=dict(session.headers), max_connections=Config.HTTP2_MAX_CONNECTIONS)
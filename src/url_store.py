@@ -0,0 +1,358 @@
+"""
+Memory-compact storage for large sitemap URL sets.
+
+A sitemap index can list millions of URLs; keeping them as a Python list of
+full URL strings (plus a normalized copy per lookup) costs gigabytes.
+CompactURLSet stores normalized URLs instead as:
+- a host table, so each host prefix is stored once and entries carry a 2-byte host id
+- one contiguous byte buffer of sorted, front-coded keys (each key only stores
+  the suffix it does not share with the previous key)
+- a restart offset array every BLOCK_SIZE keys, binary-searched for membership
+
+Large sets are built in runs of RUN_SIZE keys: each run is sorted and packed
+into a byte buffer on its own, and the runs are merged into the final buffer,
+so building never holds more than one run of keys as Python objects.
+
+An optional Bloom filter in front of the binary search answers most negative
+lookups without touching the buffer. Numeric per-URL attributes (e.g. lastmod
+timestamps) can be kept in typed arrays parallel to the sorted keys.
+"""
+import hashlib
+import heapq
+import math
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+
+def _encode_varint(value: int, out: bytearray):
+    """Append value to out as an unsigned LEB128 varint."""
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _decode_varint(buffer: bytes, position: int) -> Tuple[int, int]:
+    """Decode an unsigned LEB128 varint; returns (value, next position)."""
+    value = 0
+    shift = 0
+    while True:
+        byte = buffer[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over byte strings."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        """Size the filter for capacity items at the given false positive rate."""
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: bytes) -> Iterator[int]:
+        """Bit positions for item using double hashing of one 128-bit digest."""
+        digest = hashlib.blake2b(item, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: bytes):
+        """Add item to the filter."""
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: bytes) -> bool:
+        """Check membership (false positives possible, no false negatives)."""
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class _RestartKeys:
+    """Sequence view over the first key of every block, for bisect."""
+
+    def __init__(self, url_set: 'CompactURLSet'):
+        self._url_set = url_set
+
+    def __len__(self) -> int:
+        return len(self._url_set._restarts)
+
+    def __getitem__(self, block: int) -> bytes:
+        position = self._url_set._restarts[block]
+        _, position = _decode_varint(self._url_set._buffer, position)
+        length, position = _decode_varint(self._url_set._buffer, position)
+        return bytes(self._url_set._buffer[position:position + length])
+
+
+class CompactURLSet:
+    """Sorted, deduplicated, front-coded set of normalized URL strings."""
+
+    BLOCK_SIZE = 16
+    RUN_SIZE = 1 << 16  # keys sorted in memory at once while building
+
+    def __init__(self, urls: Iterable = (), use_bloom: bool = False, bloom_error_rate: float = 0.01,
+                 columns: Sequence[Tuple[str, str]] = None):
+        """
+        Build the set.
+
+        Args:
+            urls: Normalized URLs ('host/path', no scheme); duplicates are dropped.
+                  With columns, yields (url, values) pairs instead.
+            use_bloom: Put a Bloom filter in front of lookups
+            bloom_error_rate: Bloom filter false positive rate
+            columns: Optional (name, array typecode) pairs for numeric per-URL
+                     attributes stored in arrays parallel to the sorted keys.
+                     The first value seen for a duplicate URL wins.
+        """
+        self._hosts: List[str] = []
+        self._host_ids = {}
+        self.columns = tuple(columns or ())
+
+        runs = []
+        run = {}
+        for entry in urls:
+            url, values = entry if self.columns else (entry, ())
+            if url:
+                run.setdefault(self._make_key(url, create_host=True), values)
+                if len(run) >= self.RUN_SIZE:
+                    runs.append(self._pack_run(run))
+                    run = {}
+        if runs and run:
+            runs.append(self._pack_run(run))
+        entries = self._merge_runs(runs) if runs else sorted(run.items())
+        del run
+
+        self._buffer, self._restarts, self._column_data, self._length = self._encode(entries)
+        self._restart_keys = _RestartKeys(self)
+
+        self._bloom = None
+        if use_bloom:
+            self.enable_bloom_filter(bloom_error_rate)
+
+    def _encode(self, entries: Iterable[Tuple[bytes, tuple]]) -> Tuple[bytes, array, Dict[str, array], int]:
+        """
+        Front-code sorted, distinct (key, column values) pairs.
+
+        Returns:
+            (key buffer, restart offsets, column arrays, key count) tuple
+        """
+        buffer = bytearray()
+        restarts = array('I')
+        column_data = {name: array(typecode) for name, typecode in self.columns}
+        previous = b''
+        count = 0
+        for key, values in entries:
+            if count % self.BLOCK_SIZE == 0:
+                if restarts.typecode == 'I' and len(buffer) >= 2 ** 32:
+                    restarts = array('Q', restarts)
+                restarts.append(len(buffer))
+                shared = 0
+            else:
+                shared = self._shared_prefix_length(previous, key)
+            _encode_varint(shared, buffer)
+            _encode_varint(len(key) - shared, buffer)
+            buffer += key[shared:]
+            for (name, _), value in zip(self.columns, values):
+                column_data[name].append(value)
+            previous = key
+            count += 1
+        return bytes(buffer), restarts, column_data, count
+
+    def _pack_run(self, run: Dict[bytes, tuple]) -> Tuple[bytes, array, Dict[str, array]]:
+        """
+        Sort a run of key -> column values and pack it for merging.
+
+        Returns:
+            (concatenated sorted keys, end offset of each key, column arrays) tuple
+        """
+        keys = sorted(run)
+        ends = array('Q', accumulate(map(len, keys)))
+        column_data = {name: array(typecode, (run[key][i] for key in keys))
+                       for i, (name, typecode) in enumerate(self.columns)}
+        return b''.join(keys), ends, column_data
+
+    def _merge_runs(self, runs: List[Tuple]) -> Iterator[Tuple[bytes, tuple]]:
+        """Merge packed runs into sorted, distinct (key, column values) pairs; earlier runs win duplicates."""
+        def entries(number, run):
+            buffer, ends, column_data = run
+            start = 0
+            for position, end in enumerate(ends):
+                yield buffer[start:end], number, tuple(column_data[name][position] for name, _ in self.columns)
+                start = end
+
+        previous = None
+        for key, _, values in heapq.merge(*(entries(number, run) for number, run in enumerate(runs))):
+            if key != previous:
+                yield key, values
+                previous = key
+
+    def enable_bloom_filter(self, error_rate: float = 0.01):
+        """Build a Bloom filter over the stored keys to fast-reject misses."""
+        if not self._length:
+            return
+        bloom = BloomFilter(self._length, error_rate)
+        for _, key in self._iter_range(0, self._length):
+            bloom.add(key)
+        self._bloom = bloom
+
+    @staticmethod
+    def _shared_prefix_length(a: bytes, b: bytes) -> int:
+        """Length of the common prefix of two byte strings."""
+        limit = min(len(a), len(b))
+        i = 0
+        while i < limit and a[i] == b[i]:
+            i += 1
+        return i
+
+    def _make_key(self, url: str, create_host: bool = False) -> Optional[bytes]:
+        """Encode 'host/path' as 2-byte host id + path bytes (None for unknown hosts)."""
+        host, slash, path = url.partition('/')
+        host_id = self._host_ids.get(host)
+        if host_id is None:
+            if not create_host:
+                return None
+            host_id = len(self._hosts)
+            if host_id >= 0xFFFF:
+                raise ValueError("CompactURLSet supports at most 65535 distinct hosts")
+            self._hosts.append(host)
+            self._host_ids[host] = host_id
+        return host_id.to_bytes(2, 'big') + (slash + path).encode('utf-8')
+
+    def _decode_key(self, key: bytes) -> str:
+        """Turn an encoded key back into 'host/path'."""
+        return self._hosts[int.from_bytes(key[:2], 'big')] + key[2:].decode('utf-8')
+
+    def _iter_block(self, block: int) -> Iterator[bytes]:
+        """Decode the keys of one block in order."""
+        end = self._restarts[block + 1] if block + 1 < len(self._restarts) else len(self._buffer)
+        return self._decode_keys(self._buffer, self._restarts[block], end)
+
+    @staticmethod
+    def _decode_keys(buffer: bytes, position: int, end: int) -> Iterator[bytes]:
+        """Decode the front-coded keys from a restart position up to end, in order."""
+        key = b''
+        while position < end:
+            shared, position = _decode_varint(buffer, position)
+            length, position = _decode_varint(buffer, position)
+            key = key[:shared] + buffer[position:position + length]
+            position += length
+            yield key
+
+    def _iter_range(self, start: int, stop: int) -> Iterator[Tuple[int, bytes]]:
+        """Yield (index, key) for sorted positions start..stop-1."""
+        index = start - start % self.BLOCK_SIZE
+        for block in range(start // self.BLOCK_SIZE, len(self._restarts)):
+            for key in self._iter_block(block):
+                if index >= stop:
+                    return
+                if index >= start:
+                    yield index, key
+                index += 1
+
+    def _lower_bound(self, key: bytes) -> int:
+        """Sorted position of the first stored key >= key."""
+        block = bisect_right(self._restart_keys, key) - 1
+        if block < 0:
+            return 0
+        index = block * self.BLOCK_SIZE
+        for candidate in self._iter_block(block):
+            if candidate >= key:
+                return index
+            index += 1
+        return index
+
+    def index(self, url: str) -> int:
+        """Sorted position of url, or -1 if it is not in the set."""
+        if not self._length or not isinstance(url, str):
+            return -1
+
+        key = self._make_key(url)
+        if key is None:
+            return -1
+
+        if self._bloom is not None and key not in self._bloom:
+            return -1
+
+        block = bisect_right(self._restart_keys, key) - 1
+        if block < 0:
+            return -1
+
+        position = block * self.BLOCK_SIZE
+        for candidate in self._iter_block(block):
+            if candidate == key:
+                return position
+            if candidate > key:
+                return -1
+            position += 1
+        return -1
+
+    def __contains__(self, url: str) -> bool:
+        """Check if a normalized URL is in the set."""
+        return self.index(url) >= 0
+
+    def get_value(self, url: str, column: str, default=None):
+        """Get a column value for url, or default if url is not in the set."""
+        position = self.index(url)
+        if position < 0:
+            return default
+        return self._column_data[column][position]
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over URLs in storage order (grouped by host, paths sorted)."""
+        for _, key in self._iter_range(0, self._length):
+            yield self._decode_key(key)
+
+    def iter_items(self) -> Iterator[Tuple[str, tuple]]:
+        """
+        Yield (url, column values) sorted by (host, path).
+
+        Unlike plain iteration the order does not depend on host insertion
+        order, so two sets can be compared with a streaming merge.
+        """
+        for host in sorted(self._hosts):
+            host_id = self._host_ids[host]
+            start = self._lower_bound(host_id.to_bytes(2, 'big'))
+            stop = self._lower_bound((host_id + 1).to_bytes(2, 'big'))
+            for position, key in self._iter_range(start, stop):
+                values = tuple(self._column_data[name][position] for name, _ in self.columns)
+                yield self._decode_key(key), values
+
+    def __getitem__(self, index):
+        """Get URL by storage position; slices return lists."""
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._length)
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return [self._decode_key(key) for _, key in self._iter_range(start, stop)]
+
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("CompactURLSet index out of range")
+
+        for _, key in self._iter_range(index, index + 1):
+            return self._decode_key(key)
+
+    @property
+    def hosts(self) -> List[str]:
+        """Distinct hosts in the set."""
+        return list(self._hosts)
+
+    def memory_usage(self) -> int:
+        """Approximate bytes used by the encoded data structures."""
+        size = len(self._buffer) + self._restarts.itemsize * len(self._restarts)
+        size += sum(len(host) for host in self._hosts)
+        size += sum(data.itemsize * len(data) for data in self._column_data.values())
+        if self._bloom is not None:
+            size += len(self._bloom.bits)
+        return size
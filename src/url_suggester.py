@@ -0,0 +1,131 @@
+"""
+Near-match suggestions for URLs missing from the sitemap.
+
+When an expected URL is not in the sitemap the cause is usually a near-miss:
+trailing slash, a `.html` suffix, a `/blog/` vs root path or a reworded slug
+(see docs/reports/SITEMAP_ISSUES.md). SitemapSuggester finds the closest
+sitemap entries without comparing each miss against every sitemap URL:
+
+1. Cheap variant probes (slash, `.html`, `/blog/` toggles) against the
+   compact URL set, O(1) each.
+2. An inverted index from path tokens (segments split on `/`, `-`, `_`, `.`)
+   to sitemap positions. Candidates are ranked by shared rare tokens, and only
+   the best few are re-scored with difflib.
+"""
+import re
+from array import array
+from bisect import bisect_left
+from difflib import SequenceMatcher
+from heapq import nlargest
+from math import log
+from typing import Dict, List
+from config import Config
+from url_store import CompactURLSet
+
+
+class SitemapSuggester:
+    """Top-k closest sitemap URL lookup over a CompactURLSet."""
+
+    TOKEN_PATTERN = re.compile(r'[/\-_.]+')
+
+    def __init__(self, url_set: CompactURLSet):
+        """Build the token index over every URL in the set."""
+        self.url_set = url_set
+        self._postings: Dict[str, array] = {}
+
+        for position, url in enumerate(url_set):
+            for token in set(self._tokenize(url)):
+                postings = self._postings.get(token)
+                if postings is None:
+                    postings = self._postings[token] = array('I')
+                postings.append(position)
+
+        # Cap on candidates collected per lookup before re-scoring
+        self._max_postings = Config.SUGGESTION_MAX_POSTINGS
+
+    def _tokenize(self, url: str) -> List[str]:
+        """Split the path of a normalized 'host/path' URL into tokens."""
+        path = url.partition('/')[2]
+        return [token for token in self.TOKEN_PATTERN.split(path) if token]
+
+    def _variants(self, url: str) -> List[str]:
+        """Common near-miss spellings of a normalized URL."""
+        host, _, path = url.partition('/')
+        stripped = path.rstrip('/')
+        bases = {stripped}
+
+        if stripped.endswith('.html'):
+            bases.add(stripped[:-len('.html')])
+        elif stripped:
+            bases.add(stripped + '.html')
+
+        for base in list(bases):
+            if base.startswith('blog/'):
+                bases.add(base[len('blog/'):])
+            else:
+                bases.add('blog/' + base)
+
+        variants = []
+        for base in bases:
+            variants.append(f"{host}/{base}")
+            variants.append(f"{host}/{base}/")
+        return [variant for variant in variants if variant != url]
+
+    def suggest(self, normalized_url: str, limit: int = None) -> List[Dict]:
+        """
+        Get the closest sitemap URLs for a URL that is not in the sitemap.
+
+        Args:
+            normalized_url: URL normalized with trailing slash preserved
+            limit: Maximum number of suggestions (default Config.SUGGESTION_COUNT)
+
+        Returns:
+            List of {'url', 'score'} dicts, best first
+        """
+        limit = limit or Config.SUGGESTION_COUNT
+        suggestions = {}
+
+        for variant in self._variants(normalized_url):
+            if variant in self.url_set:
+                suggestions[variant] = 1.0
+
+        # Rarest tokens seed the candidate pool; once it is full, more common
+        # tokens only add weight to candidates already in it (postings are
+        # sorted, so membership is a binary search)
+        candidate_scores = {}
+        total = max(1, len(self.url_set))
+        tokens = sorted((token for token in set(self._tokenize(normalized_url)) if token in self._postings),
+                        key=lambda token: len(self._postings[token]))
+
+        for token in tokens:
+            postings = self._postings[token]
+            weight = log(total / len(postings)) + 1.0
+            if not candidate_scores or len(candidate_scores) + len(postings) <= self._max_postings:
+                for position in postings[:self._max_postings]:
+                    candidate_scores[position] = candidate_scores.get(position, 0.0) + weight
+            else:
+                for position in candidate_scores:
+                    i = bisect_left(postings, position)
+                    if i < len(postings) and postings[i] == position:
+                        candidate_scores[position] += weight
+
+        # The query path is the fixed second sequence so difflib indexes it once;
+        # cheap upper bounds skip candidates that cannot make the top-k
+        matcher = SequenceMatcher(None, autojunk=False)
+        matcher.set_seq2(normalized_url.partition('/')[2])
+        for position, _ in nlargest(Config.SUGGESTION_CANDIDATES, candidate_scores.items(), key=lambda item: item[1]):
+            candidate = self.url_set[position]
+            if candidate in suggestions or candidate == normalized_url:
+                continue
+            threshold = Config.SUGGESTION_MIN_SCORE
+            if len(suggestions) >= limit:
+                threshold = max(threshold, sorted(suggestions.values(), reverse=True)[limit - 1])
+            matcher.set_seq1(candidate.partition('/')[2])
+            if matcher.real_quick_ratio() < threshold or matcher.quick_ratio() < threshold:
+                continue
+            score = matcher.ratio()
+            if score >= threshold:
+                suggestions[candidate] = score
+
+        ranked = sorted(suggestions.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [{'url': url, 'score': round(score, 3)} for url, score in ranked]
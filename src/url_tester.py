@@ -2,10 +2,20 @@
 URL testing functionality for validating redirects and responses.
 """
 import requests
+import threading
 import time
-from typing import Dict, List
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 from urllib.parse import urljoin, urlparse
 from config import Config
+from events import emit
+from concurrency import AdaptiveConcurrencyController, RateLimiter
+from connections import ConnectionManager
+from content_inspector import ContentInspector
+from head_parser import HeadParserPool
+from retry_policy import CircuitBreaker, CircuitOpenError, RetryPolicy
+from transport import create_transport
 
 
 class URLTester:
@@ -16,14 +26,41 @@ class URLTester:
         self.environment = environment or Config.CURRENT_ENV
         self.base_url = Config.get_base_url(self.environment)
         self.session = requests.Session()
+        self.concurrency = AdaptiveConcurrencyController()
+        self.rate_limiter = RateLimiter(Config.RATE_LIMIT) if Config.RATE_LIMIT else None
+        self.retry_policy = RetryPolicy()
+        self.circuit_breaker = CircuitBreaker()
+        self.inspector = ContentInspector()
+        self.record_duplicates = True  # group 200 bodies for the duplicate content report
+        self.head_parsers = HeadParserPool()
+        if not Config.INSPECT_FULL_BODY:
+            print("⚠️  Config.INSPECT_FULL_BODY is off: redirect target downloads stop at </head>, so their "
+                  "content hash, size, minimum size and soft-404 checks are skipped")
+        self._not_found_lock = threading.Lock()
+
+        # Pools sized so every worker thread can keep its own connection; hosts resolved once
+        hosts = list(Config.ENVIRONMENTS.values()) + Config.EXTERNAL_HOSTS + [urlparse(self.base_url).hostname]
+        self.connections = ConnectionManager(self.session, hosts)
 
         # Set up session headers
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
 
-    def test_url(self, url: str, expected_status: int = None) -> Dict:
-        """Test a single URL and return results."""
+        # Requests go through the session (HTTP/1.1) or an optional HTTP/2 transport
+        self.transport = create_transport(self.session, Config.USE_HTTP2)
+
+    def test_url(self, url: str, expected_status: int = None, parse_head: bool = False) -> Dict:
+        """
+        Test a single URL and return results.
+
+        With parse_head, the <head> of a 200 response is queued for parsing and
+        result['page_head'] is a future resolving to its title, canonical and
+        meta robots (stream_results replaces it with the parsed fields);
+        without Config.INSPECT_FULL_BODY the body is then only read up to
+        </head> and the content checks are skipped. Bodies recorded for duplicate detection carry their sketch in
+        result['content_sketch'], which callers of stream_results take out again.
+        """
         expected_status = expected_status or Config.EXPECTED_RESPONSE_CODE
 
         # Prepare the full URL
@@ -45,7 +82,6 @@ class URLTester:
             response = self._make_request_with_retry(full_url)
 
             result['status_code'] = response.status_code
-            result['response_time'] = round(time.time() - start_time, 3)
             result['success'] = response.status_code == expected_status
 
             # Track redirect chain
@@ -54,11 +90,31 @@ class URLTester:
 
             # Additional checks for successful responses
             if response.status_code == 200:
-                # Check if page actually loads content (not just returns 200)
-                content_length = len(response.content)
-                if content_length < 100:  # Suspiciously small content
-                    result['error'] = f"Response too small ({content_length} bytes)"
-                    result['success'] = False
+                # Stream the body through the inspector instead of buffering it
+                inspection = self.inspector.inspect(response, collect_head=parse_head)
+                if inspection['head'] is not None:
+                    result['page_head'] = self.head_parsers.submit(inspection['head'], response.encoding)
+
+                if inspection['hash'] is not None:
+                    result['content_hash'] = inspection['hash']
+                    result['content_size'] = inspection['size']
+
+                    # Check if page actually loads content (not just returns 200)
+                    if inspection['size'] < Config.MIN_CONTENT_SIZE:  # Suspiciously small content
+                        result['error'] = f"Response too small ({inspection['size']} bytes)"
+                        result['success'] = False
+                    elif self._is_not_found_page(full_url, inspection):
+                        result['soft_404'] = True
+                        result['error'] = "Soft 404: page content matches the site's not-found page"
+                        result['success'] = False
+
+                    if self.record_duplicates:
+                        self.inspector.record(result, inspection)
+                    result['content_sketch'] = inspection['sketch']
+            else:
+                response.close()
+
+            result['response_time'] = round(time.time() - start_time - response.queue_wait, 3)
 
         except requests.exceptions.Timeout:
             result['error'] = 'Request timeout'
@@ -68,6 +124,10 @@ class URLTester:
             result['error'] = 'Connection error'
             result['response_time'] = round(time.time() - start_time, 3)
 
+        except CircuitOpenError as e:
+            result['error'] = str(e)
+            result['response_time'] = 0
+
         except requests.exceptions.RequestException as e:
             result['error'] = f'Request error: {str(e)}'
             result['response_time'] = round(time.time() - start_time, 3)
@@ -79,8 +139,8 @@ class URLTester:
         return result
 
     def test_redirect_url(self, expected_url: str) -> Dict:
-        """Test if an expected URL returns 200 status."""
-        return self.test_url(expected_url, Config.EXPECTED_RESPONSE_CODE)
+        """Test if an expected URL returns 200 status and collect its <head>."""
+        return self.test_url(expected_url, Config.EXPECTED_RESPONSE_CODE, parse_head=True)
 
     def test_remove_url(self, url: str) -> Dict:
         """Test if a URL marked for removal is properly inaccessible."""
@@ -100,29 +160,285 @@ class URLTester:
 
         return result
 
-    def test_multiple_urls(self, urls: List[Dict], test_type: str = 'redirect') -> List[Dict]:
-        """Test multiple URLs and return results."""
-        results = []
-
-        for i, url_data in enumerate(urls, 1):
-            if test_type == 'redirect':
-                expected_url = url_data['expected_url']
-                result = self.test_redirect_url(expected_url)
-                result['original_url'] = url_data['original_url']
-                result['test_type'] = 'redirect'
+    def verify_redirect(self, original_url: str, expected_url: str) -> Dict:
+        """
+        Check that original_url answers with a single 301 hop to expected_url.
+
+        Redirects are not followed automatically and only headers are fetched
+        (HEAD, or a GET closed before its body if HEAD is not allowed). When
+        the first Location is not the expected URL, up to
+        Config.MAX_REDIRECT_HOPS further hops are probed to tell a redirect
+        chain from a wrong target.
+
+        Returns:
+            Dictionary with 'status_code', 'location', 'hops', 'response_time',
+            'verified' and 'issue' (None when verified)
+        """
+        url = self._prepare_url(original_url)
+        expected = self._comparable_url(self._prepare_url(expected_url))
+        check = {
+            'status_code': None,
+            'location': '',
+            'hops': [],
+            'response_time': None,
+            'verified': False,
+            'issue': None
+        }
 
-            elif test_type == 'remove':
-                original_url = url_data['original_url']
-                result = self.test_remove_url(original_url)
-                result['original_url'] = original_url
-                result['test_type'] = 'remove'
+        start_time = time.time()
+        try:
+            status_code, location, queue_wait = self._probe_redirect(url)
+            check['response_time'] = round(time.time() - start_time - queue_wait, 3)
+            check['status_code'] = status_code
+            check['location'] = location
+
+            if status_code not in (301, 302, 303, 307, 308) or not location:
+                check['issue'] = f"No redirect (status {status_code})"
+                return check
+
+            current = location
+            check['hops'].append(current)
+            while self._comparable_url(current) != expected and len(check['hops']) <= Config.MAX_REDIRECT_HOPS:
+                try:
+                    hop_status, hop_location, _ = self._probe_redirect(current)
+                except requests.exceptions.RequestException:
+                    break  # The first hop already tells us the target is wrong
+                if hop_status not in (301, 302, 303, 307, 308) or not hop_location:
+                    break
+                current = hop_location
+                check['hops'].append(current)
+
+            reaches_expected = self._comparable_url(current) == expected
+            if not reaches_expected:
+                check['issue'] = f"Redirects to {location}"
+            elif len(check['hops']) > 1:
+                check['issue'] = f"Redirect chain of {len(check['hops'])} hops"
+            elif status_code != Config.TARGET_STATUS_CODE:
+                check['issue'] = f"{status_code} instead of {Config.TARGET_STATUS_CODE}"
+            else:
+                check['verified'] = True
 
-            result['test_number'] = i
+        except CircuitOpenError as e:
+            check['issue'] = str(e)
+        except requests.exceptions.RequestException as e:
+            check['issue'] = f'Request error: {str(e)}'
+            check['response_time'] = round(time.time() - start_time, 3)
+
+        return check
+
+    def _probe_redirect(self, url: str):
+        """Fetch only the headers of url without following redirects; returns (status, absolute Location, queue wait)."""
+        response = self._make_request_with_retry(url, method='HEAD', allow_redirects=False)
+        if response.status_code in (405, 501):
+            response.close()
+            response = self._make_request_with_retry(url, method='GET', allow_redirects=False)
+        response.close()
+
+        location = response.headers.get('Location', '')
+        return response.status_code, urljoin(url, location) if location else '', response.queue_wait
+
+    def measure_response_time(self, url: str, probe_redirect: bool = False) -> Optional[float]:
+        """
+        Time one more request to url (seconds, excluding concurrency queueing).
+
+        With probe_redirect the same header-only, no-follow probe as
+        verify_redirect is timed; otherwise a full GET with the body read.
+        Returns None if the request fails.
+        """
+        full_url = self._prepare_url(url)
+        start_time = time.time()
+        try:
+            if probe_redirect:
+                _, _, queue_wait = self._probe_redirect(full_url)
+            else:
+                response = self._make_request_with_retry(full_url)
+                queue_wait = response.queue_wait
+                for _ in response.iter_content(chunk_size=Config.CONTENT_CHUNK_SIZE):
+                    pass
+                response.close()
+        except requests.exceptions.RequestException:
+            return None
+        return round(time.time() - start_time - queue_wait, 3)
+
+    def _comparable_url(self, url: str) -> str:
+        """Normalize a URL for redirect target comparison (scheme, environment host, slash, case)."""
+        normalized = url.split('://', 1)[-1]
+        host, slash, path = normalized.partition('/')
+        if host in Config.ENVIRONMENTS.values():
+            host = Config.ENVIRONMENTS['prod']
+        return (host + slash + path).rstrip('/').lower()
+
+    def test_multiple_urls(self, urls: List[Dict], test_type: str = 'redirect',
+                           on_result: Callable[[Dict, Dict], None] = None, journal=None,
+                           budget=None) -> List[Dict]:
+        """
+        Test multiple URLs concurrently and return results in input order.
+
+        Runs stream_results over the list, so work starts in list order and
+        callers put the most important URLs first.
+
+        Args:
+            urls: URL dictionaries from CSVParser
+            test_type: 'redirect' or 'remove'
+            on_result: Optional callback(result, url_data) invoked in the calling
+                       thread as each test completes (completion order)
+            journal: Optional CheckpointJournal recording each result after
+                     on_result, keyed by url_data's 'position' (default: index)
+            budget: Optional RunBudget; once it is exhausted, tests that have not
+                    started are cancelled and their results are None
+        """
+        results = [None] * len(urls)
+
+        if not urls or (budget and budget.exhausted()):
+            return results
+
+        stop = budget.exhausted if budget else None
+        for i, url_data, result in self.stream_results(urls, test_type, stop=stop):
+            sketch = result.pop('content_sketch', None)
+            result['test_number'] = i + 1
             result['total_tests'] = len(urls)
-            results.append(result)
+            results[i] = result
+
+            if on_result:
+                on_result(result, url_data)
+            if journal:
+                journal.record(test_type, url_data.get('position', i), result, sketch)
+            if budget:
+                budget.record(result)
 
         return results
 
+    def stream_results(self, urls: Iterable[Dict], test_type: str = 'redirect', max_workers: int = None,
+                       stop: Callable[[], object] = None) -> Iterator[Tuple[int, Dict, Dict]]:
+        """
+        Test URLs from an iterable concurrently, yielding (index, url_data, result) as each completes.
+
+        The iterable is consumed lazily, keeping at most two tests per worker
+        submitted, so it may be a generator of unknown length. Requests run on
+        a thread pool of max_workers (default Config.MAX_CONCURRENCY) threads;
+        the adaptive controller decides how many of them may hit each host at
+        once. Items may carry their own 'test_type'. For redirect tests with
+        Config.VERIFY_REDIRECTS, the original URL's redirect is probed as a
+        separate task on the same pool and attached as 'redirect_check'.
+
+        Once stop() returns a true value (checked as tests complete and every
+        Config.STREAM_POLL_INTERVAL seconds) or the generator is closed, no
+        further tests start and queued ones are cancelled; tests already
+        running finish and are still yielded (unless closed). Results keep
+        test_url's 'content_sketch' for the caller to take out.
+        """
+        workers = max_workers or Config.MAX_CONCURRENCY
+        window = workers * 2
+        items = iter(urls)
+        futures = {}
+        pending = {}
+        index = 0
+        exhausted = stopped = False
+
+        executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            while True:
+                stopped = stopped or bool(stop and stop())
+                while not exhausted and not stopped and len(pending) < window:
+                    try:
+                        url_data = next(items)
+                    except StopIteration:
+                        exhausted = True
+                        break
+
+                    item_type = url_data.get('test_type', test_type)
+                    verify = item_type == 'redirect' and Config.VERIFY_REDIRECTS
+                    pending[index] = {'url_data': url_data, 'parts': {}, 'expected': 2 if verify else 1}
+                    futures[executor.submit(self._test_single, url_data, item_type)] = (index, 'result')
+                    if verify:
+                        future = executor.submit(self.verify_redirect, url_data['original_url'], url_data['expected_url'])
+                        futures[future] = (index, 'redirect_check')
+                    index += 1
+
+                if stopped:
+                    # Drop queued tests, finish the ones already running
+                    for future in list(futures):
+                        if future.cancel():
+                            pending.pop(futures.pop(future)[0], None)
+                if not futures:
+                    break
+
+                timeout = Config.STREAM_POLL_INTERVAL if stop and not stopped else None
+                done, _ = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i, part = futures.pop(future)
+                    value = future.result()
+                    entry = pending.get(i)
+                    if entry is None:
+                        continue  # the other part of this test was cancelled
+                    entry['parts'][part] = value
+                    if len(entry['parts']) < entry['expected']:
+                        continue
+
+                    del pending[i]
+                    result = entry['parts']['result']
+                    if 'redirect_check' in entry['parts']:
+                        result['redirect_check'] = entry['parts']['redirect_check']
+                    if result.get('page_head') is not None:
+                        result['page_head'] = result['page_head'].result()
+                    yield i, entry['url_data'], result
+        finally:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+    def _test_single(self, url_data: Dict, test_type: str) -> Dict:
+        """Run one redirect or remove test for a CSV URL entry."""
+        if test_type == 'remove':
+            original_url = url_data['original_url']
+            result = self.test_remove_url(original_url)
+            result['original_url'] = original_url
+            result['test_type'] = 'remove'
+        else:
+            result = self.test_redirect_url(url_data['expected_url'])
+            result['original_url'] = url_data['original_url']
+            result['test_type'] = 'redirect'
+
+        return result
+
+    def _is_not_found_page(self, url: str, inspection: Dict) -> bool:
+        """Check a 200 body against the host's not-found page, fingerprinting it on first use."""
+        parsed = urlparse(url)
+        host = parsed.netloc
+
+        if not self.inspector.has_not_found_fingerprint(host):
+            with self._not_found_lock:
+                if not self.inspector.has_not_found_fingerprint(host):
+                    # A random path is certain not to exist, whatever status the site returns for it
+                    probe_url = f"{parsed.scheme}://{host}/{uuid.uuid4().hex}"
+                    try:
+                        probe = self.inspector.inspect(self._make_request_with_retry(probe_url))
+                    except requests.exceptions.RequestException:
+                        probe = None
+                    self.inspector.set_not_found_fingerprint(host, probe)
+
+        return self.inspector.matches_not_found(host, inspection)
+
+    def flag_duplicate_content(self) -> List[Dict]:
+        """
+        Mark results whose 200 bodies are near-identical across many URLs as soft 404s.
+
+        Returns:
+            The newly flagged results
+        """
+        flagged = []
+        for cluster in self.inspector.get_duplicate_clusters():
+            url_count = len({r['full_url'] for r in cluster})
+            for result in cluster:
+                if result.get('soft_404'):
+                    continue
+                result['soft_404'] = True
+                result['success'] = False
+                if not result['error']:
+                    result['error'] = f"Soft 404: near-identical content returned for {url_count} URLs"
+                flagged.append(result)
+        return flagged
+
     def _prepare_url(self, url: str) -> str:
         """Prepare URL for testing."""
         if not url:
@@ -154,33 +470,88 @@ class URLTester:
         # Default case - assume it's a path, use base_url which already has the right environment
         return f'{self.base_url}/{url.lstrip("/")}'
 
-    def _make_request_with_retry(self, url: str) -> requests.Response:
-        """Make HTTP request with retry logic."""
-        last_exception = None
+    def _make_request_with_retry(self, url: str, method: str = 'GET',
+                                 allow_redirects: bool = True) -> requests.Response:
+        """
+        Make HTTP request with retry logic.
+
+        Timeouts, connection errors and Config.RETRY_STATUS_CODES responses are
+        retried with full-jitter exponential backoff (or the server's Retry-After).
+        Other request errors (too many redirects, broken chunked encoding, ...)
+        are not retried but count as failures for the circuit breaker. At least
+        one attempt is made even if Config.MAX_RETRIES is 0.
+        Requests to a host whose circuit is open fail immediately with
+        CircuitOpenError instead of waiting out their retries.
+
+        The body is streamed: callers must read (e.g. via the inspector) or
+        close the returned response; closing it also releases the host's
+        concurrency slot.
+        """
+        host = urlparse(url).netloc
+        queue_wait = 0.0
+        attempts = max(1, Config.MAX_RETRIES)
+
+        for attempt in range(attempts):
+            is_last_attempt = attempt == attempts - 1
+
+            if not self.circuit_breaker.allow_request(host):
+                raise CircuitOpenError(f"Circuit open for {host} (too many recent failures)")
+
+            if self.rate_limiter:
+                queue_wait += self.rate_limiter.acquire()
 
-        for attempt in range(Config.MAX_RETRIES):
             try:
-                response = self.session.get(
-                    url,
-                    timeout=Config.REQUEST_TIMEOUT,
-                    allow_redirects=True
-                )
-                return response
+                with self.concurrency.slot(host) as slot:
+                    queue_wait += slot.wait_time
+                    response = self.transport.request(
+                        method,
+                        url,
+                        timeout=Config.REQUEST_TIMEOUT,
+                        allow_redirects=allow_redirects,
+                        stream=True
+                    )
+                    slot.status_code = response.status_code
+                    # The body is read after this block: keep the host's slot until it is
+                    slot.hold_until_closed(response)
 
             except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
-                last_exception = e
-                if attempt < Config.MAX_RETRIES - 1:
-                    time.sleep(Config.RETRY_DELAY * (attempt + 1))  # Exponential backoff
-                    continue
-                else:
+                self.circuit_breaker.record(host, False)
+                if is_last_attempt:
                     raise e
-
-            except requests.exceptions.RequestException as e:
-                # Don't retry for other request exceptions
-                raise e
-
-        # Should not reach here, but just in case
-        raise last_exception
+                delay = self.retry_policy.get_delay(attempt)
+                emit('retry', url=url, attempt=attempt + 1, reason=type(e).__name__, delay=round(delay, 3))
+                time.sleep(delay)
+                continue
+            except requests.exceptions.RequestException:
+                # Not retried, but still an outcome: a half-open probe must be released
+                self.circuit_breaker.record(host, False)
+                raise
+
+            retryable = self.retry_policy.is_retryable_status(response.status_code)
+            self.circuit_breaker.record(host, not retryable)
+
+            if retryable and not is_last_attempt:
+                delay = self.retry_policy.get_delay(attempt, response)
+                emit('retry', url=url, attempt=attempt + 1, reason=f"HTTP {response.status_code}",
+                     delay=round(delay, 3))
+                response.close()
+                time.sleep(delay)
+                continue
+
+            # Time spent waiting for a concurrency slot is not response time
+            response.queue_wait = queue_wait
+            return response
+
+    def warm_up(self) -> Optional[Dict]:
+        """
+        Resolve the environment hosts and pre-open Config.PREWARM_CONNECTIONS
+        connections to the tested host, so early timings exclude connection setup.
+
+        Returns None with the HTTP/2 transport, which manages its own connections.
+        """
+        if self.transport is not self.session:
+            return None
+        return self.connections.warm_up(self.base_url, Config.PREWARM_CONNECTIONS)
 
     def get_session_stats(self) -> Dict:
         """Get statistics about the current testing session."""
@@ -188,5 +559,10 @@ class URLTester:
             'environment': self.environment,
             'base_url': self.base_url,
             'timeout': Config.REQUEST_TIMEOUT,
-            'max_retries': Config.MAX_RETRIES
+            'max_retries': Config.MAX_RETRIES,
+            'concurrency': self.concurrency.get_stats(),
+            'circuit_breakers': self.circuit_breaker.get_stats(),
+            'http2': self.transport is not self.session,
+            'http_versions': self.transport.get_stats() if self.transport is not self.session else {},
+            'connections': self.connections.get_stats() if self.transport is self.session else None
         }
\ No newline at end of file
@@ -0,0 +1,81 @@
+"""
+Scheduling for the long-running ``watch`` mode.
+
+Watch mode keeps the parsed CSV, the sitemap and the URL tester's connection
+pools in memory and re-runs only the checks that can have changed. Each check
+is re-run when:
+- it has never run
+- its sitemap signature changed, i.e. the membership or lastmod of a sitemap
+  URL the check looks up differs from when it last ran
+- its last result is older than Config.WATCH_MAX_RESULT_AGE
+"""
+import time
+from typing import Dict, Hashable, List, Optional, Sequence
+
+
+class CheckScheduler:
+    """Tracks when each URL check last ran and decides which are due."""
+
+    def __init__(self, count: int, max_age: float):
+        """
+        Initialize scheduler state for count checks.
+
+        Args:
+            count: Number of checks (indices into the caller's test data)
+            max_age: Seconds after which a result is re-checked regardless of the sitemap
+        """
+        self.max_age = max_age
+        self.checked_at: List[Optional[float]] = [None] * count
+        self.signatures: List[Optional[Hashable]] = [None] * count
+        self.success: List[Optional[bool]] = [None] * count
+
+    def select(self, signatures: Sequence[Hashable], now: float = None) -> Dict[str, List[int]]:
+        """
+        Get the checks due now, grouped by reason.
+
+        Args:
+            signatures: Current sitemap signature of every check
+
+        Returns:
+            Dictionary with 'new', 'sitemap_changed' and 'stale' index lists
+        """
+        now = now or time.time()
+        due = {'new': [], 'sitemap_changed': [], 'stale': []}
+        for i, signature in enumerate(signatures):
+            if self.checked_at[i] is None:
+                due['new'].append(i)
+            elif signature != self.signatures[i]:
+                due['sitemap_changed'].append(i)
+            elif now - self.checked_at[i] >= self.max_age:
+                due['stale'].append(i)
+        return due
+
+    def record(self, index: int, success: bool, signature: Hashable, now: float = None) -> Optional[str]:
+        """
+        Store the outcome of a check.
+
+        Returns:
+            'failed' or 'recovered' if the outcome flipped since the last run, else None
+        """
+        previous = self.success[index]
+        self.checked_at[index] = now or time.time()
+        self.signatures[index] = signature
+        self.success[index] = success
+
+        if previous is True and not success:
+            return 'failed'
+        if previous is False and success:
+            return 'recovered'
+        return None
+
+    def seconds_until_stale(self, now: float = None) -> Optional[float]:
+        """Seconds until the oldest result goes stale (None before the first run)."""
+        checked = [t for t in self.checked_at if t is not None]
+        if not checked:
+            return None
+        now = now or time.time()
+        return max(0.0, min(checked) + self.max_age - now)
+
+    def failing(self) -> int:
+        """Number of checks whose last result failed."""
+        return sum(1 for success in self.success if success is False)
@@ -8,6 +8,7 @@ and ensure proper URL management for SEO purposes.
 
 import sys
 import os
+import glob
 import time
 import argparse
 from datetime import datetime
@@ -15,11 +16,25 @@ from datetime import datetime
 # Add src directory to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
+# Modules that pull in pandas, requests, tqdm or ElementTree are imported
+# inside the commands that use them, so --help and argument errors start fast
+import events
+from checks import apply_content_baseline, apply_head_checks, apply_redirect_sitemap_checks, apply_remove_sitemap_checks
 from config import Config
-from csv_parser import CSVParser
-from url_tester import URLTester
-from sitemap_handler import SitemapHandler
-from reporter import Reporter
+from scheduler import RunBudget, parse_duration
+from sharding import ShardResults, parse_shard_spec, select_shard
+from watcher import CheckScheduler
+
+
+def parse_sample_rate(value):
+    """Parse a --sample-rate fraction in (0, 1] for argparse."""
+    try:
+        rate = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid sample rate '{value}', expected a fraction such as 0.05")
+    if not 0 < rate <= 1:
+        raise argparse.ArgumentTypeError(f"invalid sample rate '{value}', must be in (0, 1]")
+    return rate
 
 
 def parse_arguments():
@@ -33,6 +48,11 @@ Examples:
   python test_sitemap_qa.py --file Blog.csv    # Test Blog.csv
   python test_sitemap_qa.py --file Horoscope.csv  # Test Horoscope.csv
   python test_sitemap_qa.py --all              # Test all CSV files
+  python test_sitemap_qa.py diff --env qa --against prod  # Compare QA and prod sitemaps
+  python test_sitemap_qa.py watch --all --interval 300    # Keep re-validating changed/stale URLs
+  python test_sitemap_qa.py --shard 2/4 --sitemap-snapshot SNAPSHOT.tsv  # Test one slice of the file
+  python test_sitemap_qa.py merge --file Psychics.csv     # Combine shard results into one report
+  python test_sitemap_qa.py crawl --file Psychics.csv     # Find pages still linking to redirected/removed URLs
         """
     )
 
@@ -49,9 +69,195 @@ Examples:
                        default='qa',
                        help='Environment to test (default: qa)')
 
+    parser.add_argument('--workers', '-w',
+                       type=int,
+                       default=Config.MAX_CONCURRENCY,
+                       help=f'Maximum concurrent requests per host (default: {Config.MAX_CONCURRENCY})')
+    parser.add_argument('--fixed-concurrency',
+                       action='store_true',
+                       help='Disable adaptive concurrency and always use --workers requests per host')
+    parser.add_argument('--rate-limit',
+                       type=float,
+                       metavar='N',
+                       help='Send at most N requests per second over all hosts (default: unlimited)')
+    parser.add_argument('--http2',
+                       action='store_true',
+                       help='Use multiplexed HTTP/2 connections (requires httpx[http2]; falls back to HTTP/1.1)')
+    parser.add_argument('--shard',
+                       type=parse_shard_spec,
+                       metavar='I/N',
+                       help='Test only slice I of N (rows partitioned by a hash of the original URL)')
+    parser.add_argument('--sitemap-snapshot',
+                       metavar='PATH',
+                       help='Judge sitemap compliance against a stored snapshot instead of the live sitemap')
+    parser.add_argument('--resume',
+                       action='store_true',
+                       help='Continue an interrupted run from its checkpoint journal, testing only the remaining URLs')
+    sample_group = parser.add_mutually_exclusive_group()
+    sample_group.add_argument('--sample',
+                       type=int,
+                       metavar='N',
+                       help='Test a stratified random sample of N URLs and estimate pass rates for the whole file')
+    sample_group.add_argument('--sample-rate',
+                       type=parse_sample_rate,
+                       metavar='P',
+                       help='Test a stratified random sample of fraction P (0-1] of the URLs')
+    parser.add_argument('--seed',
+                       type=int,
+                       help='Random seed for --sample/--sample-rate, to repeat a sample')
+    parser.add_argument('--fail-fast',
+                       type=int,
+                       metavar='N',
+                       help='Stop testing after N failed URLs and report the rest as untested')
+    parser.add_argument('--deadline',
+                       type=parse_duration,
+                       metavar='DURATION',
+                       help='Time budget such as 10m: test the highest-priority URLs that fit and report the rest as untested')
+    parser.add_argument('--profile',
+                       action='store_true',
+                       help='Print wall time, CPU time, peak memory and item counts for each stage of the run')
+    parser.add_argument('--profile-output',
+                       metavar='PATH',
+                       help='Write a cProfile of the whole run (all threads) to PATH for pstats or snakeviz')
+    parser.add_argument('--events',
+                       metavar='PATH',
+                       help='Also write progress as JSON Lines events to PATH (- for stdout; text output moves to stderr)')
+
+    subparsers = parser.add_subparsers(dest='command', metavar='COMMAND')
+
+    diff_parser = subparsers.add_parser('diff', help='Compare sitemap snapshots between runs or environments')
+    diff_parser.add_argument('--file', '-f',
+                             default='Psychics.csv',
+                             help='CSV file whose sitemap to compare (default: Psychics.csv)')
+    diff_parser.add_argument('--env', '-e',
+                             choices=['qa', 'rel', 'prod'],
+                             default='qa',
+                             help='Environment whose current sitemap is compared (default: qa)')
+    against_group = diff_parser.add_mutually_exclusive_group()
+    against_group.add_argument('--against',
+                               choices=['qa', 'rel', 'prod'],
+                               help='Compare against the live sitemap of another environment')
+    against_group.add_argument('--baseline',
+                               help='Compare against a stored snapshot file (default: latest snapshot for --file/--env)')
+
+    snapshot_parser = subparsers.add_parser('snapshot', help='Store the current sitemap as a snapshot (e.g. to share between shards)')
+    snapshot_parser.add_argument('--file', '-f',
+                                 default='Psychics.csv',
+                                 help='CSV file whose sitemap to store (default: Psychics.csv)')
+    snapshot_parser.add_argument('--env', '-e',
+                                 choices=['qa', 'rel', 'prod'],
+                                 default='qa',
+                                 help='Environment whose sitemap is stored (default: qa)')
+
+    merge_parser = subparsers.add_parser('merge', help='Combine the results of all shards into one CSV, summary and HTML report')
+    merge_parser.add_argument('--file', '-f',
+                              default='Psychics.csv',
+                              help='CSV file whose shard results to merge (default: Psychics.csv)')
+    merge_parser.add_argument('--env', '-e',
+                              choices=['qa', 'rel', 'prod'],
+                              default='qa',
+                              help='Environment of the shard runs (default: qa)')
+    merge_parser.add_argument('inputs',
+                              nargs='*',
+                              metavar='SHARD_RESULTS',
+                              help='Shard result files (default: all stored for --file/--env)')
+
+    watch_parser = subparsers.add_parser('watch', help='Stay resident and re-check URLs affected by sitemap changes or gone stale')
+    watch_group = watch_parser.add_mutually_exclusive_group()
+    watch_group.add_argument('--file', '-f',
+                             default='Psychics.csv',
+                             help='CSV file to watch (default: Psychics.csv)')
+    watch_group.add_argument('--all', '-a',
+                             action='store_true',
+                             help='Watch all CSV files in the input directory')
+    watch_parser.add_argument('--env', '-e',
+                              choices=['qa', 'rel', 'prod'],
+                              default='qa',
+                              help='Environment to watch (default: qa)')
+    watch_parser.add_argument('--interval',
+                              type=float,
+                              default=Config.WATCH_INTERVAL,
+                              help=f'Seconds between sitemap revalidations (default: {Config.WATCH_INTERVAL})')
+    watch_parser.add_argument('--max-age',
+                              type=float,
+                              default=Config.WATCH_MAX_RESULT_AGE,
+                              help=f'Re-check URLs whose last result is older than this many seconds (default: {Config.WATCH_MAX_RESULT_AGE})')
+    watch_parser.add_argument('--cycles',
+                              type=int,
+                              default=0,
+                              help='Stop after this many cycles (default: run until interrupted)')
+
+    history_parser = subparsers.add_parser('history', help='Query the run history: URL timelines, flaky URLs and latency trends')
+    history_group = history_parser.add_mutually_exclusive_group(required=True)
+    history_group.add_argument('--url',
+                               help='Show the recorded outcomes of one original URL')
+    history_group.add_argument('--flaky',
+                               action='store_true',
+                               help='List URLs whose outcome keeps changing between runs')
+    history_group.add_argument('--trend',
+                               action='store_true',
+                               help='Show daily pass rates and p50/p95 response times')
+    history_group.add_argument('--import',
+                               dest='import_results',
+                               action='store_true',
+                               help='Record the results CSVs in the output directory that are not stored yet')
+    history_parser.add_argument('--file', '-f',
+                                help='Only runs of this CSV file (default: all files)')
+    history_parser.add_argument('--env', '-e',
+                                choices=['qa', 'rel', 'prod'],
+                                help='Only runs in this environment (default: all for --url, qa otherwise)')
+    history_parser.add_argument('--runs',
+                                type=int,
+                                help=f'Latest runs considered (default: {Config.HISTORY_TIMELINE_RUNS} for --url, '
+                                     f'{Config.HISTORY_FLAKY_RUNS} for --flaky)')
+    history_parser.add_argument('--days',
+                                type=int,
+                                default=Config.HISTORY_TREND_DAYS,
+                                help=f'Days shown by --trend (default: {Config.HISTORY_TREND_DAYS})')
+
+    crawl_parser = subparsers.add_parser('crawl', help='Crawl the environment for internal links to redirected or removed URLs')
+    crawl_parser.add_argument('--file', '-f',
+                              default='Psychics.csv',
+                              help='CSV file whose redirected and removed URLs to look for (default: Psychics.csv)')
+    crawl_parser.add_argument('--env', '-e',
+                              choices=['qa', 'rel', 'prod'],
+                              default='qa',
+                              help='Environment to crawl (default: qa)')
+    crawl_parser.add_argument('--max-pages',
+                              type=int,
+                              default=Config.CRAWL_MAX_PAGES,
+                              help=f'Pages fetched at most (default: {Config.CRAWL_MAX_PAGES})')
+    crawl_parser.add_argument('--max-depth',
+                              type=int,
+                              help='Links followed from the sitemap URLs at most (default: unlimited)')
+    crawl_parser.add_argument('--rate',
+                              type=float,
+                              default=Config.CRAWL_HOST_RATE,
+                              help=f'Requests per second per host (default: {Config.CRAWL_HOST_RATE})')
+
     return parser.parse_args()
 
 
+def apply_runtime_options(args):
+    """Apply command line tuning options to the shared configuration."""
+    Config.MAX_CONCURRENCY = max(1, args.workers)
+    Config.INITIAL_CONCURRENCY = min(Config.INITIAL_CONCURRENCY, Config.MAX_CONCURRENCY)
+    Config.ADAPTIVE_CONCURRENCY = not args.fixed_concurrency
+    Config.RATE_LIMIT = args.rate_limit
+    Config.USE_HTTP2 = args.http2
+    Config.SHARD = args.shard
+    Config.SITEMAP_SNAPSHOT = args.sitemap_snapshot
+    Config.RESUME = args.resume
+    Config.FAIL_FAST = args.fail_fast
+    Config.SAMPLE_SIZE = args.sample
+    Config.SAMPLE_RATE = args.sample_rate
+    Config.SAMPLE_SEED = args.seed
+    Config.DEADLINE = args.deadline
+    Config.PROFILE = args.profile
+    Config.PROFILE_OUTPUT = args.profile_output
+    Config.EVENTS = args.events
+
+
 def get_available_csv_files():
     """Get list of available CSV files in the input directory."""
     input_dir = Config.INPUT_DIR
@@ -62,9 +268,739 @@ def get_available_csv_files():
     return sorted(csv_files)
 
 
-def run_test_for_file(csv_file, env='qa'):
-    """Run sitemap QA testing for a specific CSV file."""
+def report_content_checks(tester, redirect_results, remove_results):
+    """Flag near-identical 200 bodies across many URLs and print content and head check counts."""
+    for result in tester.flag_duplicate_content():
+        if result.get('test_type') == 'redirect':
+            result['url_accessible'] = False
+        events.emit_result(result, 'url_result_update')
+
+    soft_404s = sum(1 for r in redirect_results + remove_results if r.get('soft_404'))
+    changed = sum(1 for r in redirect_results + remove_results if r.get('hash_match') is False)
+    head_issues = sum(1 for r in redirect_results if r.get('head_issues'))
+    if soft_404s:
+        print(f"⚠️  Soft 404s (200 responses with not-found or duplicated content): {soft_404s}")
+    if changed:
+        print(f"ℹ️  Pages whose content hash differs from the crawl export: {changed}")
+    if head_issues:
+        print(f"⚠️  Redirect targets with noindex or a foreign canonical: {head_issues}")
+
+
+def run_performance_check(tester, parser, redirect_results, remove_results, reporter, csv_file):
+    """Compare live response times with the export's Response Time and report slowdowns."""
+    from performance import ResponseTimeAnalyzer
+
+    analyzer = ResponseTimeAnalyzer()
+
+    def baseline(url):
+        metadata = parser.get_page_metadata(url)
+        return metadata.get('response_time') if metadata else None
+
+    for result in redirect_results:
+        check = result.get('redirect_check')
+        if check:
+            original_url = result['original_url']
+            analyzer.add(original_url, 'original', check['response_time'], baseline(original_url),
+                         lambda url=original_url: tester.measure_response_time(url, probe_redirect=True))
+        if result['status_code'] == 200:
+            analyzer.add(result['url'], 'target', result['response_time'], baseline(result['url']),
+                         lambda url=result['url']: tester.measure_response_time(url))
+
+    for result in remove_results:
+        if result['status_code'] is not None and not result.get('error'):
+            analyzer.add(result['original_url'], 'remove', result['response_time'], baseline(result['original_url']),
+                         lambda url=result['original_url']: tester.measure_response_time(url))
+
+    if not analyzer.samples:
+        return None
+
+    reporter.print_section_header("⏱️  RESPONSE TIME REGRESSIONS")
+    performance = analyzer.analyze()
+    performance['csv_path'] = reporter.save_performance_csv(performance, csv_file)
+    reporter.print_performance_summary(performance)
+    return performance
+
+
+def warm_up_connections(tester):
+    """Resolve the environment hosts and pre-open connections before the first test."""
+    warm_up = tester.warm_up()
+    if warm_up is None:
+        return
+
+    unresolved = [host for host, addresses in warm_up['resolved'].items() if addresses is None]
+    print(f"🔌 Resolved {len(warm_up['resolved']) - len(unresolved)} host(s) and opened "
+          f"{warm_up['connections']} connection(s) to {warm_up['host']} in {warm_up['duration']:.2f}s")
+    if unresolved:
+        print(f"   • Not resolvable (resolved again on first use): {', '.join(unresolved)}")
+
+
+def print_host_stats(tester):
+    """Print per-host concurrency limits and circuit breaker activity."""
+    session_stats = tester.get_session_stats()
+    concurrency_stats = session_stats['concurrency']
+    if not concurrency_stats:
+        return
+
+    print("\n⚙️  Adaptive concurrency per host:")
+    for host, host_stats in concurrency_stats.items():
+        p95 = host_stats['p95_latency']
+        p95_display = f"{p95}s" if p95 is not None else "n/a"
+        print(f"   • {host}: limit {host_stats['limit']} (peak {host_stats['peak_limit']}), "
+              f"p95 {p95_display}, {host_stats['congestion_events']} backoff(s), "
+              f"{host_stats['requests']} requests")
+
+    connection_stats = session_stats['connections']
+    if connection_stats and connection_stats['requests']:
+        print(f"   • Connections: {connection_stats['requests']} requests over {connection_stats['connections']} "
+              f"connection(s) ({connection_stats['prewarmed']} pre-warmed), "
+              f"{connection_stats['reuse_rate']:.0%} reused a pooled connection")
+        dns_stats = connection_stats['dns']
+        if dns_stats and dns_stats['lookups']:
+            print(f"   • DNS cache: {dns_stats['hits']}/{dns_stats['lookups']} lookups served from cache, "
+                  f"{dns_stats['resolutions']} resolution(s), {dns_stats['failures']} failure(s)")
+
+    if session_stats['http_versions']:
+        versions = ', '.join(f"{version}: {count}" for version, count in session_stats['http_versions'].items())
+        print(f"   • HTTP/2 transport responses by protocol: {versions}")
+
+    for host, circuit_stats in session_stats['circuit_breakers'].items():
+        if circuit_stats['trips']:
+            print(f"   ⚠️  Circuit for {host} opened {circuit_stats['trips']} time(s), "
+                  f"{circuit_stats['fast_failed']} request(s) fast-failed (now {circuit_stats['state']})")
+
+
+def record_sitemap_snapshot(sitemap_handler, csv_file, env, reporter):
+    """
+    Store a snapshot of the fetched sitemap and diff it against the previous one.
+
+    Returns:
+        (snapshot path, diff summary) tuple; the path is None if the sitemap
+        was not fetched, the summary is None if no earlier snapshot exists
+        for this file and environment.
+    """
+    from sitemap_diff import SitemapDiff, SitemapSnapshot
+
+    if not sitemap_handler.fetch_success:
+        return None, None
+
+    snapshot = SitemapSnapshot.save(sitemap_handler, csv_file, env)
+    print(f"💾 Sitemap snapshot saved to: {snapshot.path}")
+
+    previous = SitemapSnapshot.find_latest(csv_file, env, exclude=snapshot.path)
+    if previous is None:
+        print("ℹ️  No previous sitemap snapshot to compare against")
+        return snapshot.path, None
+
+    diff_csv = Config.get_sitemap_diff_csv_path(csv_file, env)
+    summary = SitemapDiff(previous, snapshot).compute(diff_csv)
+    reporter.print_sitemap_diff_summary(summary)
+    return snapshot.path, summary
+
+
+def load_sitemap_snapshot(sitemap_handler, csv_file, path):
+    """Point the handler at a stored sitemap snapshot; returns False if it cannot be used for csv_file."""
+    from sitemap_diff import SitemapSnapshot
+
+    if not os.path.exists(path):
+        print(f"❌ Snapshot not found: {path}")
+        return False
+    snapshot = SitemapSnapshot(path)
+    if snapshot.metadata.get('csv_file', csv_file) != csv_file:
+        print(f"❌ Snapshot {path} was taken for {snapshot.metadata['csv_file']}, not {csv_file}")
+        return False
+    snapshot.load_into(sitemap_handler)
+    return True
+
+
+def open_checkpoint(csv_file, env, sampler=None):
+    """
+    Set up the checkpoint journal of a run and, with --resume, read back the interrupted run in it.
+
+    Returns:
+        (journal, run description, checkpoint state) tuple; the journal is
+        None if checkpoints are disabled, the state is None unless a matching
+        journal is resumed.
+    """
+    from checkpoint import CheckpointJournal
+
+    if not Config.USE_CHECKPOINTS:
+        return None, None, None
+
+    journal = CheckpointJournal(Config.get_checkpoint_path(csv_file, env))
+    run = CheckpointJournal.describe_run(csv_file, env, Config.SHARD)
+    if sampler:
+        # A resumed sampled run must draw the same sample
+        run['sample'] = [Config.SAMPLE_SIZE, Config.SAMPLE_RATE, sampler.seed]
+    if not Config.RESUME:
+        if os.path.exists(journal.path):
+            print(f"ℹ️  Replacing the checkpoint of an earlier interrupted run (use --resume to continue it instead)")
+        return journal, run, None
+
+    checkpoint = journal.load(run)
+    if checkpoint is None:
+        header = journal.read_header()
+        if header and header.get('sample') != run.get('sample') and \
+                all(header.get(key) == value for key, value in run.items() if key != 'sample'):
+            print(f"ℹ️  The checkpoint is of a run with another sample (size, rate, seed: {header.get('sample')}); "
+                  f"starting from the beginning")
+        else:
+            print("ℹ️  No checkpoint of an interrupted run with this file, input and environment; "
+                  "starting from the beginning")
+        return journal, run, None
+
+    snapshot_path = checkpoint['header']['sitemap_snapshot']
+    if snapshot_path and not os.path.exists(snapshot_path):
+        print(f"⚠️  Sitemap snapshot {snapshot_path} of the checkpoint is gone; starting from the beginning")
+        return journal, run, None
+
+    restored = len(checkpoint['redirect']) + len(checkpoint['remove'])
+    print(f"♻️  Resuming run started {checkpoint['header']['created']}: {restored} completed tests restored")
+    return journal, run, checkpoint
+
+
+def split_checkpointed(url_data, test_type, checkpoint, tester):
+    """
+    Separate rows whose results were restored from a checkpoint from the rows still to test.
+
+    Restored 200 bodies are recorded with the tester again so duplicate content
+    detection sees them as in an uninterrupted run; restored results are
+    emitted as url_result events with restored=true.
+
+    Returns:
+        (restored results keyed by row position, rows still to test) tuple
+    """
+    if not checkpoint:
+        return {}, url_data
+
+    restored, pending = {}, []
+    for position, item in enumerate(url_data):
+        position = item.get('position', position)
+        result = checkpoint[test_type].get(position)
+        if result is None:
+            pending.append(dict(item, position=position))
+            continue
+
+        restored[position] = result
+        events.emit_result(result, restored=True)
+        sketch = checkpoint['sketches'].get((test_type, position))
+        if sketch is not None:
+            tester.inspector.record(result, {'hash': result['content_hash'], 'sketch': sketch})
+
+    if restored:
+        print(f"♻️  {len(restored)} of {len(url_data)} {test_type} tests restored from checkpoint, "
+              f"{len(pending)} left to test\n")
+    return restored, pending
+
+
+def create_scheduler(history, parser):
+    """Build the priority scheduler from earlier results of this file (None if disabled)."""
+    from scheduler import PriorityScheduler
+
+    if not Config.PRIORITY_SCHEDULING:
+        return None
+
+    def baseline_latency(url):
+        metadata = parser.get_page_metadata(url)
+        return metadata.get('response_time') if metadata else None
+
+    if history.outcomes:
+        print(f"📈 Prioritizing tests by {len(history.outcomes)} earlier outcomes, age and latency")
+    return PriorityScheduler(history, baseline_latency)
+
+
+def resumed_sample_seed(csv_file, env):
+    """
+    Seed of the interrupted sampled run that --resume without --seed continues.
+
+    Returns:
+        The seed in the checkpoint journal of a sampled run with this file,
+        input, environment and shard; None if there is none.
+    """
+    from checkpoint import CheckpointJournal
+
+    header = CheckpointJournal(Config.get_checkpoint_path(csv_file, env)).read_header()
+    if not header or not header.get('sample'):
+        return None
+    run = CheckpointJournal.describe_run(csv_file, env, Config.SHARD)
+    if any(header.get(key) != value for key, value in run.items()):
+        return None
+    return header['sample'][2]
+
+
+def draw_sample(redirect_data, remove_data, history, csv_file):
+    """
+    Replace the test data by a stratified random sample (--sample/--sample-rate).
+
+    With --resume and no --seed, the sample of the interrupted run is drawn
+    again from the seed stored in its checkpoint.
+
+    Returns:
+        (sampler, redirect rows, remove rows) tuple
+    """
+    from sampling import StratifiedSampler
+
+    seed = Config.SAMPLE_SEED
+    if seed is None and Config.RESUME and Config.USE_CHECKPOINTS:
+        seed = resumed_sample_seed(csv_file, Config.CURRENT_ENV)
+        if seed is not None:
+            print(f"♻️  Drawing the sample of the interrupted run again (--seed {seed} from its checkpoint)")
+    sampler = StratifiedSampler(history, seed)
+    population = len(redirect_data) + len(remove_data)
+    redirect_data, remove_data = sampler.sample(redirect_data, remove_data, Config.SAMPLE_SIZE, Config.SAMPLE_RATE)
+    print(f"🎲 Sampling {len(redirect_data) + len(remove_data)} of {population} URLs across {len(sampler.strata)} strata "
+          f"({len(redirect_data)} redirect, {len(remove_data)} remove; --seed {sampler.seed} repeats this sample)")
+    return sampler, redirect_data, remove_data
+
+
+def merge_results(url_data, test_type, restored, pending, results):
+    """
+    Put restored and newly tested results back into row order and renumber them.
+
+    Returns:
+        (results in row order, rows left untested) tuple; untested rows are
+        tagged with their 'test_type' and kept in the order they were scheduled
+    """
+    untested = [dict(item, position=item.get('position', i), test_type=test_type)
+                for i, (item, result) in enumerate(zip(pending, results)) if result is None]
+    if pending is url_data and not untested:
+        return results, []
+
+    by_position = dict(restored)
+    for i, (item, result) in enumerate(zip(pending, results)):
+        if result is not None:
+            by_position[item.get('position', i)] = result
+
+    merged = []
+    for i, item in enumerate(url_data):
+        position = item.get('position', i)
+        if position in by_position:
+            result = by_position[position]
+            result['position'] = position
+            merged.append(result)
+    for number, result in enumerate(merged, 1):
+        result['test_number'] = number
+        result['total_tests'] = len(merged)
+    return merged, untested
+
+
+def save_shard_results(csv_file, env, redirect_data, remove_data, redirect_results, remove_results, metadata):
+    """Write this shard's result dicts (tagged with their row positions) for the merge command."""
+    for results, url_data in ((redirect_results, redirect_data), (remove_results, remove_data)):
+        # Results that were reordered, restored or left untested already carry their position
+        for result, item in zip(results, url_data):
+            result.setdefault('position', item['position'])
+
+    shard_results = ShardResults.save(csv_file, env, Config.SHARD, metadata, redirect_results, remove_results)
+    print(f"🧩 Shard results saved to: {shard_results.path}")
+    return shard_results
+
+
+def run_sitemap_snapshot(args):
+    """Fetch the current sitemap and store it as a snapshot."""
+    from sitemap_handler import SitemapHandler
+    from sitemap_diff import SitemapSnapshot
+
+    sitemap_handler = SitemapHandler(args.env, sitemap_url=Config.get_sitemap_url(args.env, args.file))
+    sitemap_handler.get_sitemap_urls()
+    if not sitemap_handler.fetch_success:
+        print(f"❌ Could not fetch {args.env.upper()} sitemap")
+        return 1
+
+    snapshot = SitemapSnapshot.save(sitemap_handler, args.file, args.env)
+    print(f"💾 Sitemap snapshot saved to: {snapshot.path}")
+    print(f"   Share it between shards with: --sitemap-snapshot {snapshot.path}")
+    return 0
+
+
+def run_merge(args):
+    """Combine the result dumps of all shards into one results CSV, summary and HTML report."""
+    from reporter import Reporter
+    from sitemap_handler import SitemapHandler
+
+    csv_file = args.file
+    paths = args.inputs or ShardResults.find(csv_file, args.env)
+    if not paths:
+        print(f"❌ No shard results found for {csv_file} ({args.env})")
+        return 1
+
+    shards = [ShardResults.load(path) for path in paths]
+    counts = {shard.metadata.get('shard_count') for shard in shards}
+    if len(counts) != 1:
+        print(f"❌ Shard results come from runs with different shard counts: {sorted(counts, key=str)}")
+        return 1
+    count = counts.pop()
+    indices = [shard.metadata.get('shard') for shard in shards]
+    if count is None or None in indices:
+        print("❌ Shard results without shard metadata (written by a run without --shard?)")
+        return 1
+    indices.sort()
+    if len(set(indices)) != len(indices):
+        print(f"❌ Duplicate shard results: {indices}")
+        return 1
+    missing = sorted(set(range(1, count + 1)) - set(indices))
+    if missing:
+        print(f"⚠️  Missing shards {', '.join(f'{i}/{count}' for i in missing)}; the merged report is partial")
+
+    snapshots = {shard.metadata.get('sitemap_snapshot') for shard in shards}
+    if len(snapshots) > 1:
+        print("⚠️  Shards judged sitemap compliance against different sitemaps; "
+              "use --sitemap-snapshot to share one snapshot between shards")
+
+    Config.SHARD = None
+    Config.set_csv_file(csv_file)
+    Config.CURRENT_ENV = args.env
+    reporter = Reporter(environment=args.env)
+    reporter.print_section_header(f"🧩 MERGING {len(shards)} SHARD(S): {csv_file} ({args.env.upper()})")
+
+    redirect_results = sorted((r for shard in shards for r in shard.redirect_results), key=lambda r: r['position'])
+    remove_results = sorted((r for shard in shards for r in shard.remove_results), key=lambda r: r['position'])
+    for results in (redirect_results, remove_results):
+        for number, result in enumerate(results, 1):
+            result['test_number'] = number
+            result['total_tests'] = len(results)
+    print(f"✅ Merged {len(redirect_results)} redirect and {len(remove_results)} remove results")
+
+    sitemap_analysis = None
+    snapshot_path = sorted(p for p in snapshots if p)[0] if any(snapshots) else None
+    if snapshot_path and os.path.exists(snapshot_path):
+        sitemap_handler = SitemapHandler(args.env, sitemap_url=Config.get_sitemap_url(args.env, csv_file))
+        if load_sitemap_snapshot(sitemap_handler, csv_file, snapshot_path):
+            redirect_data = [{'original_url': r['original_url'], 'expected_url': r['url']} for r in redirect_results]
+            remove_data = [{'original_url': r['original_url']} for r in remove_results]
+            sitemap_analysis = sitemap_handler.get_sitemap_analysis(redirect_data, remove_data)
+    else:
+        print("ℹ️  No shared sitemap snapshot available; the merged report has no sitemap analysis")
+
+    reporter.print_section_header("📄 GENERATING REPORTS")
+    csv_path = reporter.save_csv_results(redirect_results, remove_results, csv_file)
+    reporter.save_html_report(redirect_results, remove_results, sitemap_analysis, csv_file)
+    reporter.print_summary(redirect_results, remove_results, sitemap_analysis, csv_file)
+
+    created = [datetime.strptime(shard.metadata['created'], '%Y-%m-%d %H:%M:%S') for shard in shards
+               if shard.metadata.get('created')]
+    started_at = min(created).timestamp() if created else time.time()
+    record_run_history(csv_file, args.env, redirect_results, remove_results, started_at, results_csv=csv_path)
+
+    failed_tests = sum(1 for r in redirect_results + remove_results if not r['success'])
+    return 1 if failed_tests or missing else 0
+
+
+def run_sitemap_diff(args):
+    """Compare the current sitemap with another environment or a stored snapshot."""
+    from reporter import Reporter
+    from sitemap_handler import SitemapHandler
+    from sitemap_diff import SitemapDiff, SitemapSnapshot
+
+    csv_file = args.file
+    reporter = Reporter(environment=args.env)
+    reporter.print_section_header(f"🔀 SITEMAP DIFF: {csv_file} ({args.env.upper()})")
+
+    current_handler = SitemapHandler(args.env, sitemap_url=Config.get_sitemap_url(args.env, csv_file))
+    current_handler.get_sitemap_urls()
+    if not current_handler.fetch_success:
+        print(f"❌ Could not fetch {args.env.upper()} sitemap")
+        return 1
+    current = SitemapSnapshot.save(current_handler, csv_file, args.env)
+
+    if args.against:
+        baseline_handler = SitemapHandler(args.against, sitemap_url=Config.get_sitemap_url(args.against, csv_file))
+        baseline_handler.get_sitemap_urls()
+        if not baseline_handler.fetch_success:
+            print(f"❌ Could not fetch {args.against.upper()} sitemap")
+            return 1
+        baseline = SitemapSnapshot.save(baseline_handler, csv_file, args.against)
+        against_label = args.against
+    elif args.baseline:
+        if not os.path.exists(args.baseline):
+            print(f"❌ Snapshot not found: {args.baseline}")
+            return 1
+        baseline = SitemapSnapshot(args.baseline)
+        against_label = 'snapshot'
+    else:
+        baseline = SitemapSnapshot.find_latest(csv_file, args.env, exclude=current.path)
+        if baseline is None:
+            print(f"ℹ️  No earlier snapshot for {csv_file} ({args.env}); saved {current.path} as the first one")
+            return 0
+        against_label = 'previous'
+
+    summary = SitemapDiff(baseline, current).compute(Config.get_sitemap_diff_csv_path(csv_file, args.env, against_label))
+    reporter.print_sitemap_diff_summary(summary)
+    return 0
+
+
+def record_run_history(csv_file, env, redirect_results, remove_results, started_at, duration=None,
+                       untested=0, sampled=False, results_csv=None):
+    """Store a completed run in the run history database (never fails the run)."""
+    if not Config.RECORD_HISTORY:
+        return
+    from run_store import RunStore
+
+    try:
+        store = RunStore()
+        try:
+            store.record_run(csv_file, env, redirect_results, remove_results, started_at, duration, untested, sampled,
+                             results_csv)
+        finally:
+            store.close()
+    except Exception as e:
+        print(f"⚠️  Could not record run history in {Config.HISTORY_DB}: {e}")
+
+
+def run_history(args):
+    """Query or fill the run history database."""
+    from reporter import Reporter
+    from run_store import RunStore
+
+    reporter = Reporter(environment=args.env)
+    store = RunStore()
+    try:
+        if args.import_results:
+            reporter.print_section_header("🗄️  IMPORTING RESULTS INTO RUN HISTORY")
+            paths = sorted(glob.glob(os.path.join(Config.OUTPUT_DIR, 'test_results_*.csv')), key=os.path.getmtime)
+            imported = [path for path in paths if store.import_results_csv(path) is not None]
+            for path in imported:
+                print(f"✅ Imported {path}")
+            stats = store.get_stats()
+            print(f"🗄️  {len(imported)} new run(s) imported; {Config.HISTORY_DB} holds {stats['runs']} runs, "
+                  f"{stats['urls']} URLs and {stats['results']} results")
+        elif args.url:
+            reporter.print_section_header("🕒 URL HISTORY")
+            reporter.print_url_timeline(args.url, store.url_timeline(args.url, args.env, args.file, args.runs))
+        elif args.flaky:
+            env = args.env or 'qa'
+            runs = args.runs or Config.HISTORY_FLAKY_RUNS
+            reporter.print_section_header(f"🎲 FLAKY URLS ({env.upper()})")
+            reporter.print_flaky_urls(store.flaky_urls(env, args.file, runs), runs)
+        else:
+            env = args.env or 'qa'
+            reporter.print_section_header(f"📈 LATENCY TREND ({env.upper()}, last {args.days} days)")
+            reporter.print_latency_trend(store.latency_trend(env, args.file, args.days))
+    finally:
+        store.close()
+    return 0
+
+
+def run_crawl(args):
+    """Crawl the environment from its sitemap and report links to the file's redirected or removed URLs."""
+    from crawler import LinkCrawler, LinkTargets, internal_hosts
+    from csv_parser import CSVParser
+    from reporter import Reporter
+    from sitemap_handler import SitemapHandler
+
+    csv_file = args.file
+    Config.set_csv_file(csv_file)
+    Config.CURRENT_ENV = args.env
+    Config.CRAWL_HOST_RATE = args.rate
+    events.set_context(csv_file=csv_file, env=args.env)
+    reporter = Reporter(environment=args.env)
+
+    input_path = Config.get_input_file_path(csv_file)
+    if not os.path.exists(input_path):
+        print(f"❌ File not found: {input_path}")
+        return 1
+
+    reporter.print_section_header("📊 LOADING TEST DATA")
+    parser = CSVParser(input_path)
+    redirect_data, remove_data = parser.get_all_test_data()
+    targets = LinkTargets(redirect_data, remove_data, internal_hosts(Config.get_base_url(args.env)))
+    if not len(targets):
+        print("❌ No redirected or removed URLs to look for. Please check your CSV file.")
+        return 1
+
+    reporter.print_section_header("🗺️  FETCHING SITEMAP")
+    sitemap_handler = SitemapHandler(args.env, sitemap_url=Config.get_sitemap_url(args.env, csv_file),
+                                     enable_fallback=False)
+    seeds = sitemap_handler.get_sitemap_urls()
+    if not len(seeds):
+        print("❌ Sitemap has no URLs to start crawling from")
+        return 1
+
+    reporter.print_section_header(f"🕸️  CRAWLING {args.env.upper()} ({len(seeds)} sitemap URLs, "
+                                  f"up to {args.max_pages} pages)")
+    crawler = LinkCrawler(args.env, targets, max_pages=args.max_pages, max_depth=args.max_depth)
+    stats = crawler.crawl(seeds)
+    linked = crawler.get_targets_summary()
+    for target in linked:
+        metadata = parser.get_page_metadata(target['original_url'])
+        target['export_inlinks'] = metadata.get('unique_inlinks') if metadata else None
+    events.emit('crawl_summary', **{key: value for key, value in stats.items() if key != 'connections'},
+                targets=len(linked))
+
+    reporter.print_section_header("🔗 LINKS TO REDIRECTED OR REMOVED URLS")
+    reporter.print_crawl_summary(stats, linked)
+    if crawler.links:
+        reporter.save_stale_links_csv(crawler.links, csv_file)
+    return 1 if crawler.links else 0
+
+
+def sitemap_signature(url_data, test_type, tester, sitemap_handler):
+    """Sitemap lastmods (None if unlisted) of the URLs a check looks up; a change means the check is affected."""
+    original_prepared = tester._prepare_url(url_data['original_url'])
+    if test_type == 'remove':
+        return (sitemap_handler.get_url_lastmod(original_prepared),)
+    return (sitemap_handler.get_url_lastmod(tester._prepare_url(url_data['expected_url'])),
+            sitemap_handler.get_url_lastmod(original_prepared, preserve_trailing_slash=True))
+
+
+def load_watch_target(csv_file, env):
+    """Parse a CSV file once and set up its sitemap handler and check scheduler for watch mode."""
+    from csv_parser import CSVParser
+    from reporter import Reporter
+    from sitemap_handler import SitemapHandler
+
+    parser = CSVParser(Config.get_input_file_path(csv_file))
+    redirect_data, remove_data = parser.get_all_test_data()
+    items = [('redirect', url_data) for url_data in redirect_data] + [('remove', url_data) for url_data in remove_data]
+    print(f"✅ {csv_file}: {len(redirect_data)} redirect and {len(remove_data)} remove URLs loaded")
+
+    return {
+        'csv_file': csv_file,
+        'parser': parser,
+        'reporter': Reporter(environment=env),
+        'sitemap_handler': SitemapHandler(env, sitemap_url=Config.get_sitemap_url(env, csv_file), enable_fallback=False),
+        'items': items,
+        'signatures': None,
+        'scheduler': CheckScheduler(len(items), Config.WATCH_MAX_RESULT_AGE)
+    }
+
+
+def run_watch_cycle(target, tester, cycle_number):
+    """Revalidate a target's sitemap and re-run the checks that are due; returns the cycle summary."""
+    started = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    start_time = time.time()
+    csv_file = target['csv_file']
+    Config.set_csv_file(csv_file)
+    events.set_context(csv_file=csv_file, env=tester.environment)
+    parser = target['parser']
+    sitemap_handler = target['sitemap_handler']
+    scheduler = target['scheduler']
+    items = target['items']
+
+    sitemap_changed = sitemap_handler.revalidate()
+    if sitemap_changed or target['signatures'] is None:
+        target['signatures'] = [sitemap_signature(url_data, test_type, tester, sitemap_handler)
+                                for test_type, url_data in items]
+    signatures = target['signatures']
+
+    due = scheduler.select(signatures)
+    indices = sorted(due['new'] + due['sitemap_changed'] + due['stale'])
+
+    def on_redirect_result(result, url_data):
+        apply_redirect_sitemap_checks(result, url_data, tester, sitemap_handler)
+        apply_content_baseline(result, parser)
+        apply_head_checks(result, parser, sitemap_handler)
+        events.emit_result(result)
+
+    def on_remove_result(result, url_data):
+        apply_remove_sitemap_checks(result, url_data, tester, sitemap_handler)
+        apply_content_baseline(result, parser)
+        events.emit_result(result)
+
+    results = []
+    changes = {'failed': 0, 'recovered': 0}
+    for test_type, on_result in (('redirect', on_redirect_result), ('remove', on_remove_result)):
+        batch = [i for i in indices if items[i][0] == test_type]
+        if not batch:
+            continue
+        batch_results = tester.test_multiple_urls([items[i][1] for i in batch], test_type, on_result=on_result)
+        for i, result in zip(batch, batch_results):
+            change = scheduler.record(i, result['success'], signatures[i])
+            if change:
+                changes[change] += 1
+                if change == 'failed':
+                    print(f"   ❌ {result.get('full_url', result['url'])}: {result.get('error') or 'check failed'}")
+        results.extend(batch_results)
+
+    # Near-duplicate detection needs a full run; keep memory flat between cycles
+    tester.inspector.reset_clusters()
+
+    cycle = {
+        'cycle': cycle_number,
+        'csv_file': csv_file,
+        'environment': tester.environment,
+        'started': started,
+        'duration': round(time.time() - start_time, 2),
+        'sitemap_changed': sitemap_changed,
+        'total': len(items),
+        'checked': len(indices),
+        'new': len(due['new']),
+        'sitemap_affected': len(due['sitemap_changed']),
+        'stale': len(due['stale']),
+        'failed': changes['failed'],
+        'recovered': changes['recovered'],
+        'failing': scheduler.failing()
+    }
+    target['reporter'].print_watch_cycle(cycle)
+    events.emit('watch_cycle', **cycle)
+    target['reporter'].append_watch_history(cycle, results, csv_file)
+    return cycle
+
+
+def run_watch(args):
+    """Stay resident and periodically re-check URLs affected by sitemap changes or gone stale."""
+    from reporter import Reporter
+    from url_tester import URLTester
+
+    if args.all:
+        csv_files = [f for f in get_available_csv_files() if f in Config.CSV_COLUMN_MAPPINGS]
+    else:
+        csv_files = [args.file]
+    for csv_file in csv_files:
+        if not os.path.exists(Config.get_input_file_path(csv_file)):
+            print(f"❌ File not found: {Config.get_input_file_path(csv_file)}")
+            return 1
+    if not csv_files:
+        print("❌ No CSV files found in the 'in/' directory.")
+        return 1
+
+    Config.CURRENT_ENV = args.env
+    Config.WATCH_MAX_RESULT_AGE = args.max_age
+    reporter = Reporter(environment=args.env)
+    reporter.print_section_header(f"👀 WATCH MODE: {', '.join(csv_files)} ({args.env.upper()})")
+    print(f"Revalidating sitemaps every {args.interval:.0f}s, re-checking results older than {args.max_age:.0f}s")
+
+    # One tester for all files and cycles keeps connection pools and host state warm
+    tester = URLTester(args.env)
+    warm_up_connections(tester)
+    targets = [load_watch_target(csv_file, args.env) for csv_file in csv_files]
+
+    cycle_number = 0
+    try:
+        while True:
+            cycle_number += 1
+            for target in targets:
+                run_watch_cycle(target, tester, cycle_number)
+
+            if args.cycles and cycle_number >= args.cycles:
+                break
+
+            # Wake up early if results go stale before the next sitemap check
+            stale_in = [t['scheduler'].seconds_until_stale() for t in targets]
+            wait = min([args.interval] + [s for s in stale_in if s is not None])
+            wait = max(1.0, wait)
+            print(f"💤 Next cycle in {wait:.0f}s (Ctrl+C to stop)")
+            time.sleep(wait)
+
+    except KeyboardInterrupt:
+        print(f"\n\n⏹️  Watch stopped by user after {cycle_number} cycle(s).")
+
+    failing = sum(t['scheduler'].failing() for t in targets)
+    return 1 if failing else 0
+
+
+def run_test_for_file(csv_file, env='qa', budget=None):
+    """Run sitemap QA testing for a specific CSV file (within budget's fail-fast/deadline limits, if given)."""
+    from csv_parser import CSVParser
+    from profiling import StageProfiler
+    from reporter import Reporter
+    from sitemap_handler import SitemapHandler
+    from url_tester import URLTester
+
     start_time = time.time()
+    events.set_context(csv_file=csv_file, env=env)
+    events.emit('file_start')
+    profiler = StageProfiler()
+    profiler.stage('Setup')
 
     # Set configuration
     Config.set_csv_file(csv_file)
@@ -79,6 +1015,7 @@ def run_test_for_file(csv_file, env='qa'):
     # Disable fallback for accurate per-environment testing
     sitemap_handler = SitemapHandler(Config.CURRENT_ENV, sitemap_url=sitemap_url, enable_fallback=False)
 
+    journal = None
     try:
         # Print header with file information
         print(f"\n{'=' * 80}")
@@ -90,63 +1027,110 @@ def run_test_for_file(csv_file, env='qa'):
         reporter.print_section_header("📊 LOADING TEST DATA")
         print(f"🔄 Loading data from: {Config.get_input_file_path(csv_file)}")
 
+        profiler.stage('CSV load')
         redirect_data, remove_data = parser.get_all_test_data()
 
         # Display statistics
         stats = parser.get_statistics()
+        profiler.count(stats['total_rows'])
         print(f"✅ Data loaded successfully:")
         print(f"   • Total rows in CSV: {stats['total_rows']}")
         print(f"   • URLs with 301 redirects: {stats['redirect_urls']}")
         print(f"   • URLs marked for removal: {stats['remove_urls']}")
 
+        if Config.SHARD:
+            redirect_data = select_shard(redirect_data, Config.SHARD)
+            remove_data = select_shard(remove_data, Config.SHARD)
+            print(f"🧩 Shard {Config.SHARD[0]}/{Config.SHARD[1]}: "
+                  f"{len(redirect_data)} redirect and {len(remove_data)} remove URLs in this slice")
+
+        profiler.stage('Test planning')
+        from scheduler import RunHistory
+
+        history = RunHistory.load(csv_file, Config.CURRENT_ENV)
+        sampler = None
+        if Config.SAMPLE_SIZE or Config.SAMPLE_RATE:
+            sampler, redirect_data, remove_data = draw_sample(redirect_data, remove_data, history, csv_file)
+
         if not redirect_data and not remove_data:
+            if Config.SHARD:
+                print("ℹ️  No test data in this shard")
+                save_shard_results(csv_file, env, [], [], [], [], {'sitemap_snapshot': Config.SITEMAP_SNAPSHOT})
+                return 0
             print("❌ No test data found. Please check your CSV file.")
             return
 
+        journal, run, checkpoint = open_checkpoint(csv_file, Config.CURRENT_ENV, sampler)
+        scheduler = create_scheduler(history, parser)
+        profiler.count(len(redirect_data) + len(remove_data))
+
         # Fetch sitemap first for compliance checking
+        profiler.stage('Sitemap fetch')
         reporter.print_section_header("🗺️  FETCHING SITEMAP FOR COMPLIANCE CHECK")
-        print("🔄 Fetching sitemap for validation...")
+        if checkpoint and checkpoint['header']['sitemap_snapshot']:
+            # Judge the remaining URLs against the sitemap the restored ones were judged against
+            snapshot_path = checkpoint['header']['sitemap_snapshot']
+            if not load_sitemap_snapshot(sitemap_handler, csv_file, snapshot_path):
+                return 1
+            sitemap_diff = checkpoint['header']['sitemap_diff']
+            print(f"✅ Sitemap restored from checkpoint snapshot: {len(sitemap_handler.get_sitemap_urls())} URLs")
+        elif Config.SITEMAP_SNAPSHOT:
+            if not load_sitemap_snapshot(sitemap_handler, csv_file, Config.SITEMAP_SNAPSHOT):
+                return 1
+            snapshot_path, sitemap_diff = Config.SITEMAP_SNAPSHOT, None
+        else:
+            print("🔄 Fetching sitemap for validation...")
+
+            sitemap_handler.fetch_sitemap()
+            profiler.stage('Sitemap parse')
+            sitemap_urls = sitemap_handler.get_sitemap_urls()
+            profiler.count(len(sitemap_urls))
+            print(f"✅ Sitemap fetched: {len(sitemap_urls)} URLs found")
+            profiler.stage('Sitemap snapshot')
+            snapshot_path, sitemap_diff = record_sitemap_snapshot(sitemap_handler, csv_file, Config.CURRENT_ENV, reporter)
+
+        if journal:
+            if checkpoint:
+                journal.reopen(checkpoint['size'])
+            else:
+                journal.start(run, snapshot_path, sitemap_diff)
 
-        sitemap_handler.fetch_sitemap()
-        sitemap_urls = sitemap_handler.get_sitemap_urls()
-        print(f"✅ Sitemap fetched: {len(sitemap_urls)} URLs found")
+        profiler.stage('Connection warm-up')
+        warm_up_connections(tester)
 
         # Test redirect URLs with dual verification
         redirect_results = []
+        untested = []
         if redirect_data:
+            profiler.stage('Redirect tests')
             reporter.print_section_header(f"🔄 TESTING REDIRECT URLS ({len(redirect_data)} URLs)")
             print("Testing URL accessibility AND sitemap compliance...\n")
 
-            progress_bar = reporter.create_progress_bar(len(redirect_data), "Testing redirects")
-
-            for i, url_data in enumerate(redirect_data, 1):
-                # Test URL accessibility
-                result = tester.test_redirect_url(url_data['expected_url'])
-                result['original_url'] = url_data['original_url']
-                result['test_type'] = 'redirect'
-
-                # Add sitemap compliance checks
-                result['url_accessible'] = result['success']  # Rename for clarity
-                # Use the prepared URL for sitemap checking (the URL we actually tested)
-                result['expected_in_sitemap'] = sitemap_handler.check_url_in_sitemap(result['full_url'])['in_sitemap']
-                # For original URL, prepare it the same way to check if it's properly removed
-                # Use preserve_trailing_slash=True to distinguish between URLs with/without trailing slashes
-                original_prepared = tester._prepare_url(url_data['original_url'])
-                result['original_removed'] = not sitemap_handler.check_url_in_sitemap(original_prepared, preserve_trailing_slash=True)['in_sitemap']
-                result['sitemap_compliant'] = result['expected_in_sitemap'] and result['original_removed']
-                result['success'] = result['url_accessible'] and result['sitemap_compliant']  # Combined success
+            restored, pending = split_checkpointed(redirect_data, 'redirect', checkpoint, tester)
+            if scheduler:
+                pending = scheduler.order(pending, 'redirect')
+            progress_bar = reporter.create_progress_bar(len(pending), "Testing redirects")
+            completed = len(restored)
 
-                # Print individual result with dual criteria
-                reporter.print_url_test_result_enhanced(result, i, len(redirect_data))
+            def on_redirect_result(result, url_data):
+                nonlocal completed
+                completed += 1
+                apply_redirect_sitemap_checks(result, url_data, tester, sitemap_handler)
+                apply_content_baseline(result, parser)
+                apply_head_checks(result, parser, sitemap_handler)
 
-                redirect_results.append(result)
+                # Print individual result with dual criteria
+                reporter.print_url_test_result_enhanced(result, completed, len(redirect_data))
+                events.emit_result(result)
 
                 # Update progress bar
                 if progress_bar:
                     progress_bar.update(1)
 
-                # Small delay to avoid overwhelming the server
-                time.sleep(0.1)
+            redirect_results = tester.test_multiple_urls(pending, 'redirect', on_result=on_redirect_result,
+                                                         journal=journal, budget=budget)
+            redirect_results, untested = merge_results(redirect_data, 'redirect', restored, pending, redirect_results)
+            profiler.count(len(pending) - len(untested))
 
             if progress_bar:
                 progress_bar.close()
@@ -154,47 +1138,58 @@ def run_test_for_file(csv_file, env='qa'):
         # Test remove URLs
         remove_results = []
         if remove_data:
+            profiler.stage('Remove tests')
             reporter.print_section_header(f"🗑️  TESTING REMOVE URLS ({len(remove_data)} URLs)")
             print("Testing that URLs marked for removal are properly inaccessible...\n")
 
-            progress_bar = reporter.create_progress_bar(len(remove_data), "Testing removals")
+            restored, pending = split_checkpointed(remove_data, 'remove', checkpoint, tester)
+            if scheduler:
+                pending = scheduler.order(pending, 'remove')
+            progress_bar = reporter.create_progress_bar(len(pending), "Testing removals")
+            completed = len(restored)
 
-            for i, url_data in enumerate(remove_data, 1):
-                # Test that the original URL is properly removed/redirected
-                result = tester.test_remove_url(url_data['original_url'])
-                result['original_url'] = url_data['original_url']
-                result['test_type'] = 'remove'
-
-                # Add sitemap check for removal URLs - they should NOT be in sitemap
-                prepared_url = tester._prepare_url(url_data['original_url'])
-                result['removed_from_sitemap'] = not sitemap_handler.check_url_in_sitemap(prepared_url)['in_sitemap']
-                result['url_inaccessible'] = not result['success']  # Should be inaccessible (success=False is good)
-                result['expected_in_sitemap'] = False  # Removal URLs should not be in sitemap
-                result['sitemap_compliant'] = result['removed_from_sitemap']
-                result['fully_removed'] = result['removed_from_sitemap'] and result['url_inaccessible']
+            def on_remove_result(result, url_data):
+                nonlocal completed
+                completed += 1
+                apply_remove_sitemap_checks(result, url_data, tester, sitemap_handler)
+                apply_content_baseline(result, parser)
 
                 # Print individual result if verbose
-                reporter.print_url_test_result(result, i, len(remove_data))
-
-                remove_results.append(result)
+                reporter.print_url_test_result(result, completed, len(remove_data))
+                events.emit_result(result)
 
                 # Update progress bar
                 if progress_bar:
                     progress_bar.update(1)
 
-                # Small delay to avoid overwhelming the server
-                time.sleep(0.1)
+            remove_results = tester.test_multiple_urls(pending, 'remove', on_result=on_remove_result,
+                                                       journal=journal, budget=budget)
+            remove_results, untested_removals = merge_results(remove_data, 'remove', restored, pending, remove_results)
+            profiler.count(len(pending) - len(untested_removals))
+            untested += untested_removals
 
             if progress_bar:
                 progress_bar.close()
 
+        if untested:
+            reporter.print_untested_summary(untested, budget.reason)
+
+        report_content_checks(tester, redirect_results, remove_results)
+        print_host_stats(tester)
+        profiler.stage('Performance check')
+        performance = run_performance_check(tester, parser, redirect_results, remove_results, reporter, csv_file)
+        if performance:
+            profiler.count(performance['compared'])
+
         # Analyze sitemap
+        profiler.stage('Sitemap analysis', len(redirect_data) + len(remove_data))
         sitemap_analysis = None
         try:
             reporter.print_section_header("🗺️  SITEMAP ANALYSIS")
             print("🔄 Fetching and analyzing sitemap...")
 
             sitemap_analysis = sitemap_handler.get_sitemap_analysis(redirect_data, remove_data)
+            sitemap_analysis['snapshot_diff'] = sitemap_diff
 
             if sitemap_analysis['fetch_success']:
                 print(f"✅ Sitemap analysis completed:")
@@ -221,16 +1216,41 @@ def run_test_for_file(csv_file, env='qa'):
             print(f"❌ Error during sitemap analysis: {e}")
 
         # Generate reports
+        profiler.stage('Report writing', len(redirect_results) + len(remove_results))
         reporter.print_section_header("📄 GENERATING REPORTS")
 
         # Save CSV results
         csv_path = reporter.save_csv_results(redirect_results, remove_results, csv_file)
 
         # Save HTML report
-        html_path = reporter.save_html_report(redirect_results, remove_results, sitemap_analysis, csv_file)
+        html_path = reporter.save_html_report(redirect_results, remove_results, sitemap_analysis, csv_file,
+                                              performance=performance)
+
+        if untested:
+            reporter.save_untested_csv(untested, budget.reason, csv_file)
 
         # Print summary
         reporter.print_summary(redirect_results, remove_results, sitemap_analysis, csv_file)
+        if sampler:
+            reporter.print_sampling_summary(sampler.estimate(redirect_results, remove_results))
+
+        profiler.stage('Run recording')
+        if Config.SHARD:
+            save_shard_results(csv_file, Config.CURRENT_ENV, redirect_data, remove_data,
+                               redirect_results, remove_results, {'sitemap_snapshot': snapshot_path})
+        else:
+            # Shards are recorded as one run by the merge command
+            record_run_history(csv_file, Config.CURRENT_ENV, redirect_results, remove_results, start_time,
+                               time.time() - start_time, len(untested), sampler is not None, csv_path)
+
+        if journal and untested:
+            print(f"💾 Run again with --resume to test the {len(untested)} remaining URLs")
+        elif journal:
+            journal.complete()
+
+        profiler.end()
+        if Config.PROFILE:
+            reporter.print_profile(profiler.get_breakdown())
 
         # Calculate and display total execution time
         total_time = time.time() - start_time
@@ -239,10 +1259,19 @@ def run_test_for_file(csv_file, env='qa'):
         # Determine exit code based on results
         all_results = redirect_results + remove_results
         failed_tests = sum(1 for r in all_results if not r['success'])
+        events.emit('summary', total=len(all_results), passed=len(all_results) - failed_tests, failed=failed_tests,
+                    untested=len(untested), duration=round(total_time, 3), csv_path=csv_path, html_path=html_path)
 
         if failed_tests > 0:
             print(f"\n⚠️  {failed_tests} test(s) failed for {csv_file}. Please review the results.")
             return 1
+        elif untested and not all_results:
+            print(f"\n❌ No URLs were tested for {csv_file} ({budget.reason}).")
+            return 1
+        elif untested:
+            print(f"\n⚠️  All {len(all_results)} tested URLs passed for {csv_file}, "
+                  f"but {len(untested)} were not tested ({budget.reason}).")
+            return 0
         else:
             print(f"\n🎉 All tests passed successfully for {csv_file}!")
             return 0
@@ -254,6 +1283,8 @@ def run_test_for_file(csv_file, env='qa'):
 
     except KeyboardInterrupt:
         print(f"\n\n⏹️  Testing interrupted by user.")
+        if journal and os.path.exists(journal.path):
+            print(f"💾 Completed tests are saved in {journal.path}; run again with --resume to continue")
         return 1
 
     except Exception as e:
@@ -262,10 +1293,83 @@ def run_test_for_file(csv_file, env='qa'):
         traceback.print_exc()
         return 1
 
+    finally:
+        if journal:
+            journal.close()
+
 
 def main():
     """Main function to run sitemap QA testing."""
     args = parse_arguments()
+    apply_runtime_options(args)
+
+    if Config.EVENTS:
+        return run_with_events(args)
+    return run_profiled(args)
+
+
+def run_with_events(args):
+    """Run the command with the JSON Lines event stream open."""
+    start_time = time.time()
+    stdout = sys.stdout
+    try:
+        writer = events.open_events(Config.EVENTS)
+    except OSError as e:
+        print(f"❌ Error opening event stream: {e}")
+        return 1
+    if Config.EVENTS == '-':
+        # Keep stdout for the events only
+        sys.stdout = sys.stderr
+    print(f"📡 Writing events for run {writer.run_id} to: {'stdout' if Config.EVENTS == '-' else Config.EVENTS}")
+
+    events.emit('run_start', command=args.command or 'test', argv=sys.argv[1:])
+    exit_code = 1
+    try:
+        exit_code = run_profiled(args)
+        return exit_code
+    finally:
+        events.emit('run_end', exit_code=exit_code, duration=round(time.time() - start_time, 3))
+        events.close_events()
+        sys.stdout = stdout
+
+
+def run_profiled(args):
+    """Run the command, under a whole-run cProfile if --profile-output is given."""
+    if not Config.PROFILE_OUTPUT:
+        return run_command(args)
+
+    from profiling import ThreadProfile
+
+    profile = ThreadProfile()
+    profile.start()
+    try:
+        return run_command(args)
+    finally:
+        try:
+            profile.stop(Config.PROFILE_OUTPUT)
+            print(f"📈 Profile of the whole run saved to: {Config.PROFILE_OUTPUT} "
+                  f"(python -m pstats {Config.PROFILE_OUTPUT})")
+        except OSError as e:
+            print(f"❌ Error saving profile: {e}")
+
+
+def run_command(args):
+    """Run the command selected on the command line."""
+    if args.command == 'diff':
+        return run_sitemap_diff(args)
+    if args.command == 'snapshot':
+        return run_sitemap_snapshot(args)
+    if args.command == 'merge':
+        return run_merge(args)
+    if args.command == 'watch':
+        return run_watch(args)
+    if args.command == 'history':
+        return run_history(args)
+    if args.command == 'crawl':
+        return run_crawl(args)
+
+    # One budget for the whole invocation, so --deadline also bounds --all
+    budget = RunBudget(Config.FAIL_FAST, Config.DEADLINE) if Config.FAIL_FAST or Config.DEADLINE else None
 
     if args.all:
         # Test all CSV files
@@ -278,12 +1382,14 @@ def main():
 
         overall_exit_code = 0
         for csv_file in csv_files:
-            if csv_file in Config.CSV_COLUMN_MAPPINGS:
+            if budget and budget.exhausted():
+                print(f"⏭️  Skipping {csv_file}: {budget.reason}")
+            elif csv_file in Config.CSV_COLUMN_MAPPINGS:
                 print(f"\n{'=' * 100}")
                 print(f"🚀 STARTING TEST FOR: {csv_file}")
                 print(f"{'=' * 100}")
 
-                exit_code = run_test_for_file(csv_file, args.env)
+                exit_code = run_test_for_file(csv_file, args.env, budget)
                 if exit_code != 0:
                     overall_exit_code = exit_code
             else:
@@ -312,7 +1418,7 @@ def main():
                 print(f"  • {f}")
             return 1
 
-        return run_test_for_file(csv_file, args.env)
+        return run_test_for_file(csv_file, args.env, budget)
 
 
 def print_usage():
@@ -336,6 +1442,15 @@ Usage Examples:
   python test_sitemap_qa.py --all              # Test all supported CSV files
   python test_sitemap_qa.py --env prod         # Test in production environment
 
+Commands:
+  python test_sitemap_qa.py diff --env qa --against prod       # Compare sitemaps or snapshots
+  python test_sitemap_qa.py snapshot --file Psychics.csv       # Store the sitemap as a snapshot
+  python test_sitemap_qa.py merge --file Psychics.csv          # Combine the results of all shards
+  python test_sitemap_qa.py watch --all --env qa               # Re-check URLs as the sitemap changes
+  python test_sitemap_qa.py history --flaky                    # Query the run history
+  python test_sitemap_qa.py crawl --file Psychics.csv          # Find internal links to redirected/removed URLs
+  python test_sitemap_qa.py <command> --help                   # Options of a command
+
 Supported CSV Files:
 • Psychics.csv (columns 1, 4, 61)
 • Blog.csv (columns 1, 4, 58)
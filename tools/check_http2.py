@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Transport parity check for URLTester.test_url.
+
+The HTTP/2 transport wraps httpx responses in a requests.Response look-alike;
+an attribute it lacks turns every 200 into an "Unexpected error" result that
+skips the content and <head> checks. This check serves a page from a local
+server (plain HTTP, so httpx speaks HTTP/1.1 through the HTTP/2 transport's
+code path) and fails unless test_url returns the same status, content hash, size
+and <head> fields over the HTTP/1.1 session and the HTTP/2 transport.
+
+Usage:
+  python tools/check_http2.py
+"""
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from config import Config  # noqa: E402
+from transport import HTTP2_AVAILABLE  # noqa: E402
+
+PAGE = ('<html><head><title>Café page</title><link rel="canonical" href="/page">'
+        '<meta name="robots" content="index,follow"></head><body>' + 'content ' * 200 + '</body></html>').encode('utf-8')
+FIELDS = ('status_code', 'success', 'error', 'content_hash', 'content_size', 'page_head')
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    """Serves PAGE at /page and a 404 elsewhere (the soft-404 probe)."""
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        body = PAGE if self.path == '/page' else b'not found'
+        self.send_response(200 if self.path == '/page' else 404)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def fetch(base_url: str, use_http2: bool) -> dict:
+    """test_url result of the local page over one transport, with the parsed <head>."""
+    from url_tester import URLTester
+
+    Config.USE_HTTP2 = use_http2
+    tester = URLTester('qa')
+    tester.base_url = base_url
+    result = tester.test_redirect_url('/page')
+    if 'page_head' in result:
+        result['page_head'] = result['page_head'].result()
+    tester.head_parsers.shutdown()
+    return {field: result.get(field) for field in FIELDS}
+
+
+def main():
+    """Run the transport check; returns the process exit code."""
+    if not HTTP2_AVAILABLE:
+        print("⚠️  httpx[http2] is not installed; HTTP/2 transport check skipped")
+        return 0
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_address[1]}'
+    try:
+        http1 = fetch(base_url, use_http2=False)
+        http2 = fetch(base_url, use_http2=True)
+    finally:
+        server.shutdown()
+
+    failures = [f"{field}: HTTP/1.1 {http1[field]!r}, HTTP/2 {http2[field]!r}"
+                for field in FIELDS if http1[field] != http2[field]]
+    if http2['error'] or not http2['content_hash'] or not http2['page_head']:
+        failures.append(f"HTTP/2 result incomplete: {http2}")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print(f"✅ HTTP/2 transport check passed ({http2['content_size']} bytes, title {http2['page_head']['title']!r})")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
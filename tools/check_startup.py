@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Startup time check for the sitemap QA CLI.
+
+The tool is started many times from CI and cron, so cold start matters. This
+check runs fresh interpreters and fails if:
+- `test_sitemap_qa.py --help` takes longer than the budget (median of runs)
+- --help imports any of the heavy modules (pandas, requests, tqdm, ElementTree)
+- loading a CSV below Config.CSV_FAST_PATH_MAX_BYTES imports pandas
+
+Usage:
+  python tools/check_startup.py                 # default budget 0.25s, 5 runs
+  python tools/check_startup.py --budget 0.4 --runs 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('pandas', 'requests', 'tqdm', 'xml.etree.ElementTree')
+
+# Loads the smallest input CSV through the fast path and prints the heavy modules it pulled in
+FAST_PATH_PROBE = """
+import os, sys
+sys.path.insert(0, 'src')
+from config import Config
+from csv_parser import CSVParser
+files = sorted((os.path.getsize(os.path.join(Config.INPUT_DIR, f)), f) for f in os.listdir(Config.INPUT_DIR) if f.endswith('.csv'))
+if files and files[0][0] <= Config.CSV_FAST_PATH_MAX_BYTES:
+    CSVParser(Config.get_input_file_path(files[0][1])).get_all_test_data()
+print('LOADED:' + ','.join(m for m in ('pandas',) if m in sys.modules))
+"""
+
+HELP_PROBE = """
+import runpy, sys
+sys.argv = ['test_sitemap_qa.py', '--help']
+try:
+    runpy.run_path('test_sitemap_qa.py', run_name='__main__')
+except SystemExit:
+    pass
+print('LOADED:' + ','.join(m for m in %r if m in sys.modules))
+""" % (HEAVY_MODULES,)
+
+
+def time_help(runs: int):
+    """Wall time of `test_sitemap_qa.py --help` in fresh interpreters."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, 'test_sitemap_qa.py', '--help'], cwd=ROOT,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def loaded_modules(probe: str):
+    """Heavy modules a probe script reports as imported."""
+    output = subprocess.run([sys.executable, '-c', probe], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    line = [l for l in output.splitlines() if l.startswith('LOADED:')][-1]
+    return [m for m in line[len('LOADED:'):].split(',') if m]
+
+
+def main():
+    """Run the startup checks; returns the process exit code."""
+    parser = argparse.ArgumentParser(description='Check CLI startup time and lazy imports')
+    parser.add_argument('--budget', type=float, default=0.25, help='Maximum median --help time in seconds (default: 0.25)')
+    parser.add_argument('--runs', type=int, default=5, help='Interpreter starts to time (default: 5)')
+    args = parser.parse_args()
+
+    failures = []
+
+    timings = time_help(max(1, args.runs))
+    median = statistics.median(timings)
+    print(f"⏱️  --help startup: median {median:.3f}s, best {min(timings):.3f}s over {len(timings)} runs "
+          f"(budget {args.budget:.3f}s)")
+    if median > args.budget:
+        failures.append(f"--help median {median:.3f}s exceeds budget {args.budget:.3f}s")
+
+    heavy = loaded_modules(HELP_PROBE)
+    print(f"📦 Heavy modules imported by --help: {', '.join(heavy) or 'none'}")
+    if heavy:
+        failures.append(f"--help imports {', '.join(heavy)}")
+
+    heavy = loaded_modules(FAST_PATH_PROBE)
+    print(f"📦 Heavy modules imported by a fast-path CSV load: {', '.join(heavy) or 'none'}")
+    if heavy:
+        failures.append(f"fast-path CSV load imports {', '.join(heavy)}")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✅ Startup checks passed")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())